@@ -0,0 +1,66 @@
+"""書類ライターのベンチマーク
+
+書類ごとの生成時間とメモリの最大使用量（tracemalloc）を2つのライターで比べる。
+
+- openpyxl: 解析済みテンプレートの複製に書き込み、openpyxl / python-docx で保存し直す
+- ooxml: テンプレートのZIPのうち書き込みのある部品だけを書き換える（ooxml_writer）
+
+どちらもテンプレートはキャッシュ済み（TemplateCache に読み込み・解析済み）の状態で測る。
+tracemalloc が数えるのはPythonのオブジェクトだけで、lxml（libxml2）の木は含まない
+（openpyxl のセルはPythonのオブジェクトなので xlsx の比較には効く）。
+
+    python -m benchmarks.bench_document_writer [--repeat 20]
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+import warnings
+
+from modules.subsidy.kagawa_mirai import calculate_all, load_hearing_sheet
+from modules.subsidy.kagawa_mirai.document_generator import WRITERS, build_document
+from modules.subsidy.kagawa_mirai.template_cache import TemplateCache
+
+from .bench_hearing_reader import build_typical_sheet
+from .bench_template_cache import TEMPLATE_DIR
+
+DOCUMENTS = ["交付申請書", "事業計画書", "チェックリスト"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    # openpyxl の DrawingML の警告を毎回出さない
+    warnings.simplefilter("ignore", UserWarning)
+
+    data = load_hearing_sheet(build_typical_sheet())
+    calc = calculate_all(data)
+    templates = TemplateCache()
+
+    print(f"{'document':<10} {'writer':<8} {'median':>9} {'py_peak':>10} {'size':>9}")
+    for name in DOCUMENTS:
+        for writer in WRITERS:
+            def build():
+                return build_document(name, data, TEMPLATE_DIR, calc.subsidy, calc.plan, templates, writer)
+
+            content = build()  # テンプレートの読み込み・解析を済ませる
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                build()
+                times.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            build()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{name:<10} {writer:<8} {statistics.median(times) * 1000:>7.1f}ms "
+                f"{peak / 1024:>8,.0f}KB {len(content) / 1024:>7,.0f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""書類4種の生成 → ZIP のベンチマーク（一時ファイル経由・メモリ上・同時生成）
+
+- tempdir: 旧方式（一時ディレクトリに generate_all_documents で書き出し、読み直してZIP）
+- memory: build_all_documents のバイト列をそのまま create_zip に渡す（ファイルを書かない）
+- thread / process: memory を ThreadPoolExecutor / document_executor() で4書類同時に
+
+--dir で一時ディレクトリの場所を指定できる（遅いディスク・共有ディスク上での比較用）。
+同時生成の効果はCPU数に依存する（最も遅い1書類の時間が下限）。
+
+    python -m benchmarks.bench_document_zip [--repeat 10] [--dir /mnt/shared/tmp]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from lib.file_utils import create_zip
+from modules.subsidy.kagawa_mirai import calculate_all, load_hearing_sheet
+from modules.subsidy.kagawa_mirai.document_generator import (
+    TEMPLATES, build_all_documents, build_document, document_executor, generate_all_documents,
+)
+
+from .bench_hearing_reader import build_typical_sheet
+from .bench_template_cache import TEMPLATE_DIR, io_bytes
+
+
+def via_tempdir(data, calc, work_dir) -> bytes:
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmpdir:
+        paths = generate_all_documents(data, tmpdir, TEMPLATE_DIR, calc.subsidy, calc.plan)
+        files = {Path(path).name: Path(path).read_bytes() for path in paths.values() if path}
+    return create_zip(files)
+
+
+def in_memory(data, calc, work_dir, executor=None) -> bytes:
+    return create_zip(build_all_documents(data, TEMPLATE_DIR, calc.subsidy, calc.plan, executor=executor))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--dir", type=Path, help="一時ディレクトリを作る場所（既定はシステムの一時ディレクトリ）")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", UserWarning)
+
+    data = load_hearing_sheet(build_typical_sheet())
+    calc = calculate_all(data)
+    in_memory(data, calc, args.dir)  # テンプレートの読み込みを済ませておく
+    slowest = 0.0
+    for name in TEMPLATES:
+        start = time.perf_counter()
+        build_document(name, data, TEMPLATE_DIR, calc.subsidy, calc.plan)
+        slowest = max(slowest, time.perf_counter() - start)
+    print(f"cpus {os.cpu_count()}  slowest single document {slowest * 1000:.1f}ms")
+
+    threads = ThreadPoolExecutor(max_workers=3)
+    procs = document_executor(TEMPLATE_DIR)
+    in_memory(data, calc, args.dir, procs)  # ワーカーの起動を済ませておく
+    modes = {
+        "tempdir": via_tempdir,
+        "memory": in_memory,
+        "thread": partial(in_memory, executor=threads),
+        "process": partial(in_memory, executor=procs),
+    }
+    print(f"{'mode':<8} {'median':>9} {'p90':>9} {'read/run':>10} {'write/run':>10} {'zip':>9}")
+    for name, run in modes.items():
+        times = []
+        read0, write0 = io_bytes()
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            zip_bytes = run(data, calc, args.dir)
+            times.append(time.perf_counter() - start)
+        read1, write1 = io_bytes()
+        times.sort()
+        print(
+            f"{name:<8} {statistics.median(times) * 1000:>7.1f}ms {times[int(len(times) * 0.9) - 1] * 1000:>7.1f}ms "
+            f"{(read1 - read0) // args.repeat:>10,} {(write1 - write0) // args.repeat:>10,} {len(zip_bytes):>9,}"
+        )
+    threads.shutdown()
+    procs.shutdown()
+
+
+if __name__ == "__main__":
+    main()
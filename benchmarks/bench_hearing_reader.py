@@ -0,0 +1,129 @@
+"""ヒアリングシート読み込みのベンチマーク
+
+旧方式（通常モードで全体を読み込み、フィールドごとに wb[sheet] を引き直す）と
+load_hearing_sheet（読み取り専用モードで各シートを1パス走査）を比較する。
+
+    python -m benchmarks.bench_hearing_reader [--pad-mb 5] [--repeat 5]
+"""
+
+import argparse
+import io
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+import openpyxl
+
+from modules.subsidy.kagawa_mirai.data_models import HearingData, SubsidyExpenseItem
+from modules.subsidy.kagawa_mirai.hearing_reader import (
+    _FIELD_SPECS, _SECTION_CLASSES, load_hearing_sheet,
+)
+
+SAMPLE_PATH = Path(__file__).parent.parent / "assets" / "kagawa_mirai" / "hearing_sheet.xlsx"
+
+
+def legacy_read_hearing_sheet(source) -> HearingData:
+    """旧 read_hearing_sheet と同じアクセスパターンの読み込み"""
+    wb = openpyxl.load_workbook(source, data_only=True)
+
+    def get_cell(sheet_name, row, col, default=""):
+        try:
+            ws = wb[sheet_name]
+            val = ws.cell(row=row, column=col).value
+            return val if val is not None else default
+        except Exception:
+            return default
+
+    values = {section: {} for section in _SECTION_CLASSES}
+    for sheet, row, col, section, attr, type_, default in _FIELD_SPECS:
+        val = get_cell(sheet, row, col, default)
+        values[section][attr] = int(val or default) if type_ is int else str(val)
+    data = HearingData(**{s: cls(**values[s]) for s, cls in _SECTION_CLASSES.items()})
+
+    try:
+        ws_exp = wb["7_補助対象経費"]
+        for row in range(5, 20):
+            item_name = ws_exp.cell(row=row, column=3).value
+            if not item_name:
+                continue
+            data.expenses.append(SubsidyExpenseItem(
+                category=str(ws_exp.cell(row=row, column=2).value or ""),
+                item_name=str(item_name),
+                amount=int(ws_exp.cell(row=row, column=4).value or 0),
+                has_quote=bool(ws_exp.cell(row=row, column=5).value),
+                note=str(ws_exp.cell(row=row, column=6).value or ""),
+            ))
+    except KeyError:
+        pass
+    return data
+
+
+def build_typical_sheet() -> bytes:
+    """サンプルシートに一通りの値を埋めたワークブックを作る"""
+    wb = openpyxl.load_workbook(SAMPLE_PATH)
+    for sheet, row, col, section, attr, type_, default in _FIELD_SPECS:
+        value = 1_200 + row if type_ is int else f"{attr}のサンプル入力" * 3
+        wb[sheet].cell(row=row, column=col, value=value)
+    ws = wb["7_補助対象経費"]
+    for i in range(5):
+        ws.cell(row=5 + i, column=2, value="機械装置等費")
+        ws.cell(row=5 + i, column=3, value=f"設備{i + 1}")
+        ws.cell(row=5 + i, column=4, value=300_000 + i * 10_000)
+        ws.cell(row=5 + i, column=5, value="○")
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def pad_sheet(payload: bytes, target_mb: float) -> bytes:
+    """読み取り範囲外に数値セルを足して target_mb 程度まで膨らませる"""
+    rng = random.Random(0)
+    wb = openpyxl.load_workbook(io.BytesIO(payload))
+    ws = wb["7_補助対象経費"]
+    next_row = 100
+    while True:
+        for _ in range(5_000):
+            for col in range(1, 11):
+                ws.cell(row=next_row, column=col, value=rng.random())
+            next_row += 1
+        buf = io.BytesIO()
+        wb.save(buf)
+        if buf.tell() >= target_mb * 1024 * 1024:
+            return buf.getvalue()
+
+
+def measure(reader, payload: bytes, repeat: int) -> tuple[float, float]:
+    """(最速実行時間[ms], ピークメモリ[MB]) を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reader(io.BytesIO(payload))
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    reader(io.BytesIO(payload))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pad-mb", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    typical = build_typical_sheet()
+    padded = pad_sheet(typical, args.pad_mb)
+
+    for label, payload in [("typical", typical), ("padded", padded)]:
+        if legacy_read_hearing_sheet(io.BytesIO(payload)) != load_hearing_sheet(payload):
+            raise SystemExit(f"{label}: 読み込み結果が一致しません")
+        print(f"== {label} ({len(payload) / 1024 / 1024:.2f} MB)")
+        for name, reader in [("legacy", legacy_read_hearing_sheet), ("read_only", load_hearing_sheet)]:
+            ms, mb = measure(reader, payload, args.repeat)
+            print(f"  {name:<10} {ms:9.1f} ms  peak {mb:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
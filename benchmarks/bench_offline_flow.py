@@ -0,0 +1,150 @@
+"""オフラインでの一連の処理の確認（ネットワーク不要）
+
+lib.llm_backends の代替バックエンドを組み込み、次のいずれかを実行して
+処理時間とAPI呼び出しの集計（llm_metrics）を表示する。
+
+- flow: 香川県の一連の処理（読込 → 計算 → セクション並列の文章生成 → 書類4種 → ZIP）
+- chain: 戦略分析の5エージェントのチェーン（multi_agent_chain）
+- load: 複数顧客の文章生成を同時に実行する負荷試験（--customers 件を1つのイベントループで）
+
+既定は合成応答（SyntheticResponder）。--replay DIR で記録済みの応答を再生し、
+--record DIR で実際のAPIの応答を記録する（ANTHROPIC_API_KEY が必要）。
+
+    python -m benchmarks.bench_offline_flow flow [--failure-rate 0.1]
+    python -m benchmarks.bench_offline_flow load --customers 50 --tps 80
+"""
+
+import argparse
+import asyncio
+import time
+from functools import partial
+from pathlib import Path
+
+from anthropic import Anthropic
+
+from lib.anthropic_client import (
+    RateLimiter, agenerate_text, generate_text, multi_agent_chain,
+)
+from lib.llm_backends import (
+    FixtureStore, RecordingResponder, ReplayResponder, SyntheticResponder, use_backend,
+)
+from lib.llm_metrics import get_metrics, metric_labels, summarize
+from modules.subsidy.kagawa_mirai import calculate_all, generate_texts_parallel, load_hearing_sheet
+from modules.subsidy.kagawa_mirai.ai_text_generator import (
+    SECTION_GROUPS, SECTION_TARGET_CHARS, build_messages, section_max_tokens,
+)
+from modules.subsidy.kagawa_mirai.generate_plan import build_section_instruction
+from modules.subsidy.kagawa_mirai.hearing_reader import hearing_to_prompt_data
+from modules.subsidy.kagawa_mirai.stages import plan_documents, render_documents
+
+from .bench_hearing_reader import build_typical_sheet
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "templates" / "kagawa_mirai"
+
+STRATEGY_AGENTS = [
+    {"name": "質問設計者", "system_prompt": "分析の論点を構造化してください。"},
+    {"name": "市場リサーチャー", "system_prompt": "市場規模・トレンド・競合を分析してください。"},
+    {"name": "定量アナリスト", "system_prompt": "財務指標・KPI・ROIを試算してください。"},
+    {"name": "戦略デザイナー", "system_prompt": "SWOT分析と3つの戦略オプションを示してください。"},
+    {"name": "批判的レビュアー", "system_prompt": "リスクと盲点を指摘してください。"},
+]
+
+
+def run_flow(data):
+    timings = {}
+    start = time.perf_counter()
+    calc = calculate_all(data)
+    timings["calculate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    texts = generate_texts_parallel(data, partial(generate_text, use_cache=False))
+    timings["texts"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = render_documents(plan_documents(data, texts, calc), TEMPLATE_DIR)
+    timings["documents"] = time.perf_counter() - start
+    for name, seconds in timings.items():
+        print(f"{name:<10} {seconds:>7.2f}s")
+    done = sum(1 for filename in documents["results"].values() if filename)
+    print(f"sections {len(texts)}/{len(SECTION_GROUPS)}  documents {done}/{len(documents['results'])}  "
+          f"zip {len(documents['zip_bytes']):,} bytes")
+
+
+def run_chain():
+    start = time.perf_counter()
+    results = multi_agent_chain(
+        STRATEGY_AGENTS, "香川県の製造業向けに、設備投資による生産性向上の戦略を検討したい。",
+        on_agent_complete=lambda name, output: print(f"  {name}: {len(output)}字"),
+    )
+    print(f"agents {len(results)}  {time.perf_counter() - start:.2f}s")
+
+
+async def run_load(data, customers: int):
+    """1セクション1リクエストの文章生成を customers 件分、同時に実行する"""
+    prompt_data = hearing_to_prompt_data(data)
+    limiter = RateLimiter(rpm=100_000, tpm=10**9)
+
+    async def one(i: int):
+        # 顧客ごとに異なるプロンプトにする（応答キャッシュ・再生の衝突を避ける）
+        with metric_labels(customer=f"client-{i}"):
+            for keys in SECTION_GROUPS:
+                system, user_message = build_messages(
+                    {**prompt_data, "company": {**prompt_data.get("company", {}), "company_name": f"顧客{i}"}},
+                    build_section_instruction({key: SECTION_TARGET_CHARS[key] for key in keys}, tool=False),
+                )
+                await agenerate_text(
+                    system, user_message, max_tokens=section_max_tokens(keys),
+                    use_cache=False, limiter=limiter,
+                )
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(customers)), return_exceptions=True)
+    failed = sum(isinstance(r, Exception) for r in results)
+    elapsed = time.perf_counter() - start
+    print(f"customers {customers}  failed {failed}  {elapsed:.2f}s  "
+          f"({customers * len(SECTION_GROUPS) / elapsed:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=["flow", "chain", "load"])
+    parser.add_argument("--customers", type=int, default=20, help="load の顧客数")
+    parser.add_argument("--ttft", type=float, default=0.6, help="最初のトークンまでの秒数")
+    parser.add_argument("--tps", type=float, default=60.0, help="出力速度（トークン/秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="失敗させる割合")
+    parser.add_argument("--failure-status", type=int, default=529)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", type=Path, help="記録済みの応答を再生する")
+    parser.add_argument("--record", type=Path, help="実際のAPIの応答を記録する")
+    args = parser.parse_args()
+
+    synthetic = SyntheticResponder(
+        ttft=args.ttft, tokens_per_second=args.tps, failure_rate=args.failure_rate,
+        failure_status=args.failure_status, retry_after=0.1, seed=args.seed,
+    )
+    if args.record:
+        use_backend(RecordingResponder(FixtureStore(args.record), Anthropic(max_retries=0)))
+    elif args.replay:
+        use_backend(ReplayResponder(FixtureStore(args.replay)))
+    else:
+        use_backend(synthetic)
+
+    data = load_hearing_sheet(build_typical_sheet())
+    if args.mode == "flow":
+        run_flow(data)
+    elif args.mode == "chain":
+        run_chain()
+    else:
+        asyncio.run(run_load(data, args.customers))
+
+    summary = summarize(get_metrics().records())
+    print(
+        f"API calls {summary['api_calls']}  errors {summary['errors']}  "
+        f"latency p50 {summary['latency_p50'] or 0:.2f}s p95 {summary['latency_p95'] or 0:.2f}s  "
+        f"tokens in {summary['input_tokens'] + summary['cache_creation_input_tokens'] + summary['cache_read_input_tokens']:,} "
+        f"out {summary['output_tokens']:,}"
+    )
+
+
+if __name__ == "__main__":
+    main()
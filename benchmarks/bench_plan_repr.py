@@ -0,0 +1,114 @@
+"""ThreeYearPlan の表現形式のベンチマーク
+
+従来の「年度dictのリスト」と、配列で保持する ThreeYearPlan を比べる。
+N件の計画を保持したときの1件あたりメモリと、画面の収支計画テーブルを
+組み立てる時間を測る。
+
+    python -m benchmarks.bench_plan_repr [-n 20000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from modules.subsidy.kagawa_mirai.calculate_plan import (
+    PLAN_FIELDS, FinancialData, calculate_3year_plan,
+)
+
+TABLE_ROWS = [
+    ("売上高", "sales"),
+    ("営業利益", "operating_profit"),
+    ("人件費", "personnel_cost"),
+    ("減価償却費", "depreciation"),
+    ("付加価値額", "added_value"),
+    ("給与支給総額", "salary_total"),
+    ("従業員数", "employee_count"),
+]
+HEADERS = ["項目", "基準年度", "1年目", "2年目", "3年目"]
+
+
+def to_legacy(plan) -> dict:
+    """従来形式（年度dictのリスト + フラグ）に変換"""
+    return {
+        "years": [
+            {"year": y, "label": "基準年度" if y == 0 else f"{y}年目",
+             **{name: plan.value(y, name) for name in PLAN_FIELDS}}
+            for y in range(plan.n_years)
+        ],
+        "added_value_increasing": plan.added_value_increasing,
+        "salary_increasing": plan.salary_increasing,
+        "all_requirements_met": plan.all_requirements_met,
+        "added_value_growth_rate": plan.added_value_growth_rate,
+        "salary_growth_rate": plan.salary_growth_rate,
+    }
+
+
+def render_legacy(years: list) -> list:
+    table = []
+    for label, key in TABLE_ROWS:
+        row = {"項目": label}
+        for i, year_data in enumerate(years):
+            val = year_data.get(key, 0)
+            row[HEADERS[i + 1]] = f"{val}名" if key == "employee_count" else f"{val // 1000:,}"
+        table.append(row)
+    return table
+
+
+def render_compact(plan) -> list:
+    table = []
+    for label, key in TABLE_ROWS:
+        row = {"項目": label}
+        for i, val in enumerate(plan.column(key)):
+            row[HEADERS[i + 1]] = f"{val}名" if key == "employee_count" else f"{val // 1000:,}"
+        table.append(row)
+    return table
+
+
+def measure_memory(build, n: int) -> float:
+    """build() を n 回呼んだ結果を保持したときの1件あたりバイト数"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    held = [build(i) for i in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return (after - before) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20_000)
+    args = parser.parse_args()
+
+    financial = FinancialData(
+        sales=80_000_000, operating_profit=2_500_000, depreciation=1_800_000,
+        personnel_cost=24_000_000, salary_total=20_000_000, employee_count=8,
+    )
+    plans = [
+        calculate_3year_plan(financial, sales_increase_annual=i * 1000, wage_increase_annual=300_000)
+        for i in range(args.n)
+    ]
+    legacy = [to_legacy(p) for p in plans]
+    if any(render_legacy(lg["years"]) != render_compact(p) for lg, p in zip(legacy, plans)):
+        raise SystemExit("テーブルの内容が一致しません")
+
+    compact_bytes = measure_memory(lambda i: calculate_3year_plan(
+        financial, sales_increase_annual=i * 1000, wage_increase_annual=300_000), args.n)
+    legacy_bytes = measure_memory(lambda i: to_legacy(plans[i]), args.n)
+    print(f"メモリ/計画   legacy {legacy_bytes:8.0f} B   compact {compact_bytes:8.0f} B")
+
+    start = time.perf_counter()
+    for lg in legacy:
+        render_legacy(lg["years"])
+    legacy_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for p in plans:
+        render_compact(p)
+    compact_ms = (time.perf_counter() - start) * 1000
+    print(f"テーブル描画  legacy {legacy_ms:8.1f} ms  compact {compact_ms:8.1f} ms  ({args.n:,}件)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""プロンプトキャッシュの効果の確認
+
+一通りの値を埋めたヒアリングシートについて、ローカル代替サーバー
+（stub_anthropic_server）に対して、セクションごとの並列生成と
+一括生成をそれぞれ2回ずつ行い、入力トークンのうちキャッシュから読まれた分・
+キャッシュに書き込まれた分・通常の分を表示する。応答キャッシュは使わない。
+
+代替サーバーの応答は --latency 秒後に始まり、それまでは書き込み中のキャッシュを
+読めない。parallel は1セクションを先に生成してから残りを送る（prime）。
+fanout は10セクションを同時に送る比較用で、1回目は全件が書き込みになる。
+
+    python -m benchmarks.bench_prompt_cache [--sheet hearing.xlsx] [--latency 0.5]
+"""
+
+import argparse
+from functools import partial
+from pathlib import Path
+
+from anthropic import Anthropic
+
+from lib.anthropic_client import TokenUsage, generate_text, generate_streaming
+from modules.subsidy.kagawa_mirai import (
+    generate_texts, generate_texts_parallel, generate_texts_streaming, load_hearing_sheet,
+)
+
+from .bench_hearing_reader import build_typical_sheet
+from .stub_anthropic_server import StubAnthropicServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sheet", type=Path, help="ヒアリングシート（既定: 値を埋めたサンプル）")
+    parser.add_argument("--latency", type=float, default=0.5, help="代替サーバーの応答が始まるまでの秒数")
+    args = parser.parse_args()
+
+    data = load_hearing_sheet(args.sheet.read_bytes() if args.sheet else build_typical_sheet())
+
+    def text_fn(client, usage):
+        return partial(generate_text, client=client, use_cache=False, on_usage=usage.add)
+
+    modes = {
+        "parallel": lambda client, usage: generate_texts_parallel(data, text_fn(client, usage)),
+        "fanout": lambda client, usage: generate_texts_parallel(data, text_fn(client, usage), prime=False),
+        "single": lambda client, usage: generate_texts(data, text_fn(client, usage)),
+        "streaming": lambda client, usage: generate_texts_streaming(
+            data, partial(generate_streaming, client=client, use_cache=False, on_usage=usage.add)),
+    }
+    print(f"{'mode':<10} {'run':>3} {'req':>4} {'input':>7} {'write':>7} {'read':>7} {'cached':>7} {'sections':>8}")
+    for name, run in modes.items():
+        # 方式ごとに代替サーバーを立て直し、1回目はキャッシュが空の状態から測る
+        with StubAnthropicServer(latency=args.latency) as server:
+            client = Anthropic(base_url=server.url, api_key="stub")
+            for i in range(2):
+                usage = TokenUsage()
+                texts = run(client, usage)
+                print(
+                    f"{name:<10} {i + 1:>3} {usage.requests:>4} {usage.input_tokens:>7,} "
+                    f"{usage.cache_creation_input_tokens:>7,} {usage.cache_read_input_tokens:>7,} "
+                    f"{usage.cached_ratio:>7.0%} {len(texts):>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""要件逆算ソルバーのベンチマーク
+
+ランダムな財務データ・入力値で solve_min_* を呼び、1回あたりの所要時間を測る。
+あわせて、求めた最小値では calculate_3year_plan が要件を満たし、
+最小値 - 1 では満たさないことを確かめる。
+
+    python -m benchmarks.bench_requirement_solver [-n 20000]
+"""
+
+import argparse
+import random
+import time
+
+from modules.subsidy.kagawa_mirai.calculate_plan import FinancialData, calculate_3year_plan
+from modules.subsidy.kagawa_mirai.requirement_solver import (
+    solve_min_cost_reduction, solve_min_sales_increase, solve_min_wage_increase,
+)
+
+SOLVERS = {
+    "wage_increase_annual": solve_min_wage_increase,
+    "sales_increase_annual": solve_min_sales_increase,
+    "cost_reduction_annual": solve_min_cost_reduction,
+}
+
+
+def _meets(plan, financial, target_av, target_sal) -> bool:
+    if not plan.all_requirements_met:
+        return False
+    if target_av is not None and financial.added_value > 0 and plan.added_value_growth_rate < target_av:
+        return False
+    if target_sal is not None and financial.salary_total > 0 and plan.salary_growth_rate < target_sal:
+        return False
+    return True
+
+
+def random_case(rng: random.Random):
+    financial = FinancialData(
+        sales=rng.choice([0, rng.randint(1, 10**9)]),
+        operating_profit=rng.randint(-10**7, 10**7),
+        depreciation=rng.randint(0, 10**6),
+        personnel_cost=rng.randint(0, 10**8),
+        salary_total=rng.choice([0, rng.randint(1, 10**8)]),
+    )
+    fixed = {
+        "sales_increase_annual": rng.randint(0, 10**7),
+        "cost_reduction_annual": rng.randint(0, 10**6),
+        "wage_increase_annual": rng.randint(0, 10**6),
+        "new_depreciation": rng.randint(0, 10**6),
+    }
+    targets = {
+        "target_added_value_rate": rng.choice([None, rng.uniform(0, 30)]),
+        "target_salary_rate": rng.choice([None, rng.uniform(0, 30)]),
+    }
+    return financial, fixed, targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cases = [random_case(rng) for _ in range(args.n)]
+
+    for name, solver in SOLVERS.items():
+        calls = [
+            (financial, {k: v for k, v in fixed.items() if k != name}, targets)
+            for financial, fixed, targets in cases
+        ]
+        start = time.perf_counter()
+        results = [solver(f, **kw, **t) for f, kw, t in calls]
+        per_call_us = (time.perf_counter() - start) / len(calls) * 1e6
+
+        errors = 0
+        for (financial, kw, targets), result in zip(calls, results):
+            check = [result.minimum] if result.feasible else [10**12]
+            if result.feasible and result.minimum > 0:
+                check.append(result.minimum - 1)
+            for value, expected in zip(check, [result.feasible, False]):
+                plan = calculate_3year_plan(financial, **kw, **{name: value})
+                if _meets(plan, financial, targets["target_added_value_rate"],
+                          targets["target_salary_rate"]) != expected:
+                    errors += 1
+        feasible = sum(r.feasible for r in results)
+        print(f"{name:<24} {per_call_us:6.2f} us/call  達成可能 {feasible:,}/{len(results):,}  不一致 {errors}")
+        if errors:
+            raise SystemExit(f"{name}: 計算モデルと {errors}件 不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""3年計画シナリオ一括計算のベンチマーク
+
+calculate_3year_plan_batch でN通りのパラメータを計算し、全件を
+calculate_3year_plan（スカラー版）の結果と突き合わせる。
+
+    python -m benchmarks.bench_scenario_sweep [-n 100000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from modules.subsidy.kagawa_mirai.calculate_plan import FinancialData, calculate_3year_plan
+from modules.subsidy.kagawa_mirai.scenario_engine import (
+    SCENARIO_PARAMS, calculate_3year_plan_batch,
+)
+
+FINANCIAL = FinancialData(
+    sales=80_000_000, operating_profit=2_500_000, depreciation=1_800_000,
+    personnel_cost=24_000_000, salary_total=20_000_000, employee_count=8,
+)
+
+
+def random_scenarios(n: int, seed: int = 0) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return {
+        "sales_increase_annual": rng.integers(-2_000_000, 10_000_000, n),
+        "cost_reduction_annual": rng.integers(-500_000, 3_000_000, n),
+        "wage_increase_annual": rng.integers(-300_000, 1_500_000, n),
+        "new_depreciation": rng.integers(0, 1_000_000, n),
+        "employee_change": rng.integers(-5, 6, n),
+        "growth_start_year": rng.integers(1, 3, n),
+    }
+
+
+def check_against_scalar(params: dict[str, np.ndarray], batch) -> int:
+    """全件をスカラー版と比較し、不一致の件数を返す"""
+    mismatches = 0
+    columns = [params[name].tolist() for name in SCENARIO_PARAMS]
+    for i, values in enumerate(zip(*columns)):
+        plan = calculate_3year_plan(FINANCIAL, **dict(zip(SCENARIO_PARAMS, values)))
+        got = batch.to_plan(i)
+        if got.years != plan.years or (
+            got.added_value_increasing, got.salary_increasing, got.all_requirements_met,
+            got.added_value_growth_rate, got.salary_growth_rate,
+        ) != (
+            plan.added_value_increasing, plan.salary_increasing, plan.all_requirements_met,
+            plan.added_value_growth_rate, plan.salary_growth_rate,
+        ):
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    params = random_scenarios(args.n)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        batch = calculate_3year_plan_batch(FINANCIAL, **params)
+        best = min(best, time.perf_counter() - start)
+    print(f"batch  : {args.n:,}件 {best * 1000:8.1f} ms")
+
+    columns = [params[name].tolist() for name in SCENARIO_PARAMS]
+    start = time.perf_counter()
+    for values in zip(*columns):
+        calculate_3year_plan(FINANCIAL, **dict(zip(SCENARIO_PARAMS, values)))
+    print(f"scalar : {args.n:,}件 {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    met = int(batch.requirements["all_requirements_met"].sum())
+    print(f"要件充足: {met:,}件 / {args.n:,}件")
+
+    mismatches = check_against_scalar(params, batch)
+    if mismatches:
+        raise SystemExit(f"スカラー版と {mismatches:,}件 不一致")
+    print("スカラー版と全件一致")
+
+
+if __name__ == "__main__":
+    main()
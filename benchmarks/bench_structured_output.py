@@ -0,0 +1,132 @@
+"""構造化出力（ツール呼び出し）と ```json ブロックの解析の比較
+
+同じ顧客群の文章生成を2つの方式で行って応答を記録し（FixtureStore）、記録済みの
+応答について次を数える。
+
+- text: 従来の方式（応答の ```json ブロック・本文中のJSONを解析）
+- tool: SECTIONS_TOOL / PARTIAL_SECTIONS_TOOL の呼び出しを強制し、引数を読む
+
+集計するのは、記録された応答ごとの解析失敗（max_tokens で切れた応答を除き、
+求めたセクションが取り出せなかった割合）と、記録を再生したときの
+generate_texts_parallel の再試行回数・generate_texts（一括）の欠落率。
+
+既定では合成応答（SyntheticResponder。テキスト応答の一部を --malformed-rate の
+割合で解析できない形にする）を記録する。--record DIR で実際のAPIの応答を記録し
+（ANTHROPIC_API_KEY が必要）、--replay DIR で記録済みの応答だけを集計する。
+
+    python -m benchmarks.bench_structured_output [--customers 20] [--malformed-rate 0.1]
+"""
+
+import argparse
+import copy
+import re
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from anthropic import Anthropic
+from anthropic.types import Message
+
+from lib.anthropic_client import RateLimiter, _response_text, generate_text
+from lib.llm_backends import (
+    FixtureStore, OfflineClient, RecordingResponder, ReplayResponder, SyntheticResponder,
+)
+from lib.llm_metrics import get_metrics, metric_labels
+from modules.subsidy.kagawa_mirai import generate_texts, generate_texts_parallel, load_hearing_sheet
+from modules.subsidy.kagawa_mirai.ai_text_generator import SECTION_GROUPS, SECTION_KEYS, _parse_json_response
+
+from .bench_hearing_reader import build_typical_sheet
+
+MODES = ["text", "tool"]
+
+_REQUESTED_KEY = re.compile(r'"(section_\d_\d)":')
+
+
+def customers(n: int):
+    """会社名だけを変えた n 件のヒアリングデータ（プロンプトが顧客ごとに異なるように）"""
+    data = load_hearing_sheet(build_typical_sheet())
+    for i in range(n):
+        customer = copy.deepcopy(data)
+        customer.company.name = f"{data.company.name}{i}"
+        yield customer
+
+
+def run_mode(mode: str, client, n: int) -> dict:
+    """n 顧客分の並列生成と一括生成を実行し、再試行・欠落を数える"""
+    fn = partial(generate_text, client=client, use_cache=False, limiter=RateLimiter(rpm=10**6, tpm=10**9))
+    structured = mode == "tool"
+    run_id = f"{mode}-{id(client)}"
+    missing_parallel = missing_single = 0
+    with metric_labels(run=run_id):
+        for data in customers(n):
+            missing_parallel += len(SECTION_KEYS) - len(
+                generate_texts_parallel(data, fn, max_workers=4, structured=structured)
+            )
+            missing_single += len(SECTION_KEYS) - len(generate_texts(data, fn, structured=structured))
+    records = get_metrics().records(run=run_id)
+    return {
+        "requests": len(records),
+        "retries": sum(1 for r in records if r.labels.get("attempt", "0") != "0"),
+        "missing_parallel": missing_parallel,
+        "missing_single": missing_single,
+    }
+
+
+def parse_stats(store: FixtureStore) -> dict:
+    """記録された応答ごとの解析結果"""
+    stats = {"responses": 0, "truncated": 0, "parse_failures": 0}
+    for request, responses in store:
+        instruction = request["messages"][-1]["content"][-1]["text"]
+        keys = set(_REQUESTED_KEY.findall(instruction)) & set(SECTION_KEYS)
+        for response in responses:
+            stats["responses"] += 1
+            message = response["message"]
+            if message["stop_reason"] == "max_tokens":
+                stats["truncated"] += 1
+                continue
+            parsed = _parse_json_response(_response_text(Message.model_validate(message)))
+            if not keys <= parsed.keys():
+                stats["parse_failures"] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=20)
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="解析できないテキスト応答の割合")
+    parser.add_argument("--truncate-rate", type=float, default=0.02, help="max_tokens で切れる応答の割合")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", type=Path, help="実際のAPIの応答を記録する")
+    parser.add_argument("--replay", type=Path, help="記録済みの応答だけを集計する")
+    args = parser.parse_args()
+
+    root = args.replay or args.record or Path(tempfile.mkdtemp(prefix="structured_output_"))
+    stores = {mode: FixtureStore(root / mode) for mode in MODES}
+    if not args.replay:
+        if args.record:
+            source = Anthropic(max_retries=0)
+        else:
+            source = OfflineClient(SyntheticResponder(
+                ttft=0.0, tokens_per_second=10**6, malformed_rate=args.malformed_rate,
+                truncate_rate=args.truncate_rate, seed=args.seed,
+            ), sleep=lambda seconds: None)
+        for mode in MODES:
+            run_mode(mode, OfflineClient(RecordingResponder(stores[mode], source)), args.customers)
+        print(f"recorded to {root}")
+
+    groups = len(SECTION_GROUPS) * args.customers
+    print(f"{'mode':<5} {'resp':>5} {'trunc':>6} {'parse_fail':>10} {'req':>5} {'retries':>8} "
+          f"{'retry/grp':>9} {'miss_par':>8} {'miss_single':>11}")
+    for mode in MODES:
+        stats = parse_stats(stores[mode])
+        replay = run_mode(mode, OfflineClient(ReplayResponder(stores[mode], speed=0.0)), args.customers)
+        print(
+            f"{mode:<5} {stats['responses']:>5} {stats['truncated']:>6} "
+            f"{stats['parse_failures'] / max(stats['responses'], 1):>10.1%} {replay['requests']:>5} "
+            f"{replay['retries']:>8} {replay['retries'] / groups:>9.1%} "
+            f"{replay['missing_parallel']:>8} {replay['missing_single']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""テンプレートキャッシュのベンチマーク
+
+書類ごとの生成時間とディスクI/O（/proc/self/io の読み書きバイト数）を比べる
+（openpyxl / python-docx のライターで生成する）。
+
+- disk: 旧方式（書類ごとにテンプレートを shutil.copy2 でコピーし、コピーを解析し直す）
+- cache: TemplateCache（解析は1回だけ、書類ごとにメモリ上で複製）
+
+    python -m benchmarks.bench_template_cache [--repeat 20]
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import openpyxl
+from docx import Document
+
+from modules.subsidy.kagawa_mirai import calculate_all, load_hearing_sheet
+from modules.subsidy.kagawa_mirai.document_generator import (
+    copy_seiyakusho, generate_application_form, generate_business_plan, generate_checklist,
+)
+from modules.subsidy.kagawa_mirai.template_cache import TemplateCache
+
+from .bench_hearing_reader import build_typical_sheet
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "templates" / "kagawa_mirai"
+
+
+class DiskTemplates:
+    """旧方式と同じI/Oをする TemplateCache の代わり（コピーして読み直す）"""
+
+    def __init__(self, work_dir: str):
+        self.work_dir = Path(work_dir)
+
+    def _copy(self, path) -> Path:
+        dst = self.work_dir / f"copy_{Path(path).name}"
+        shutil.copy2(path, dst)
+        return dst
+
+    def raw(self, path) -> bytes:
+        return self._copy(path).read_bytes()
+
+    def workbook(self, path):
+        return openpyxl.load_workbook(self._copy(path))
+
+    def document(self, path):
+        return Document(str(self._copy(path)))
+
+
+def io_bytes() -> tuple[int, int]:
+    """このプロセスの累計の読み込み・書き込みバイト数（Linuxのみ、他は0）"""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return 0, 0
+    return int(counters["rchar"]), int(counters["wchar"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    # openpyxl の DrawingML の警告を毎回出さない
+    warnings.simplefilter("ignore", UserWarning)
+
+    data = load_hearing_sheet(build_typical_sheet())
+    calc = calculate_all(data)
+    documents = {
+        "交付申請書": lambda out, t: generate_application_form(data, out, TEMPLATE_DIR, calc.subsidy, calc.plan, t, "openpyxl"),
+        "事業計画書": lambda out, t: generate_business_plan(data, out, TEMPLATE_DIR, calc.subsidy, calc.plan, t, "openpyxl"),
+        "誓約書": lambda out, t: copy_seiyakusho(out, TEMPLATE_DIR, t),
+        "チェックリスト": lambda out, t: generate_checklist(data, out, TEMPLATE_DIR, calc.subsidy, calc.plan, t, "openpyxl"),
+    }
+
+    print(f"{'document':<10} {'mode':<6} {'median':>9} {'first':>9} {'read/doc':>10} {'write/doc':>10}")
+    with tempfile.TemporaryDirectory() as out:
+        modes = {"disk": DiskTemplates(out), "cache": TemplateCache()}
+        for name, generate in documents.items():
+            for mode, templates in modes.items():
+                times = []
+                read0, write0 = io_bytes()
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    generate(out, templates)
+                    times.append(time.perf_counter() - start)
+                read1, write1 = io_bytes()
+                print(
+                    f"{name:<10} {mode:<6} {statistics.median(times) * 1000:>7.1f}ms {times[0] * 1000:>7.1f}ms "
+                    f"{(read1 - read0) // args.repeat:>10,} {(write1 - write0) // args.repeat:>10,}"
+                )
+
+
+if __name__ == "__main__":
+    main()
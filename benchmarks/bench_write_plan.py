@@ -0,0 +1,65 @@
+"""書き込み計画（ドライラン・差分）のベンチマーク
+
+文章を1セクション編集したときに、何が変わるかを知るまでの時間を比べる。
+
+- render: 全書類を生成し直す（build_all_documents）
+- plan: 書き込み計画を作る（build_write_plan。テンプレートを開かない）
+- json: 計画をJSONにする（ドライランの出力）
+- diff: 編集前後の計画の差分（diff_plans）
+
+    python -m benchmarks.bench_write_plan [--repeat 200]
+"""
+
+import argparse
+import statistics
+import time
+import warnings
+from dataclasses import replace
+
+from modules.subsidy.kagawa_mirai import (
+    build_all_documents, build_write_plan, calculate_all, diff_plans, load_hearing_sheet,
+)
+
+from .bench_hearing_reader import build_typical_sheet
+from .bench_template_cache import TEMPLATE_DIR
+
+
+def measure(fn, repeat: int) -> float:
+    """中央値（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    # openpyxl の DrawingML の警告を毎回出さない
+    warnings.simplefilter("ignore", UserWarning)
+
+    data = load_hearing_sheet(build_typical_sheet())
+    calc = calculate_all(data)
+    before = build_write_plan(data, calc.subsidy, calc.plan)
+    edited = replace(data, generated_texts={**(data.generated_texts or {}), "section_2_1": "編集後の文章"})
+    after = build_write_plan(edited, calc.subsidy, calc.plan)
+    build_all_documents(edited, TEMPLATE_DIR, calc.subsidy, calc.plan)  # テンプレートを読み込んでおく
+
+    results = {
+        "render": measure(
+            lambda: build_all_documents(edited, TEMPLATE_DIR, calc.subsidy, calc.plan), max(args.repeat // 20, 3)
+        ),
+        "plan": measure(lambda: build_write_plan(edited, calc.subsidy, calc.plan), args.repeat),
+        "json": measure(after.to_json, args.repeat),
+        "diff": measure(lambda: diff_plans(before, after), args.repeat),
+    }
+    print(f"ops: {len(after.ops)}  json: {len(after.to_json()):,} bytes  changes: {len(diff_plans(before, after))}")
+    for name, seconds in results.items():
+        print(f"{name:<7} {seconds * 1e6:>10,.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Anthropic Messages API のローカル代替サーバー（検証用）
+
+POST /v1/messages を受け、リクエスト中の "section_*" の指定（"…（N字程度）"）から
+ダミーの本文JSONを返す（tool_choice でツール呼び出しを強制したリクエストには、
+同じ内容を tool_use ブロックの引数として返す）。cache_control の区切りを見てプロンプトキャッシュを
+模擬し、usage に input_tokens / cache_creation_input_tokens /
+cache_read_input_tokens を返す（トークン数は非ASCII 1字=1、ASCII 4字=1 で近似）。
+実際のAPIと同じく、書き込み中（応答が始まる latency 秒後まで）のキャッシュは読めない。
+stream=true のときは SSE で返す。
+
+Message Batches API（/v1/messages/batches）も模擬する。バッチは batch_delay 秒後に
+終了し、各リクエストは batch_failure_rate の確率で api_error になる。
+
+応答の合成は lib.llm_backends と共通。HTTPを経由しない確認には
+lib.llm_backends の SyntheticResponder を使う。
+
+    with StubAnthropicServer() as server:
+        client = Anthropic(base_url=server.url, api_key="stub")
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lib.llm_backends import PromptCacheModel, make_message, synthesize_content
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubAnthropicServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        stub = self.server
+        if path == "/v1/messages/batches":
+            self._send_json(200, stub.create_batch(body["requests"]))
+            return
+        if path != "/v1/messages":
+            self._not_found()
+            return
+
+        stub.requests.append(body)
+        # キャッシュの書き込みは到着時に始まり、応答が始まる（latency 秒後）まで読めない
+        usage = stub.cache_model.usage(body, ready_in=stub.latency)
+        if stub.latency:
+            time.sleep(stub.latency)
+        message = stub.make_message(body, usage)
+        if body.get("stream"):
+            self._stream(message, stub.chunk_chars)
+        else:
+            self._send_json(200, message)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[:3] != ["v1", "messages", "batches"] or len(parts) not in (4, 5):
+            self._not_found()
+            return
+        batch = self.server.batch_status(parts[3])
+        if batch is None:
+            self._not_found()
+        elif len(parts) == 4:
+            self._send_json(200, batch)
+        elif batch["processing_status"] != "ended":
+            self._not_found()
+        else:
+            data = "".join(
+                json.dumps(line, ensure_ascii=False) + "\n"
+                for line in self.server.batch_results(parts[3])
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/binary")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    def _stream(self, message: dict, chunk_chars: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def event(name: str, data: dict):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        block = message["content"][0]
+        usage = message["usage"]
+        event("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1},
+        }})
+        if block["type"] == "tool_use":
+            # ツール呼び出しは引数のJSONを分割して送る
+            text = json.dumps(block["input"], ensure_ascii=False)
+            start = {**block, "input": {}}
+            delta_type, field = "input_json_delta", "partial_json"
+        else:
+            text = block["text"]
+            start = {"type": "text", "text": ""}
+            delta_type, field = "text_delta", "text"
+        event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": start})
+        for i in range(0, len(text), chunk_chars):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": delta_type, field: text[i:i + chunk_chars]}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                "usage": {"output_tokens": usage["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+
+
+class StubAnthropicServer(ThreadingHTTPServer):
+    """別スレッドで動くローカル代替サーバー
+
+    Args:
+        port: 待ち受けポート（0で空きポート）
+        latency: 1リクエストあたりの応答遅延（秒）
+        chunk_chars: ストリーミング時の1チャンクの文字数
+        min_cache_tokens: キャッシュ対象になる前半の最小トークン数
+        batch_delay: バッチの投入から終了までの秒数
+        batch_failure_rate: バッチ内の各リクエストが api_error になる確率
+        seed: 失敗の抽選に使う乱数シード
+    """
+
+    daemon_threads = True
+    # 数十件の同時接続を受けられるように（既定の5では接続待ちで直列化する）
+    request_queue_size = 128
+
+    def __init__(self, port: int = 0, latency: float = 0.0, chunk_chars: int = 20,
+                 min_cache_tokens: int = 1024, batch_delay: float = 1.0,
+                 batch_failure_rate: float = 0.0, seed: int | None = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.cache_model = PromptCacheModel(min_cache_tokens)
+        self.batch_delay = batch_delay
+        self.batch_failure_rate = batch_failure_rate
+        self.requests: list[dict] = []
+        self.batches: dict[str, dict] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def make_message(self, body: dict, usage: dict | None = None) -> dict:
+        """リクエスト本文に対する応答メッセージ（usage は入力トークンの内訳。Noneならここで数える）"""
+        return make_message(body, synthesize_content(body), usage or self.cache_model.usage(body))
+
+    def create_batch(self, requests: list[dict]) -> dict:
+        """バッチを受け付ける（結果は投入時に決め、batch_delay 秒後に公開する）"""
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        results = []
+        with self._lock:
+            for request in requests:
+                if self._rng.random() < self.batch_failure_rate:
+                    result = {"type": "errored", "error": {
+                        "type": "error", "error": {"type": "api_error", "message": "simulated failure"},
+                    }}
+                else:
+                    result = {"type": "succeeded", "message": self.make_message(request["params"])}
+                results.append({"custom_id": request["custom_id"], "result": result})
+            self.batches[batch_id] = {
+                "created": datetime.now(timezone.utc),
+                "ends": time.monotonic() + self.batch_delay,
+                "results": results,
+            }
+        return self.batch_status(batch_id)
+
+    def batch_status(self, batch_id: str) -> dict | None:
+        """MessageBatch 形式の状態"""
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        ended = time.monotonic() >= batch["ends"]
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if ended:
+            for line in batch["results"]:
+                counts[line["result"]["type"]] += 1
+        else:
+            counts["processing"] = len(batch["results"])
+        created = batch["created"]
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": created.isoformat(),
+            "expires_at": (created + timedelta(hours=24)).isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id: str) -> list[dict]:
+        """結果の行（順不同であることを模擬して逆順で返す）"""
+        return list(reversed(self.batches[batch_id]["results"]))
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        return False
+
+
+if __name__ == "__main__":
+    with StubAnthropicServer(port=8089) as server:
+        print(f"listening on {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
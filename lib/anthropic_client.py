@@ -1,74 +1,1104 @@
 """Shared Anthropic API client for Streamlit apps."""
 
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
 import streamlit as st
-from anthropic import Anthropic
+from anthropic import (
+    DEFAULT_CONNECTION_LIMITS, Anthropic, APIConnectionError, APIStatusError,
+    AsyncAnthropic, DefaultAsyncHttpxClient,
+)
+
+from .llm_backends import AsyncOfflineClient, OfflineClient, installed_async_client, installed_client
+from .llm_metrics import CallRecord, get_metrics, metric_labels
 
 DEFAULT_MODEL = "claude-sonnet-4-20250514"
 
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get("ANTHROPIC_RESPONSE_CACHE")
+    or Path.home() / ".cache" / "subsidy-ai-apps" / "llm_responses.sqlite3"
+)
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_TTL = 30 * 24 * 3600
+# Only complete replies are cached; a reply cut off at max_tokens would be
+# replayed on every retry.
+CACHEABLE_STOP_REASONS = {"end_turn", "tool_use"}
+
+DEFAULT_RPM = int(os.environ.get("ANTHROPIC_RPM", "50"))
+DEFAULT_TPM = int(os.environ.get("ANTHROPIC_TPM", "40000"))
+
+# Lower value is served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Connection pool of the async client (one per event loop)
+ASYNC_MAX_CONNECTIONS = 64
+ASYNC_MAX_KEEPALIVE = 32
+
+
+class ResponseCache:
+    """Persistent cache of API responses, keyed by the full request.
+
+    Backed by SQLite, so it is shared by all Streamlit sessions and batch
+    worker processes on the machine. Entries older than ttl seconds are
+    ignored and purged; when the total size exceeds max_bytes the least
+    recently used entries are dropped.
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        ttl: float | None = DEFAULT_CACHE_TTL,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def key_for(
+        model: str,
+        system: str | list,
+        messages: list,
+        max_tokens: int,
+        temperature: float | None = None,
+        tool: dict | None = None,
+    ) -> str:
+        """Hash of everything that determines the response."""
+        parts = [model, system, messages, max_tokens, temperature]
+        if tool is not None:
+            parts.append(tool)
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response, or None on a miss."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response and evict expired / least recently used entries."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            if self.ttl is not None:
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= old_size
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups in this process that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Hit/miss counts for this process and the size of the store."""
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+def cached_block(text: str) -> dict:
+    """A text content block marked as a prompt-cache breakpoint.
+
+    Everything up to and including this block (system prompt first, then
+    message content) is cached by the API and reused by later requests
+    that start with the same prefix.
+    """
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+@dataclass
+class TokenUsage:
+    """Accumulated token usage, split into uncached and cached input.
+
+    Pass ``usage.add`` as ``on_usage`` to generate_text/generate_streaming.
+    Safe to share between threads.
+    """
+    requests: int = 0
+    input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    output_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, usage):
+        """Add the ``usage`` of one API response."""
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += usage.input_tokens or 0
+            self.cache_creation_input_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+            self.cache_read_input_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+            self.output_tokens += usage.output_tokens or 0
+
+    @property
+    def total_input_tokens(self) -> int:
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    @property
+    def cached_ratio(self) -> float:
+        """Fraction of input tokens read from the prompt cache."""
+        total = self.total_input_tokens
+        return self.cache_read_input_tokens / total if total else 0.0
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by all callers.
+
+    Both budgets are token buckets that refill continuously. Waiters are
+    served strictly by (priority, arrival), so interactive requests go ahead
+    of queued batch requests. Token reservations are estimates and can be
+    corrected with settle() once the real usage is known.
+
+    Args:
+        rpm: Requests per minute.
+        tpm: Tokens (input + output) per minute.
+        clock: Monotonic clock in seconds (replaceable in tests).
+        wait: Function (condition, timeout) that waits on the held condition;
+            a fake clock can advance itself here instead of sleeping.
+    """
+
+    def __init__(
+        self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM, clock=time.monotonic, wait=None,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._clock = clock
+        self._wait = wait or (lambda cond, timeout: cond.wait(timeout))
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = clock()
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        # Async waiters (loop, event), woken alongside the condition
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _notify(self):
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _delay(self, tokens: int) -> float:
+        """Seconds until a request of this size fits both budgets (0 if it fits now)."""
+        self._refill()
+        need_requests = max(0.0, 1 - self._requests) * 60 / self.rpm
+        need_tokens = max(0.0, tokens - self._tokens) * 60 / self.tpm
+        return max(need_requests, need_tokens)
+
+    def _clamp(self, tokens: int) -> int:
+        return max(0, min(int(tokens), self.tpm))
+
+    def try_acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Take capacity if available without waiting.
+
+        Returns 0.0 when granted, otherwise the seconds to wait before the
+        budgets could cover this request. Never succeeds while a
+        higher-priority caller is waiting.
+        """
+        tokens = self._clamp(tokens)
+        with self._cond:
+            if self._queue and self._queue[0][0] < priority:
+                return self._delay(tokens) or 60 / self.rpm
+            delay = self._delay(tokens)
+            if delay == 0.0:
+                self._take(tokens)
+            return delay
+
+    def _take(self, tokens: int):
+        self._requests -= 1
+        self._tokens -= tokens
+        self.granted += 1
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Block until the request fits both budgets and it is next in line.
+
+        Returns:
+            Seconds waited.
+        """
+        tokens = self._clamp(tokens)
+        entry = (priority, next(self._seq))
+        start = self._clock()
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    if self._queue[0] == entry:
+                        delay = self._delay(tokens)
+                        if delay == 0.0:
+                            self._take(tokens)
+                            break
+                        self._wait(self._cond, delay)
+                    else:
+                        self._wait(self._cond, None)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._notify()
+            waited = self._clock() - start
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    async def aacquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Async acquire: same queue and budgets, waiting with asyncio.sleep.
+
+        Returns:
+            Seconds waited.
+        """
+        tokens = self._clamp(tokens)
+        entry = (priority, next(self._seq))
+        start = self._clock()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    waiter[1].clear()
+                    delay = None
+                    if self._queue[0] == entry:
+                        delay = self._delay(tokens)
+                        if delay == 0.0:
+                            self._take(tokens)
+                            break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._notify()
+        with self._cond:
+            waited = self._clock() - start
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def settle(self, reserved: int, actual: int):
+        """Correct a reservation once the real token usage is known."""
+        with self._cond:
+            self._tokens = min(self.tpm, self._tokens + self._clamp(reserved) - actual)
+            self._notify()
+
+    def stats(self) -> dict:
+        """Queue depth and wait-time metrics."""
+        with self._cond:
+            self._refill()
+            depth = len(self._queue)
+            by_priority = {}
+            for priority, _ in self._queue:
+                by_priority[priority] = by_priority.get(priority, 0) + 1
+            return {
+                "queue_depth": depth,
+                "queue_by_priority": by_priority,
+                "granted": self.granted,
+                "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+                "max_wait": self.max_wait,
+                "requests_available": self._requests,
+                "tokens_available": self._tokens,
+            }
+
+
+def estimate_tokens(system, messages, max_tokens: int) -> int:
+    """Conservative token estimate for a request (1 token per character + max_tokens)."""
+    return len(json.dumps([system, messages], ensure_ascii=False)) + max_tokens
+
+
+def _usage_tokens(usage) -> int:
+    return (
+        (usage.input_tokens or 0)
+        + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+        + (getattr(usage, "cache_read_input_tokens", 0) or 0)
+        + (usage.output_tokens or 0)
+    )
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the error is transient (connection, timeout, conflict, 429 or 5xx)."""
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and (
+        error.status_code in (408, 409, 429) or error.status_code >= 500
+    )
+
+
+def _backoff_delay(error: Exception, attempt: int, base_delay: float, max_delay: float, rng) -> float:
+    delay = (rng or random).uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    retry_after = _retry_after(error)
+    return delay if retry_after is None else max(delay, retry_after)
+
+
+def call_with_backoff(
+    fn,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    sleep=time.sleep,
+    rng: random.Random | None = None,
+):
+    """Call fn(), retrying transient API errors with jittered exponential backoff.
+
+    A retry-after header on the error is honoured as the minimum wait.
+    Otherwise the wait is drawn uniformly from [0, min(max_delay, base * 2**attempt)].
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            sleep(_backoff_delay(e, attempt, base_delay, max_delay, rng))
+
+
+async def acall_with_backoff(
+    fn,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    sleep=asyncio.sleep,
+    rng: random.Random | None = None,
+):
+    """Async call_with_backoff: awaits fn() and sleeps without blocking the loop."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            await sleep(_backoff_delay(e, attempt, base_delay, max_delay, rng))
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter (ANTHROPIC_RPM / ANTHROPIC_TPM)."""
+    return RateLimiter()
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache at DEFAULT_CACHE_PATH."""
+    return ResponseCache()
+
+
+def _response_cache(use_cache: bool, client=None) -> ResponseCache | None:
+    """The response cache for a request, or None if it is not used.
+
+    Requests to an offline backend (installed or passed as client) never use
+    it: the key does not include the backend, so synthetic or replayed
+    replies would later be returned for real API requests.
+    """
+    offline = installed_client() is not None or isinstance(client, (OfflineClient, AsyncOfflineClient))
+    return get_response_cache() if use_cache and not offline else None
+
 
-@st.cache_resource
 def get_client() -> Anthropic:
-    """Get a cached Anthropic client instance."""
+    """Get a cached Anthropic client instance (or the installed offline backend)."""
+    return installed_client() or _get_api_client()
+
+
+def get_headless_client() -> Anthropic:
+    """Client for runs outside Streamlit: the offline backend, or ANTHROPIC_API_KEY."""
+    return installed_client() or Anthropic(max_retries=0)
+
+
+@st.cache_resource
+def _get_api_client() -> Anthropic:
     api_key = st.secrets.get("ANTHROPIC_API_KEY")
     if not api_key:
         st.error("ANTHROPIC_API_KEY が設定されていません。Secrets を確認してください。")
         st.stop()
-    return Anthropic(api_key=api_key)
+    # Retries are done by call_with_backoff, in step with the rate limiter
+    return Anthropic(api_key=api_key, max_retries=0)
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAnthropic]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> AsyncAnthropic:
+    """Get the AsyncAnthropic client of the running event loop.
+
+    The connection pool is bound to one event loop, so one client is cached
+    per loop. The API key is read from ANTHROPIC_API_KEY or the secrets.
+    The installed offline backend, if any, is returned instead.
+    """
+    offline = installed_async_client()
+    if offline is not None:
+        return offline
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            try:
+                api_key = st.secrets.get("ANTHROPIC_API_KEY")
+            except Exception:
+                api_key = None
+        # Same Limits class the SDK uses for its own default pool
+        limits = type(DEFAULT_CONNECTION_LIMITS)(
+            max_connections=ASYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+        )
+        client = AsyncAnthropic(
+            api_key=api_key, max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _record_call(model: str, mode: str, start: float, usage=None, **kwargs):
+    """Record a call in the metrics registry, with latency measured from start."""
+    latency = time.monotonic() - start
+    if usage is None:
+        record = CallRecord(model=model, mode=mode, latency=latency, **kwargs)
+    else:
+        record = CallRecord.from_usage(model, usage, mode=mode, latency=latency, **kwargs)
+    get_metrics().record(record)
+
+
+class _Request:
+    """One generate_* request: everything but the transport call.
+
+    The response cache lookup and store, the rate limiter reservation and the
+    metrics record are the same for the sync and async, text and streaming
+    variants; each variant only sends params with its own client.
+    """
+
+    def __init__(
+        self, mode, system_prompt, user_message, model, max_tokens, temperature,
+        use_cache, refresh, on_usage, priority, limiter, tool, client,
+    ):
+        self.mode = mode
+        self.model = model
+        messages = [{"role": "user", "content": user_message}]
+        self.cache = _response_cache(use_cache, client)
+        self.key = ResponseCache.key_for(model, system_prompt, messages, max_tokens, temperature, tool)
+        self.refresh = refresh
+        self.on_usage = on_usage
+        self.priority = priority
+        self.limiter = limiter or get_rate_limiter()
+        self.reserved = estimate_tokens(system_prompt, messages, max_tokens)
+        self.params = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "system": system_prompt,
+            "messages": messages,
+            **_sampling_params(temperature, tool),
+        }
+        self.start = time.monotonic()
+        self.queue_wait = 0.0
+
+    def cached(self) -> str | None:
+        """The cached reply (recorded as a hit), or None to call the API."""
+        if self.cache is None or self.refresh:
+            return None
+        text = self.cache.get(self.key)
+        if text is not None:
+            _record_call(self.model, self.mode, self.start, response_cache=True)
+        return text
+
+    def _granted(self, waited: float):
+        """Start timing an attempt once its reservation is granted.
+
+        Latency and ttft cover the attempt itself; the time spent waiting for
+        the limiter is kept apart in queue_wait (summed over attempts), and
+        backoff sleeps between attempts are in neither.
+        """
+        self.queue_wait += waited
+        self.start = time.monotonic()
+
+    @contextmanager
+    def reservation(self):
+        """Reserve tokens for one attempt; a failed attempt gives them back.
+
+        Every retry reserves again, so a reservation that is not returned
+        would be lost from the budget for good.
+        """
+        self._granted(self.limiter.acquire(self.reserved, self.priority))
+        try:
+            yield
+        except BaseException:
+            self.release()
+            raise
+
+    @asynccontextmanager
+    async def areservation(self):
+        self._granted(await self.limiter.aacquire(self.reserved, self.priority))
+        try:
+            yield
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        """Return the reservation of a request that got no usable response."""
+        self.limiter.settle(self.reserved, 0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def failed(self, error: Exception, **kwargs):
+        _record_call(
+            self.model, self.mode, self.start, error=type(error).__name__, queue_wait=self.queue_wait, **kwargs,
+        )
+
+    def finish(self, message, text: str, **kwargs) -> str:
+        """Settle the reservation, record the call and store a complete reply."""
+        usage = message.usage
+        self.limiter.settle(self.reserved, _usage_tokens(usage))
+        _record_call(
+            self.model, self.mode, self.start, usage,
+            stop_reason=message.stop_reason, queue_wait=self.queue_wait, **kwargs,
+        )
+        if self.on_usage:
+            self.on_usage(usage)
+        if self.cache is not None and message.stop_reason in CACHEABLE_STOP_REASONS:
+            self.cache.put(self.key, text)
+        return text
+
+
+def _response_text(message) -> str:
+    """The reply as text: the forced tool call's input as JSON, else the text blocks."""
+    for block in message.content:
+        if block.type == "tool_use":
+            return json.dumps(block.input, ensure_ascii=False)
+    return "".join(block.text for block in message.content if block.type == "text")
+
+
+def _stream_chunks(stream):
+    """Text chunks of a stream; for a tool call, chunks of its input JSON."""
+    for event in stream:
+        if event.type == "text":
+            yield event.text
+        elif event.type == "input_json":
+            yield event.partial_json
+
+
+async def _astream_chunks(stream):
+    async for event in stream:
+        if event.type == "text":
+            yield event.text
+        elif event.type == "input_json":
+            yield event.partial_json
 
 
 def generate_text(
-    system_prompt: str,
-    user_message: str,
+    system_prompt: str | list[dict],
+    user_message: str | list[dict],
     model: str = DEFAULT_MODEL,
     max_tokens: int = 4096,
+    client: Anthropic | None = None,
+    temperature: float | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_usage=None,
+    priority: int = PRIORITY_INTERACTIVE,
+    limiter: RateLimiter | None = None,
+    tool: dict | None = None,
 ) -> str:
     """Generate text using the Anthropic API.
 
     Args:
-        system_prompt: System prompt to set context.
-        user_message: User's input message.
+        system_prompt: System prompt to set context, or a list of content
+            blocks (see cached_block for prompt-cache breakpoints).
+        user_message: User's input message, or a list of content blocks.
         model: Model to use.
         max_tokens: Maximum tokens in response.
+        client: Client to use instead of the session-cached one
+            (e.g. for headless batch runs).
+        temperature: Sampling temperature (None for the API default).
+        use_cache: Read and write the persistent response cache. Only complete
+            replies (CACHEABLE_STOP_REASONS) are written, and never while an
+            offline backend (lib.llm_backends) answers the request.
+        refresh: Skip the cache lookup and overwrite the entry
+            (deliberate regeneration).
+        on_usage: Callback(usage) with the API response's token usage
+            (not called on response-cache hits).
+        priority: Queue priority (PRIORITY_INTERACTIVE or PRIORITY_BATCH).
+        limiter: Rate limiter to use instead of the process-wide one.
+        tool: Tool definition the model is forced to call (structured output).
 
     Returns:
-        Generated text string.
-    """
-    client = get_client()
-    response = client.messages.create(
-        model=model,
-        max_tokens=max_tokens,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}],
+        Generated text string; with tool, the tool call's input as JSON.
+    """
+    request = _Request(
+        "text", system_prompt, user_message, model, max_tokens, temperature,
+        use_cache, refresh, on_usage, priority, limiter, tool, client,
     )
-    return response.content[0].text
+    cached = request.cached()
+    if cached is not None:
+        return cached
+
+    client = client or get_client()
+
+    def call():
+        with request.reservation():
+            return client.messages.create(**request.params)
+
+    try:
+        response = call_with_backoff(call)
+    except Exception as e:
+        request.failed(e)
+        raise
+    return request.finish(response, _response_text(response))
+
+
+def _sampling_params(temperature: float | None, tool: dict | None = None) -> dict:
+    params = {} if temperature is None else {"temperature": temperature}
+    if tool is not None:
+        params["tools"] = [tool]
+        params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+    return params
 
 
 def generate_streaming(
-    system_prompt: str,
-    user_message: str,
+    system_prompt: str | list[dict],
+    user_message: str | list[dict],
     model: str = DEFAULT_MODEL,
     max_tokens: int = 4096,
+    client: Anthropic | None = None,
+    temperature: float | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_usage=None,
+    priority: int = PRIORITY_INTERACTIVE,
+    limiter: RateLimiter | None = None,
+    tool: dict | None = None,
 ):
     """Generate text with streaming using the Anthropic API.
 
     Args:
-        system_prompt: System prompt to set context.
-        user_message: User's input message.
+        system_prompt: System prompt to set context, or a list of content blocks.
+        user_message: User's input message, or a list of content blocks.
         model: Model to use.
         max_tokens: Maximum tokens in response.
+        client: Client to use instead of the session-cached one.
+        temperature: Sampling temperature (None for the API default).
+        use_cache: Read and write the persistent response cache. A hit is
+            yielded as a single chunk; a stream is cached once it completes.
+        refresh: Skip the cache lookup and overwrite the entry.
+        on_usage: Callback(usage) with the final token usage of the stream.
+        priority: Queue priority (PRIORITY_INTERACTIVE or PRIORITY_BATCH).
+        limiter: Rate limiter to use instead of the process-wide one.
+        tool: Tool definition the model is forced to call (structured output).
 
     Yields:
-        Text chunks as they are generated.
-    """
-    client = get_client()
-    with client.messages.stream(
-        model=model,
-        max_tokens=max_tokens,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_message}],
-    ) as stream:
-        for text in stream.text_stream:
+        Text chunks as they are generated; with tool, chunks of the input JSON.
+    """
+    request = _Request(
+        "stream", system_prompt, user_message, model, max_tokens, temperature,
+        use_cache, refresh, on_usage, priority, limiter, tool, client,
+    )
+    cached = request.cached()
+    if cached is not None:
+        yield cached
+        return
+
+    client = client or get_client()
+
+    def open_stream():
+        with request.reservation():
+            manager = client.messages.stream(**request.params)
+            return manager, manager.__enter__()
+
+    # Only opening the stream is retried; an error mid-stream is raised
+    try:
+        manager, stream = call_with_backoff(open_stream)
+    except Exception as e:
+        request.failed(e)
+        raise
+    chunks = []
+    ttft = None
+    try:
+        for text in _stream_chunks(stream):
+            if ttft is None:
+                ttft = request.elapsed()
+            chunks.append(text)
+            yield text
+        message = stream.get_final_message()
+    except BaseException as e:
+        # Also when the consumer stops early (GeneratorExit) or the run is
+        # stopped (Streamlit's rerun/stop exceptions are BaseException)
+        request.release()
+        request.failed(e, ttft=ttft)
+        raise
+    finally:
+        manager.__exit__(None, None, None)
+    request.finish(message, "".join(chunks), ttft=ttft)
+
+
+async def agenerate_text(
+    system_prompt: str | list[dict],
+    user_message: str | list[dict],
+    model: str = DEFAULT_MODEL,
+    max_tokens: int = 4096,
+    client: AsyncAnthropic | None = None,
+    temperature: float | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_usage=None,
+    priority: int = PRIORITY_INTERACTIVE,
+    limiter: RateLimiter | None = None,
+    tool: dict | None = None,
+) -> str:
+    """Async generate_text on the event loop's AsyncAnthropic client.
+
+    Takes the same arguments as generate_text and shares its response cache,
+    rate limiter and backoff, so many requests can be awaited concurrently
+    (e.g. with asyncio.gather) from a single thread.
+    """
+    request = _Request(
+        "text", system_prompt, user_message, model, max_tokens, temperature,
+        use_cache, refresh, on_usage, priority, limiter, tool, client,
+    )
+    cached = request.cached()
+    if cached is not None:
+        return cached
+
+    client = client or get_async_client()
+
+    async def call():
+        async with request.areservation():
+            return await client.messages.create(**request.params)
+
+    try:
+        response = await acall_with_backoff(call)
+    except Exception as e:
+        request.failed(e)
+        raise
+    return request.finish(response, _response_text(response))
+
+
+async def agenerate_streaming(
+    system_prompt: str | list[dict],
+    user_message: str | list[dict],
+    model: str = DEFAULT_MODEL,
+    max_tokens: int = 4096,
+    client: AsyncAnthropic | None = None,
+    temperature: float | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_usage=None,
+    priority: int = PRIORITY_INTERACTIVE,
+    limiter: RateLimiter | None = None,
+    tool: dict | None = None,
+):
+    """Async generate_streaming.
+
+    Yields:
+        Text chunks as they are generated (async generator).
+    """
+    request = _Request(
+        "stream", system_prompt, user_message, model, max_tokens, temperature,
+        use_cache, refresh, on_usage, priority, limiter, tool, client,
+    )
+    cached = request.cached()
+    if cached is not None:
+        yield cached
+        return
+
+    client = client or get_async_client()
+
+    async def open_stream():
+        async with request.areservation():
+            manager = client.messages.stream(**request.params)
+            return manager, await manager.__aenter__()
+
+    # Only opening the stream is retried; an error mid-stream is raised
+    try:
+        manager, stream = await acall_with_backoff(open_stream)
+    except Exception as e:
+        request.failed(e)
+        raise
+    chunks = []
+    ttft = None
+    try:
+        async for text in _astream_chunks(stream):
+            if ttft is None:
+                ttft = request.elapsed()
+            chunks.append(text)
             yield text
+        message = await stream.get_final_message()
+    except BaseException as e:
+        # Also when the consumer stops early (GeneratorExit) or the run is
+        # stopped (Streamlit's rerun/stop exceptions are BaseException)
+        request.release()
+        request.failed(e, ttft=ttft)
+        raise
+    finally:
+        await manager.__aexit__(None, None, None)
+    request.finish(message, "".join(chunks), ttft=ttft)
+
+
+# Errors worth resubmitting (transient); anything else is reported as failed.
+RETRYABLE_BATCH_ERRORS = {"api_error", "overloaded_error", "rate_limit_error"}
+
+
+@dataclass
+class BatchRequest:
+    """One request in a Message Batch, matched to its result by custom_id.
+
+    custom_id must be 1-64 characters of letters, digits, "-" and "_".
+    """
+    custom_id: str
+    system_prompt: str | list[dict]
+    user_message: str | list[dict]
+    model: str = DEFAULT_MODEL
+    max_tokens: int = 4096
+    temperature: float | None = None
+    tool: dict | None = None
+
+    @property
+    def messages(self) -> list[dict]:
+        return [{"role": "user", "content": self.user_message}]
+
+    def params(self) -> dict:
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "system": self.system_prompt,
+            "messages": self.messages,
+            **_sampling_params(self.temperature, self.tool),
+        }
+
+    def cache_key(self) -> str:
+        return ResponseCache.key_for(
+            self.model, self.system_prompt, self.messages, self.max_tokens, self.temperature, self.tool,
+        )
+
+
+@dataclass
+class BatchResult:
+    """Outcome of run_message_batch.
+
+    Attributes:
+        texts: custom_id -> response text for succeeded requests.
+        errors: custom_id -> error for requests that failed after all resubmissions.
+        batch_ids: IDs of the batches submitted (one per round).
+        cache_hits: Requests answered from the response cache without submitting.
+        usage: Token usage of the succeeded requests.
+    """
+    texts: dict[str, str] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    batch_ids: list[str] = field(default_factory=list)
+    cache_hits: int = 0
+    usage: TokenUsage = field(default_factory=TokenUsage)
+
+
+def run_message_batch(
+    requests: list[BatchRequest],
+    client: Anthropic | None = None,
+    poll_interval: float = 60.0,
+    max_resubmits: int = 2,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_status=None,
+    sleep=time.sleep,
+) -> BatchResult:
+    """Run many requests through the Message Batches API.
+
+    Submits all requests as one batch, polls until it has ended, and maps
+    results back by custom_id. Requests that errored transiently, expired,
+    were canceled or are missing from the results are resubmitted in a new
+    batch, up to max_resubmits times. Cached responses are returned without
+    being submitted, and new complete responses are added to the cache.
+
+    Args:
+        requests: Requests with unique custom_ids.
+        client: Client to use instead of the session-cached one.
+        poll_interval: Seconds between status polls.
+        max_resubmits: Rounds of resubmission for failed requests.
+        use_cache: Read and write the persistent response cache.
+        refresh: Submit every request even if cached, and overwrite the entries.
+        on_status: Callback(batch) after each poll.
+        sleep: Sleep function (replaceable in tests).
+
+    Returns:
+        BatchResult with texts and errors keyed by custom_id.
+    """
+    result = BatchResult()
+    cache = _response_cache(use_cache, client)
+    pending = {}
+    for request in requests:
+        if request.custom_id in pending:
+            raise ValueError(f"Duplicate custom_id: {request.custom_id}")
+        cached = cache.get(request.cache_key()) if cache is not None and not refresh else None
+        if cached is not None:
+            result.texts[request.custom_id] = cached
+            result.cache_hits += 1
+            _record_call(request.model, "batch", time.monotonic(), response_cache=True,
+                         labels={"custom_id": request.custom_id})
+        else:
+            pending[request.custom_id] = request
+    if not pending:
+        return result
+
+    client = client or get_client()
+    for _ in range(max_resubmits + 1):
+        start = time.monotonic()
+        batch = call_with_backoff(lambda: client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": request.params()}
+            for custom_id, request in pending.items()
+        ]))
+        result.batch_ids.append(batch.id)
+        while batch.processing_status != "ended":
+            if on_status:
+                on_status(batch)
+            sleep(poll_interval)
+            batch = call_with_backoff(lambda: client.messages.batches.retrieve(batch.id))
+        if on_status:
+            on_status(batch)
+
+        retry = dict(pending)
+        for entry in client.messages.batches.results(batch.id):
+            request = retry.get(entry.custom_id)
+            if request is None:
+                continue
+            outcome = entry.result
+            if outcome.type == "succeeded":
+                text = _response_text(outcome.message)
+                result.texts[entry.custom_id] = text
+                result.errors.pop(entry.custom_id, None)
+                result.usage.add(outcome.message.usage)
+                _record_call(request.model, "batch", start, outcome.message.usage,
+                             stop_reason=outcome.message.stop_reason,
+                             labels={"custom_id": entry.custom_id})
+                if cache is not None and outcome.message.stop_reason in CACHEABLE_STOP_REASONS:
+                    cache.put(request.cache_key(), text)
+                del retry[entry.custom_id]
+            elif outcome.type == "errored":
+                error = outcome.error.error
+                result.errors[entry.custom_id] = f"{error.type}: {error.message}"
+                _record_call(request.model, "batch", start, error=error.type,
+                             labels={"custom_id": entry.custom_id})
+                if error.type not in RETRYABLE_BATCH_ERRORS:
+                    del retry[entry.custom_id]
+            else:
+                result.errors[entry.custom_id] = outcome.type
+        for custom_id in retry:
+            result.errors.setdefault(custom_id, "missing from batch results")
+
+        pending = retry
+        if not pending:
+            break
+    return result
+
+
+def _chain_context(initial_input: str, results: list[dict]) -> str:
+    """Input for the next agent: the initial input plus all previous outputs."""
+    if not results:
+        return initial_input
+    prev_outputs = "\n\n".join(
+        f"## {r['name']} の分析結果\n{r['output']}" for r in results
+    )
+    return f"{initial_input}\n\n---\n\n# これまでの分析結果\n\n{prev_outputs}"
+
+
+def _start_agent(agent: dict, initial_input: str, results: list[dict], on_agent_start) -> dict:
+    """Arguments of an agent's generate_text call (after the start callback)."""
+    if on_agent_start:
+        on_agent_start(agent["name"])
+    return {
+        "system_prompt": agent["system_prompt"],
+        "user_message": _chain_context(initial_input, results),
+    }
+
+
+def _complete_agent(name: str, output: str, results: list[dict], on_agent_complete):
+    results.append({"name": name, "output": output})
+    if on_agent_complete:
+        on_agent_complete(name, output)
 
 
 def multi_agent_chain(
@@ -78,6 +1108,8 @@ def multi_agent_chain(
     max_tokens: int = 4096,
     on_agent_start=None,
     on_agent_complete=None,
+    use_cache: bool = False,
+    refresh: bool = False,
 ) -> list[dict]:
     """Execute a chain of agents sequentially.
 
@@ -88,40 +1120,47 @@ def multi_agent_chain(
         max_tokens: Maximum tokens per agent response.
         on_agent_start: Callback(agent_name) when agent starts.
         on_agent_complete: Callback(agent_name, result) when agent completes.
+        use_cache: Read and write the persistent response cache (off by
+            default, so rerunning a chain analyses afresh).
+        refresh: Skip the cache lookup and overwrite the entries.
 
     Returns:
         List of dicts with 'name' and 'output' keys.
     """
     results = []
-    current_input = initial_input
-
     for agent in agents:
-        name = agent["name"]
-        system_prompt = agent["system_prompt"]
-
-        if on_agent_start:
-            on_agent_start(name)
-
-        context = current_input
-        if results:
-            prev_outputs = "\n\n".join(
-                f"## {r['name']} の分析結果\n{r['output']}" for r in results
+        request = _start_agent(agent, initial_input, results, on_agent_start)
+        with metric_labels(agent=agent["name"]):
+            output = generate_text(
+                **request, model=model, max_tokens=max_tokens, use_cache=use_cache, refresh=refresh,
             )
-            context = f"{initial_input}\n\n---\n\n# これまでの分析結果\n\n{prev_outputs}"
-
-        output = generate_text(
-            system_prompt=system_prompt,
-            user_message=context,
-            model=model,
-            max_tokens=max_tokens,
-        )
-
-        result = {"name": name, "output": output}
-        results.append(result)
+        _complete_agent(agent["name"], output, results, on_agent_complete)
+    return results
 
-        if on_agent_complete:
-            on_agent_complete(name, output)
 
-        current_input = context
+async def amulti_agent_chain(
+    agents: list[dict],
+    initial_input: str,
+    model: str = DEFAULT_MODEL,
+    max_tokens: int = 4096,
+    on_agent_start=None,
+    on_agent_complete=None,
+    client: AsyncAnthropic | None = None,
+    use_cache: bool = False,
+    refresh: bool = False,
+) -> list[dict]:
+    """Async multi_agent_chain.
 
+    The agents of one chain still run in order, but several chains can be
+    awaited concurrently on one event loop.
+    """
+    results = []
+    for agent in agents:
+        request = _start_agent(agent, initial_input, results, on_agent_start)
+        with metric_labels(agent=agent["name"]):
+            output = await agenerate_text(
+                **request, model=model, max_tokens=max_tokens, client=client,
+                use_cache=use_cache, refresh=refresh,
+            )
+        _complete_agent(agent["name"], output, results, on_agent_complete)
     return results
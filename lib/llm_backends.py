@@ -0,0 +1,690 @@
+"""Offline backends for lib.anthropic_client: record/replay and synthetic responses.
+
+A backend has the part of the Anthropic client interface this package uses
+(messages.create, messages.stream, messages.batches), returns real SDK
+response types, and is either passed as client= or installed process-wide
+so that get_client() / get_async_client() return it:
+
+    use_backend(SyntheticResponder(tokens_per_second=80))
+    use_backend(ReplayResponder(FixtureStore("fixtures/llm")))
+
+or, without code changes, with the ANTHROPIC_BACKEND environment variable:
+"synthetic", "replay:DIR" or "record:DIR".
+
+Requests answered by a backend bypass the persistent response cache of
+lib.anthropic_client, so offline replies never reach real runs.
+
+What a backend returns, and how long it takes, is decided by a responder:
+- RecordingResponder calls the real API and saves each response with its
+  timing to a FixtureStore.
+- ReplayResponder returns recorded responses by request hash, at the
+  recorded timing (scaled by speed).
+- SyntheticResponder makes up section JSON in the requested lengths (as
+  text, or as the tool call's input when the request forces a tool call),
+  with configurable latency, streaming cadence and injected failures.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+from anthropic import (
+    DEFAULT_CONNECTION_LIMITS, Anthropic, APIStatusError, InternalServerError, RateLimitError,
+)
+from anthropic.types import Message
+from anthropic.types.messages import MessageBatch, MessageBatchIndividualResponse
+
+# The HTTP library the installed SDK is built on (for error responses)
+_http = importlib.import_module(type(DEFAULT_CONNECTION_LIMITS).__module__.split(".")[0])
+
+_SECTION_SPEC = re.compile(r'"(section_\d_\d)": "[^"\n]*?（(\d+)字程度')
+_FILLER = "当社はこの設備の導入により作業時間を短縮する。"
+_PROSE = [
+    "現状の課題は、受注の増加に生産体制が追いついていないことである。",
+    "主要な顧客は県内の中小事業者であり、取引は長期にわたって安定している。",
+    "競合との差は、短納期と細かな要望への対応力にある。",
+    "今後3年間で売上高を1割程度伸ばす計画である。",
+    "リスクとしては、原材料価格の上昇と人材の確保が挙げられる。",
+    "これが当面の重点課題である。",
+]
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count: 1 per non-ASCII character, 1 per 4 ASCII characters."""
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def _blocks(content) -> list[dict]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return content
+
+
+def _prompt_text(params: dict) -> str:
+    return "".join(
+        block.get("text", "")
+        for message in params.get("messages", [])
+        for block in _blocks(message["content"])
+    )
+
+
+def synthesize_sections(params: dict) -> dict[str, str] | None:
+    """Filler text of the requested lengths for each section the prompt
+    specifies ("section_x": "…（N字程度）"), or None if it specifies none."""
+    targets = {key: int(chars) for key, chars in _SECTION_SPEC.findall(_prompt_text(params))}
+    if not targets:
+        return None
+    return {key: (_FILLER * (chars // len(_FILLER) + 1))[:chars] for key, chars in targets.items()}
+
+
+def synthesize_text(params: dict) -> str:
+    """Plausible reply text for a Messages API request.
+
+    Requests that specify sections get section JSON in a ```json block;
+    other requests get a few sentences of prose, varying with the prompt.
+    """
+    sections = synthesize_sections(params)
+    if sections is not None:
+        return "```json\n" + json.dumps(sections, ensure_ascii=False, indent=2) + "\n```"
+    prompt = _prompt_text(params)
+    seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+    chars = min(600, params.get("max_tokens", 1024) // 2)
+    text = ""
+    while len(text) < chars:
+        text += _PROSE[seed % len(_PROSE)]
+        seed = seed * 31 + 7
+    return text
+
+
+class PromptCacheModel:
+    """Simulates prompt caching: remembers prefixes up to each cache_control breakpoint.
+
+    As with the real API, a prefix written by a request can only be read once
+    that request's response begins. Requests that arrive while the write is
+    still in flight write the prefix again.
+
+    Args:
+        min_tokens: Minimum prefix length that is cached.
+        ttl: Seconds an entry lives after it was last used.
+        clock: Monotonic clock in seconds (replaceable in tests).
+    """
+
+    def __init__(self, min_tokens: int = 1024, ttl: float = 300.0, clock=time.monotonic):
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self._clock = clock
+        # digest -> (readable from, expires)
+        self._entries: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def usage(self, body: dict, ready_in: float = 0.0) -> dict:
+        """Input usage of a request; registers its cacheable prefixes.
+
+        ready_in is the time until the request's response begins; prefixes
+        it writes cannot be read before then.
+        """
+        blocks = [("system", b) for b in _blocks(body.get("system") or [])]
+        for message in body.get("messages", []):
+            blocks += [(message["role"], b) for b in _blocks(message["content"])]
+
+        # Tool definitions come first in the cached prefix
+        tools = json.dumps(body.get("tools") or [], ensure_ascii=False, sort_keys=True)
+        h = hashlib.sha256(body.get("model", "").encode() + tools.encode())
+        tokens = count_tokens(tools) if body.get("tools") else 0
+        breakpoints = []
+        for role, block in blocks:
+            text = block.get("text", "")
+            h.update(f"\0{role}\0{text}".encode())
+            tokens += count_tokens(text)
+            if block.get("cache_control") and tokens >= self.min_tokens:
+                breakpoints.append((h.hexdigest(), tokens))
+
+        now = self._clock()
+        with self._lock:
+            read = 0
+            for digest, prefix_tokens in breakpoints:
+                entry = self._entries.get(digest)
+                if entry is not None and entry[0] <= now < entry[1]:
+                    read = prefix_tokens
+            written = breakpoints[-1][1] - read if breakpoints else 0
+            for digest, _ in breakpoints:
+                entry = self._entries.get(digest)
+                ready = now + ready_in
+                if entry is not None and entry[1] > now:
+                    # Already readable, or the earlier write in flight finishes first
+                    ready = min(ready, entry[0])
+                self._entries[digest] = (ready, now + self.ttl)
+        return {
+            "input_tokens": tokens - read - written,
+            "cache_creation_input_tokens": written,
+            "cache_read_input_tokens": read,
+        }
+
+
+def forced_tool(params: dict) -> str | None:
+    """Name of the tool the request forces the model to call, if any."""
+    tool_choice = params.get("tool_choice") or {}
+    return tool_choice.get("name") if tool_choice.get("type") == "tool" else None
+
+
+def synthesize_content(params: dict) -> str | dict:
+    """Reply for a request: the tool call's input (dict) when a tool call is
+    forced, else text (see synthesize_text)."""
+    if forced_tool(params):
+        return synthesize_sections(params) or {}
+    return synthesize_text(params)
+
+
+def make_message(params: dict, content: str | dict, usage: dict, stop_reason: str | None = None) -> dict:
+    """Messages API response body for a text reply (str) or a call of the
+    forced tool with the given input (dict)."""
+    if isinstance(content, dict):
+        blocks = [{
+            "type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+            "name": forced_tool(params), "input": content,
+        }]
+        output = json.dumps(content, ensure_ascii=False)
+    else:
+        blocks = [{"type": "text", "text": content}]
+        output = content
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", ""),
+        "content": blocks,
+        "stop_reason": stop_reason or ("tool_use" if isinstance(content, dict) else "end_turn"),
+        "stop_sequence": None,
+        "usage": {**usage, "output_tokens": count_tokens(output)},
+    }
+
+
+def api_error(status_code: int, message: str = "simulated failure", retry_after: float | None = None):
+    """An APIStatusError as the SDK would raise it for the given status code."""
+    request = _http.Request("POST", "https://api.anthropic.com/v1/messages")
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(status_code, "api_error")
+    body = {"type": "error", "error": {"type": error_type, "message": message}}
+    response = _http.Response(status_code, headers=headers, json=body, request=request)
+    cls = RateLimitError if status_code == 429 else InternalServerError if status_code >= 500 else APIStatusError
+    return cls(message, response=response, body=body)
+
+
+@dataclass
+class Reply:
+    """A response body and the timing to play it back with.
+
+    Attributes:
+        message: Messages API response body.
+        latency: Seconds until the complete response.
+        ttft: Seconds until the first chunk when streaming.
+        chunk_chars: Characters per streamed chunk.
+    """
+
+    message: dict
+    latency: float = 0.0
+    ttft: float = 0.0
+    chunk_chars: int = 20
+
+
+def request_key(params: dict) -> str:
+    """Hash identifying a request (everything but the stream flag and metadata)."""
+    payload = {k: v for k, v in params.items() if k not in ("stream", "metadata")}
+    return hashlib.sha256(
+        json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class FixtureStore:
+    """Directory of recorded responses, one JSON file per request hash.
+
+    A request sent several times (e.g. retried) keeps all its responses in
+    order, so a replay sees the same sequence.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def _load(self, path: Path) -> dict | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get(self, params: dict, index: int = 0) -> dict | None:
+        """index-th recorded response {"message", "latency", "ttft"} (the last
+        one if fewer were recorded), or None."""
+        fixture = self._load(self._file(request_key(params)))
+        if not fixture or not fixture["responses"]:
+            return None
+        return fixture["responses"][min(index, len(fixture["responses"]) - 1)]
+
+    def put(self, params: dict, message: dict, latency: float, ttft: float):
+        """Append a response to the request's recording."""
+        path = self._file(request_key(params))
+        with self._lock:
+            fixture = self._load(path) or {"request": params, "responses": []}
+            fixture["responses"].append({"message": message, "latency": latency, "ttft": ttft})
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, ensure_ascii=False, indent=1, default=str)
+            os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.path.glob("*.json"))
+
+    def __iter__(self):
+        """(request, responses) of every recording."""
+        for path in sorted(self.path.glob("*.json")):
+            fixture = self._load(path)
+            if fixture:
+                yield fixture["request"], fixture["responses"]
+
+
+class FixtureMissingError(LookupError):
+    """A replayed request has no recorded response."""
+
+
+class SyntheticResponder:
+    """Makes up replies with realistic timing and injected failures.
+
+    Results are deterministic: each request's n-th attempt draws from a random
+    generator seeded with (seed, request hash, n), regardless of call order.
+
+    Args:
+        ttft: Seconds until the first output token.
+        tokens_per_second: Output speed; latency = ttft + output tokens / speed.
+        jitter: Relative spread of both times (uniform in ±jitter).
+        chunk_chars: Characters per streamed chunk.
+        failure_rate: Probability an attempt fails with failure_status.
+        failure_status: HTTP status of injected failures (429, 500, 529, ...).
+        retry_after: retry-after header of injected failures.
+        truncate_rate: Probability a reply is cut in half (stop_reason max_tokens);
+            for a tool call, the latter half of its input is missing.
+        malformed_rate: Probability a text reply with sections is written as
+            unparseable pseudo-JSON (single quotes, no ```json block). Tool
+            call input is always well-formed JSON, so this does not apply.
+        seed: Seed of the random draws.
+    """
+
+    def __init__(
+        self,
+        ttft: float = 0.6,
+        tokens_per_second: float = 60.0,
+        jitter: float = 0.2,
+        chunk_chars: int = 20,
+        failure_rate: float = 0.0,
+        failure_status: int = 529,
+        retry_after: float | None = None,
+        truncate_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.cache_model = PromptCacheModel()
+        self._attempts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, params: dict) -> random.Random:
+        key = request_key(params)
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    def respond(self, params: dict) -> Reply:
+        rng = self._rng(params)
+        if rng.random() < self.failure_rate:
+            raise api_error(self.failure_status, retry_after=self.retry_after)
+        content = synthesize_content(params)
+        stop_reason = None
+        if rng.random() < self.truncate_rate:
+            stop_reason = "max_tokens"
+            if isinstance(content, dict):
+                content = dict(list(content.items())[:len(content) // 2])
+            else:
+                content = content[:len(content) // 2]
+        sections = synthesize_sections(params)
+        if isinstance(content, str) and sections and rng.random() < self.malformed_rate:
+            content = "以下の通り作成しました。\n\n" + repr(sections)
+
+        def spread(value: float) -> float:
+            return value * rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+        ttft = spread(self.ttft)
+        message = make_message(params, content, self.cache_model.usage(params, ready_in=ttft), stop_reason)
+        latency = ttft + spread(message["usage"]["output_tokens"] / self.tokens_per_second)
+        return Reply(message, latency=latency, ttft=ttft, chunk_chars=self.chunk_chars)
+
+
+class ReplayResponder:
+    """Returns recorded responses by request hash.
+
+    Args:
+        store: Fixtures to replay.
+        speed: Multiplier of the recorded timing (0 for no waiting).
+        fallback: Responder for requests without a fixture (None raises
+            FixtureMissingError).
+        chunk_chars: Characters per streamed chunk.
+    """
+
+    def __init__(self, store: FixtureStore, speed: float = 1.0, fallback=None, chunk_chars: int = 20):
+        self.store = store
+        self.speed = speed
+        self.fallback = fallback
+        self.chunk_chars = chunk_chars
+        self._calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def respond(self, params: dict) -> Reply:
+        fixture = self.store.get(params, self._next_index(params))
+        if fixture is None:
+            if self.fallback is not None:
+                return self.fallback.respond(params)
+            raise FixtureMissingError(f"No recorded response for request {request_key(params)[:12]}")
+        return Reply(
+            fixture["message"],
+            latency=fixture["latency"] * self.speed,
+            ttft=fixture["ttft"] * self.speed,
+            chunk_chars=self.chunk_chars,
+        )
+
+    def _next_index(self, params: dict) -> int:
+        key = request_key(params)
+        with self._lock:
+            index = self._calls.get(key, 0)
+            self._calls[key] = index + 1
+        return index
+
+
+class RecordingResponder:
+    """Calls the real API (streaming, to measure time to first token) and records each reply."""
+
+    # Calls block on the network, so async backends run them in a thread
+    blocking = True
+
+    def __init__(self, store: FixtureStore, client: Anthropic):
+        self.store = store
+        self.client = client
+
+    def respond(self, params: dict) -> Reply:
+        start = time.monotonic()
+        ttft = None
+        with self.client.messages.stream(**params) as stream:
+            for event in stream:
+                if ttft is None and event.type in ("text", "input_json"):
+                    ttft = time.monotonic() - start
+            message = stream.get_final_message().model_dump(mode="json")
+        latency = time.monotonic() - start
+        self.store.put(params, message, latency, latency if ttft is None else ttft)
+        # The time has already been spent on the real call
+        return Reply(message)
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _events(reply: Reply) -> list[SimpleNamespace]:
+    """Stream events of a reply: "text" events, or "input_json" for a tool call."""
+    events = []
+    for block in reply.message["content"]:
+        if block["type"] == "tool_use":
+            for chunk in _chunks(json.dumps(block["input"], ensure_ascii=False), reply.chunk_chars):
+                events.append(SimpleNamespace(type="input_json", partial_json=chunk))
+        elif block["type"] == "text":
+            for chunk in _chunks(block["text"], reply.chunk_chars):
+                events.append(SimpleNamespace(type="text", text=chunk))
+    return events or [SimpleNamespace(type="text", text="")]
+
+
+class _Stream:
+    """Stand-in for MessageStream (also its own context manager)."""
+
+    def __init__(self, reply: Reply, sleep):
+        self._reply = reply
+        self._sleep = sleep
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        events = _events(self._reply)
+        gap = max(0.0, self._reply.latency - self._reply.ttft) / len(events)
+        self._sleep(self._reply.ttft)
+        for i, event in enumerate(events):
+            if i:
+                self._sleep(gap)
+            yield event
+
+    @property
+    def text_stream(self):
+        for event in self:
+            if event.type == "text":
+                yield event.text
+
+    def get_final_message(self) -> Message:
+        return Message.model_validate(self._reply.message)
+
+
+class _AsyncStream:
+    """Stand-in for AsyncMessageStream (also its own async context manager)."""
+
+    def __init__(self, respond, params: dict):
+        self._respond = respond
+        self._params = params
+        self._reply = None
+
+    async def __aenter__(self):
+        self._reply = await self._respond(self._params)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        events = _events(self._reply)
+        gap = max(0.0, self._reply.latency - self._reply.ttft) / len(events)
+        await asyncio.sleep(self._reply.ttft)
+        for i, event in enumerate(events):
+            if i:
+                await asyncio.sleep(gap)
+            yield event
+
+    @property
+    async def text_stream(self):
+        async for event in self:
+            if event.type == "text":
+                yield event.text
+
+    async def get_final_message(self) -> Message:
+        return Message.model_validate(self._reply.message)
+
+
+class _Batches:
+    """Stand-in for messages.batches: replies are computed at submission and
+    published batch_delay seconds later; a failed reply becomes an errored result."""
+
+    def __init__(self, responder, batch_delay: float):
+        self._responder = responder
+        self._batch_delay = batch_delay
+        self._batches: dict[str, dict] = {}
+
+    def create(self, requests: list[dict]) -> MessageBatch:
+        results = []
+        for request in requests:
+            try:
+                result = {"type": "succeeded", "message": self._responder.respond(request["params"]).message}
+            except APIStatusError as e:
+                error = e.body.get("error", {}) if isinstance(e.body, dict) else {}
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": error.get("type", "api_error"), "message": str(e),
+                }}}
+            results.append({"custom_id": request["custom_id"], "result": result})
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        self._batches[batch_id] = {
+            "created": datetime.now(timezone.utc),
+            "ends": time.monotonic() + self._batch_delay,
+            "results": results,
+        }
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id: str) -> MessageBatch:
+        batch = self._batches[batch_id]
+        ended = time.monotonic() >= batch["ends"]
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for line in batch["results"]:
+            counts[line["result"]["type"] if ended else "processing"] += 1
+        return MessageBatch.model_validate({
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": batch["created"],
+            "expires_at": batch["created"] + timedelta(hours=24),
+            "ended_at": datetime.now(timezone.utc) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": None,
+        })
+
+    def results(self, batch_id: str):
+        for line in self._batches[batch_id]["results"]:
+            yield MessageBatchIndividualResponse.model_validate(line)
+
+
+class _Messages:
+    def __init__(self, responder, sleep, batch_delay: float):
+        self._responder = responder
+        self._sleep = sleep
+        self.batches = _Batches(responder, batch_delay)
+
+    def create(self, **params) -> Message:
+        reply = self._responder.respond(params)
+        self._sleep(reply.latency)
+        return Message.model_validate(reply.message)
+
+    def stream(self, **params) -> _Stream:
+        return _Stream(self._responder.respond(params), self._sleep)
+
+
+class _AsyncMessages:
+    def __init__(self, responder):
+        self._responder = responder
+
+    async def _respond(self, params: dict) -> Reply:
+        if getattr(self._responder, "blocking", False):
+            return await asyncio.to_thread(self._responder.respond, params)
+        return self._responder.respond(params)
+
+    async def create(self, **params) -> Message:
+        reply = await self._respond(params)
+        await asyncio.sleep(reply.latency)
+        return Message.model_validate(reply.message)
+
+    def stream(self, **params) -> _AsyncStream:
+        return _AsyncStream(self._respond, params)
+
+
+class OfflineClient:
+    """Anthropic client stand-in backed by a responder.
+
+    Args:
+        responder: SyntheticResponder, ReplayResponder or RecordingResponder.
+        sleep: Sleep function used to play back timing (replaceable in tests).
+        batch_delay: Seconds from batch submission until it has ended.
+    """
+
+    def __init__(self, responder, sleep=time.sleep, batch_delay: float = 0.0):
+        self.responder = responder
+        self.messages = _Messages(responder, sleep, batch_delay)
+
+
+class AsyncOfflineClient:
+    """AsyncAnthropic client stand-in backed by a responder."""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.messages = _AsyncMessages(responder)
+
+
+_installed: tuple[OfflineClient, AsyncOfflineClient] | None = None
+_env_checked = False
+
+
+def use_backend(responder, **kwargs):
+    """Install a responder process-wide (None restores the real API).
+
+    Keyword arguments are passed to OfflineClient.
+    """
+    global _installed, _env_checked
+    _env_checked = True
+    _installed = None if responder is None else (OfflineClient(responder, **kwargs), AsyncOfflineClient(responder))
+
+
+def backend_from_env(value: str | None = None):
+    """Responder described by ANTHROPIC_BACKEND ("synthetic", "replay:DIR", "record:DIR")."""
+    value = value if value is not None else os.environ.get("ANTHROPIC_BACKEND", "")
+    kind, _, path = value.partition(":")
+    if not kind:
+        return None
+    if kind == "synthetic":
+        return SyntheticResponder()
+    if kind in ("replay", "record") and path:
+        store = FixtureStore(path)
+        if kind == "replay":
+            return ReplayResponder(store)
+        return RecordingResponder(store, Anthropic())
+    raise ValueError(f"Unknown ANTHROPIC_BACKEND: {value!r}")
+
+
+def _installed_clients():
+    global _env_checked
+    if not _env_checked:
+        _env_checked = True
+        responder = backend_from_env()
+        if responder is not None:
+            use_backend(responder)
+    return _installed
+
+
+def installed_client() -> OfflineClient | None:
+    """The installed offline client, or None when using the real API."""
+    clients = _installed_clients()
+    return clients[0] if clients else None
+
+
+def installed_async_client() -> AsyncOfflineClient | None:
+    """The installed async offline client, or None when using the real API."""
+    clients = _installed_clients()
+    return clients[1] if clients else None
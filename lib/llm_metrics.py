@@ -0,0 +1,226 @@
+"""Usage and latency metrics for LLM calls.
+
+Every call made through lib.anthropic_client is recorded as a CallRecord in
+the process-wide MetricsRegistry, which keeps recent records in memory and
+appends each one to a local JSONL file for aggregate views over time.
+
+Callers attach labels (customer, section, agent, run id, ...) with the
+metric_labels context manager; records made inside the block carry them.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_METRICS_PATH = Path(
+    os.environ.get("ANTHROPIC_METRICS_LOG")
+    or Path.home() / ".cache" / "subsidy-ai-apps" / "llm_calls.jsonl"
+)
+
+# USD per million tokens: (input, cache write, cache read, output), by model prefix
+MODEL_PRICES = {
+    "claude-opus-4": (15.0, 18.75, 1.50, 75.0),
+    "claude-sonnet-4": (3.0, 3.75, 0.30, 15.0),
+    "claude-3-7-sonnet": (3.0, 3.75, 0.30, 15.0),
+    "claude-3-5-haiku": (0.80, 1.0, 0.08, 4.0),
+}
+# Message Batches are billed at half price
+BATCH_DISCOUNT = 0.5
+
+_labels: contextvars.ContextVar[dict] = contextvars.ContextVar("llm_metric_labels", default={})
+
+
+@contextmanager
+def metric_labels(**labels):
+    """Attach labels to the calls recorded inside the block (nested blocks merge).
+
+    Labels follow the context: they reach asyncio tasks created inside the
+    block, and thread-pool work submitted via contextvars.copy_context().run.
+    """
+    token = _labels.set({**_labels.get(), **{k: str(v) for k, v in labels.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> dict:
+    return dict(_labels.get())
+
+
+@dataclass
+class CallRecord:
+    """One LLM call (or response-cache hit, or batch result)."""
+
+    model: str
+    mode: str = "text"  # text / stream / batch
+    labels: dict = field(default_factory=dict)
+    input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    output_tokens: int = 0
+    ttft: float | None = None
+    latency: float = 0.0
+    queue_wait: float = 0.0  # seconds waited for the rate limiter (not part of latency)
+    stop_reason: str | None = None
+    response_cache: bool = False
+    error: str | None = None
+    timestamp: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_usage(cls, model: str, usage, **kwargs) -> "CallRecord":
+        return cls(
+            model=model,
+            input_tokens=usage.input_tokens or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            output_tokens=usage.output_tokens or 0,
+            **kwargs,
+        )
+
+    @property
+    def cost(self) -> float | None:
+        """Estimated cost in USD (None for models without a known price)."""
+        prices = next((p for prefix, p in MODEL_PRICES.items() if self.model.startswith(prefix)), None)
+        if prices is None:
+            return None
+        cost = (
+            self.input_tokens * prices[0]
+            + self.cache_creation_input_tokens * prices[1]
+            + self.cache_read_input_tokens * prices[2]
+            + self.output_tokens * prices[3]
+        ) / 1_000_000
+        return cost * BATCH_DISCOUNT if self.mode == "batch" else cost
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CallRecord":
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in d.items() if k in names})
+
+
+class MetricsRegistry:
+    """Thread-safe in-memory registry of CallRecords with a JSONL sink.
+
+    Args:
+        path: JSONL file each record is appended to (None for memory only).
+        max_records: Records kept in memory (older ones stay in the file).
+    """
+
+    def __init__(self, path: Path | str | None = DEFAULT_METRICS_PATH, max_records: int = 10_000):
+        self.path = Path(path) if path else None
+        self._records: deque[CallRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(self, record: CallRecord):
+        """Add a record (labels from metric_labels are merged in)."""
+        record.labels = {**current_labels(), **record.labels}
+        with self._lock:
+            self._records.append(record)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(record.to_json() + "\n")
+                except OSError:
+                    pass  # metrics must never break generation
+
+    def records(self, since: float | None = None, **labels) -> list[CallRecord]:
+        """In-memory records, optionally newer than since and matching all labels."""
+        with self._lock:
+            records = list(self._records)
+        return [
+            r for r in records
+            if (since is None or r.timestamp >= since)
+            and all(r.labels.get(k) == str(v) for k, v in labels.items())
+        ]
+
+    def history(self, since: float | None = None) -> list[CallRecord]:
+        """All records in the JSONL sink (including other processes and past runs)."""
+        if not self.path or not self.path.exists():
+            return self.records(since)
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = CallRecord.from_dict(json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                if since is None or record.timestamp >= since:
+                    records.append(record)
+        return records
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """q-th percentile (0-100) with linear interpolation; None if empty."""
+    if not values:
+        return None
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(records: list[CallRecord]) -> dict:
+    """Totals and latency percentiles of records.
+
+    Latency percentiles cover API calls only (response-cache hits and batch
+    results are excluded since they have no comparable latency).
+    """
+    api = [r for r in records if not r.response_cache and r.error is None]
+    timed = [r for r in api if r.mode != "batch"]
+    costs = [r.cost for r in records]
+    return {
+        "calls": len(records),
+        "api_calls": len(api),
+        "response_cache_hits": sum(r.response_cache for r in records),
+        "errors": sum(r.error is not None for r in records),
+        "input_tokens": sum(r.input_tokens for r in records),
+        "cache_creation_input_tokens": sum(r.cache_creation_input_tokens for r in records),
+        "cache_read_input_tokens": sum(r.cache_read_input_tokens for r in records),
+        "output_tokens": sum(r.output_tokens for r in records),
+        "cost": sum(c for c in costs if c is not None),
+        "latency_p50": percentile([r.latency for r in timed], 50),
+        "latency_p95": percentile([r.latency for r in timed], 95),
+        "ttft_p50": percentile([r.ttft for r in timed if r.ttft is not None], 50),
+        "ttft_p95": percentile([r.ttft for r in timed if r.ttft is not None], 95),
+        "queue_wait_p95": percentile([r.queue_wait for r in timed], 95),
+    }
+
+
+def aggregate(records: list[CallRecord], label: str = "customer", period: str = "%Y-%m-%d") -> list[dict]:
+    """summarize() per (period, label value), newest period first.
+
+    Args:
+        records: Records to aggregate.
+        label: Label to group by (records without it are grouped as "").
+        period: strftime format of the time bucket (default: per day).
+    """
+    groups: dict[tuple[str, str], list[CallRecord]] = {}
+    for r in records:
+        bucket = datetime.fromtimestamp(r.timestamp).strftime(period)
+        groups.setdefault((bucket, r.labels.get(label, "")), []).append(r)
+    rows = [
+        {"period": bucket, label: value, **summarize(group)}
+        for (bucket, value), group in groups.items()
+    ]
+    rows.sort(key=lambda row: (row["period"], row[label]), reverse=True)
+    return rows
+
+
+@lru_cache(maxsize=None)
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide registry writing to DEFAULT_METRICS_PATH."""
+    return MetricsRegistry()
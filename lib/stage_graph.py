@@ -0,0 +1,141 @@
+"""Memoized stage graph for incremental recomputation across Streamlit reruns."""
+
+import hashlib
+import pickle
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+def fingerprint(value) -> str:
+    """Return a content hash of a value (bytes are hashed directly, others pickled)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        payload = bytes(value)
+    else:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class StageTiming:
+    """Timing of one stage in the current run."""
+    name: str
+    seconds: float
+    recomputed: bool
+
+
+@dataclass
+class _Stage:
+    name: str
+    deps: tuple
+    fn: Callable[..., Any]
+
+
+class StageGraph:
+    """A DAG of named stages, each memoized on a hash of its inputs.
+
+    Dependencies are either external inputs (set with set_input) or other
+    stages. A stage's key combines the fingerprints of its dependencies'
+    values, so a stage re-runs only when something it reads has actually
+    changed. An upstream stage that re-runs but returns an equal value
+    does not invalidate downstream stages.
+
+    Stage outputs are shared between runs and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._stages: dict[str, _Stage] = {}
+        self._inputs: dict[str, tuple] = {}
+        self._memo: dict[str, tuple] = {}
+        self._resolved: dict[str, tuple] = {}
+        self.timings: list[StageTiming] = []
+
+    def add_stage(self, name: str, fn, deps=()):
+        """Register a stage. fn is called with the dependency values in order.
+
+        Args:
+            name: Stage name.
+            fn: Callable taking one positional argument per dependency.
+            deps: Names of inputs or previously registered stages.
+        """
+        for dep in deps:
+            if dep not in self._stages and dep not in self._inputs:
+                self._inputs.setdefault(dep, (None, fingerprint(None)))
+        self._stages[name] = _Stage(name, tuple(deps), fn)
+
+    def set_input(self, name: str, value):
+        """Set an external input value.
+
+        The value is fingerprinted on every call, so an object mutated in
+        place and set again is seen as changed.
+        """
+        current = self._inputs.get(name)
+        digest = fingerprint(value)
+        self._inputs[name] = (value, digest)
+        if current is None or current[1] != digest:
+            self._resolved.clear()
+
+    def begin_run(self):
+        """Start a new run: clear per-run timings and resolution state."""
+        self._resolved.clear()
+        self.timings = []
+
+    def _key(self, stage: _Stage) -> str:
+        parts = [stage.name]
+        for dep in stage.deps:
+            if dep in self._stages:
+                parts.append(self._resolve(dep)[1])
+            else:
+                parts.append(self._inputs[dep][1])
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def _resolve(self, name: str, **kwargs) -> tuple:
+        """Return (value, fingerprint) of a stage, computing it if needed."""
+        if name in self._resolved and not kwargs:
+            return self._resolved[name]
+
+        stage = self._stages[name]
+        key = self._key(stage)
+        start = time.perf_counter()
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == key:
+            result = (memo[1], memo[2])
+            recomputed = False
+        else:
+            args = [
+                self._resolve(dep)[0] if dep in self._stages else self._inputs[dep][0]
+                for dep in stage.deps
+            ]
+            value = stage.fn(*args, **kwargs)
+            result = (value, fingerprint(value))
+            self._memo[name] = (key, *result)
+            recomputed = True
+
+        self._resolved[name] = result
+        self.timings.append(StageTiming(name, time.perf_counter() - start, recomputed))
+        return result
+
+    def get(self, name: str, **kwargs):
+        """Return the value of a stage, recomputing it and its upstream only if needed.
+
+        Extra keyword arguments (e.g. progress callbacks) are passed to this
+        stage's function when it runs and are not part of its key.
+        """
+        return self._resolve(name, **kwargs)[0]
+
+    def is_fresh(self, name: str) -> bool:
+        """Whether the memoized value of a stage matches its current inputs.
+
+        Upstream stages are resolved (and recomputed if needed), the stage
+        itself is not.
+        """
+        memo = self._memo.get(name)
+        return memo is not None and memo[0] == self._key(self._stages[name])
+
+    def invalidate(self, name: str | None = None):
+        """Drop the memoized value of one stage (or all stages)."""
+        if name is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(name, None)
+        self._resolved.clear()
@@ -10,34 +10,91 @@ from .data_models import (
     SubsidyExpenseItem,
     HearingData,
 )
-from .hearing_reader import read_hearing_sheet, hearing_to_prompt_data
+from .hearing_reader import read_hearing_sheet, load_hearing_sheet, hearing_to_prompt_data
+from .hearing_cache import HearingCache, get_default_cache, load_hearing_sheet_cached
+from .template_cache import TemplateCache, get_template_cache
 from .calculate_plan import (
     FinancialData,
     SubsidyExpense,
     SubsidyCalculation,
     ThreeYearPlan,
+    PlanYear,
+    PLAN_FIELDS,
     calculate_subsidy,
     calculate_3year_plan,
     estimate_depreciation,
     calculate_investment_payback,
 )
-from .document_generator import generate_all_documents
+from .scenario_engine import (
+    PlanBatch,
+    calculate_3year_plan_batch,
+    scenario_grid,
+)
+from .requirement_solver import (
+    RequirementSolution,
+    solve_min_wage_increase,
+    solve_min_sales_increase,
+    solve_min_cost_reduction,
+)
+from .risk_simulation import (
+    Uncertainty,
+    RiskReport,
+    simulate_plan_risk,
+)
+from .pipeline import (
+    PlanResult,
+    to_financial_data,
+    to_subsidy_expenses,
+    is_sales_over_1billion,
+    parse_useful_life,
+    compute_subsidy,
+    compute_plan,
+    calculate_all,
+)
+from .stages import build_stage_graph
+from .document_generator import (
+    build_all_documents, build_write_plan, document_executor, generate_all_documents, render_all_documents,
+)
+from .write_plan import WriteOp, WritePlan, PlanChange, diff_plans
 from .ai_text_generator import (
     generate_texts,
+    generate_texts_parallel,
+    generate_texts_streaming,
+    generate_texts_batch,
+    generate_section,
+    enforce_lengths,
+    length_violations,
+    LengthReport,
     SECTION_KEYS,
     SECTION_LABELS,
     SECTION_TARGET_CHARS,
+    TOTAL_TARGET_CHARS,
 )
 from .validator import validate_requirements
 
 __all__ = [
     "CompanyInfo", "PriceImpact", "BusinessPlan", "EffectPlan",
     "WagePlan", "FinancialInfo", "SubsidyExpenseItem", "HearingData",
-    "read_hearing_sheet", "hearing_to_prompt_data",
+    "read_hearing_sheet", "load_hearing_sheet", "hearing_to_prompt_data",
+    "HearingCache", "get_default_cache", "load_hearing_sheet_cached",
+    "TemplateCache", "get_template_cache",
     "FinancialData", "SubsidyExpense", "SubsidyCalculation", "ThreeYearPlan",
+    "PlanYear", "PLAN_FIELDS",
     "calculate_subsidy", "calculate_3year_plan", "estimate_depreciation",
     "calculate_investment_payback",
-    "generate_all_documents",
-    "generate_texts", "SECTION_KEYS", "SECTION_LABELS", "SECTION_TARGET_CHARS",
+    "PlanBatch", "calculate_3year_plan_batch", "scenario_grid",
+    "RequirementSolution", "solve_min_wage_increase",
+    "solve_min_sales_increase", "solve_min_cost_reduction",
+    "Uncertainty", "RiskReport", "simulate_plan_risk",
+    "PlanResult", "to_financial_data", "to_subsidy_expenses",
+    "is_sales_over_1billion", "parse_useful_life", "compute_subsidy",
+    "compute_plan", "calculate_all", "build_stage_graph",
+    "build_all_documents", "build_write_plan", "document_executor", "generate_all_documents",
+    "render_all_documents",
+    "WriteOp", "WritePlan", "PlanChange", "diff_plans",
+    "generate_texts", "generate_texts_parallel",
+    "generate_texts_streaming", "generate_texts_batch", "generate_section",
+    "enforce_lengths", "length_violations", "LengthReport",
+    "SECTION_KEYS", "SECTION_LABELS", "SECTION_TARGET_CHARS", "TOTAL_TARGET_CHARS",
     "validate_requirements",
 ]
@@ -3,12 +3,23 @@
 Claude APIを使って事業計画書のセクション2〜4の文章を生成する。
 """
 
+import contextvars
 import json
 import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from lib.anthropic_client import DEFAULT_MODEL, BatchRequest, cached_block, estimate_tokens, is_retryable
+from lib.llm_metrics import get_metrics, metric_labels
 
 from .data_models import HearingData
 from .hearing_reader import hearing_to_prompt_data
-from .generate_plan import build_full_prompt, SYSTEM_PROMPT
+from .generate_plan import (
+    build_context_prompt, build_section_instruction, build_regenerate_prompt,
+    build_adjust_prompt, FULL_PLAN_INSTRUCTION, FULL_PLAN_JSON_INSTRUCTION, SYSTEM_PROMPT,
+)
+from .section_stream import SectionStreamParser
 
 SECTION_KEYS = [
     "section_2_1", "section_2_2",
@@ -44,45 +55,478 @@ SECTION_TARGET_CHARS = {
     "section_4_6": 100,
 }
 
+# 合計文字数の目標
+TOTAL_TARGET_CHARS = (2500, 3500)
+
+# 目標文字数に対する許容幅（±20%）
+LENGTH_TOLERANCE = 0.2
+
+# 空でもよいセクション（書くべき内容がない場合）
+OPTIONAL_SECTIONS = {"section_4_6"}
+
+# 並列生成の単位（既定は1セクション1リクエスト）
+SECTION_GROUPS = [[key] for key in SECTION_KEYS]
+
+# max_tokens の見積もり: 日本語1字あたりのトークン数（余裕込み）とJSONの枠の分
+TOKENS_PER_CHAR = 2
+TOKENS_OVERHEAD = 256
+
+
+def sections_tool(required: list[str]) -> dict:
+    """セクションの文章を引数で受け取るツールの定義（構造化出力用）
 
-def generate_texts(data: HearingData, generate_text_fn) -> dict[str, str]:
+    プロパティは常に10セクション全部にする。どのリクエストもツール定義が同じなら、
+    プロンプトキャッシュの前半（ツール → システム → メッセージ）を共有できるため。
+    """
+    return {
+        "name": "write_sections",
+        "description": "事業計画書の各セクションの文章を書き込む。値は本文のみ（見出しは付けない）。",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                key: {"type": "string", "description": SECTION_LABELS[key]} for key in SECTION_KEYS
+            },
+            "required": required,
+        },
+    }
+
+
+# 10セクション一括生成用（全セクション必須）と、一部のセクションの生成用
+SECTIONS_TOOL = sections_tool(SECTION_KEYS)
+PARTIAL_SECTIONS_TOOL = sections_tool([])
+
+
+def build_messages(prompt_data: dict, instruction: str) -> tuple[list[dict], list[dict]]:
+    """(system, user_message) をプロンプトキャッシュの区切り付きブロックで組み立てる
+
+    SYSTEM_PROMPT と企業情報はどのリクエストでも同じ前半として送り、それぞれの
+    末尾をキャッシュの区切りにする。リクエストごとに異なるのは後半の指示だけ。
+    """
+    system = [cached_block(SYSTEM_PROMPT)]
+    user_message = [
+        cached_block(build_context_prompt(prompt_data)),
+        {"type": "text", "text": instruction},
+    ]
+    return system, user_message
+
+
+def section_max_tokens(keys: list[str]) -> int:
+    """セクションの目標文字数から max_tokens を見積もる"""
+    chars = sum(SECTION_TARGET_CHARS.get(key, 200) for key in keys)
+    return TOKENS_OVERHEAD + chars * TOKENS_PER_CHAR
+
+
+def generate_texts(data: HearingData, generate_text_fn, structured: bool = True) -> dict[str, str]:
     """Claude APIで10セクションの文章を一括生成
 
     Args:
         data: ヒアリングデータ
-        generate_text_fn: テキスト生成関数 (system_prompt, user_message) -> str
+        generate_text_fn: テキスト生成関数 (system_prompt, user_message, tool) -> str。
+            どちらのメッセージもコンテンツブロックのリストで渡す（build_messages 参照）。
+            tool（SECTIONS_TOOL）の呼び出しを強制し、その引数のJSONを返すもの
+        structured: ツール呼び出しで出力させる。False なら tool を渡さず、
+            ```json ブロックのテキスト応答を求める
 
     Returns:
         dict: セクションキー → 生成テキスト
     """
-    prompt_data = hearing_to_prompt_data(data)
-    full_prompt = build_full_prompt(prompt_data)
+    instruction = FULL_PLAN_INSTRUCTION if structured else FULL_PLAN_JSON_INSTRUCTION
+    system, user_message = build_messages(hearing_to_prompt_data(data), instruction)
+    tool_kwargs = {"tool": SECTIONS_TOOL} if structured else {}
+    with metric_labels(section="all"):
+        response = generate_text_fn(system_prompt=system, user_message=user_message, **tool_kwargs)
+
+    return _parse_json_response(response)
+
+
+def generate_texts_streaming(data: HearingData, stream_fn, on_section=None) -> dict[str, str]:
+    """10セクションを一括生成し、ストリーミング応答から閉じたセクションを順次取り出す
+
+    Args:
+        data: ヒアリングデータ
+        stream_fn: テキストをチャンクで返す生成関数 (system_prompt, user_message, tool) -> Iterator[str]
+        on_section: セクションの文字列が閉じるたびに呼ぶ関数 (key, text)
+
+    Returns:
+        dict: セクションキー → 生成テキスト
+    """
+    system, user_message = build_messages(hearing_to_prompt_data(data), FULL_PLAN_INSTRUCTION)
+    parser = SectionStreamParser(SECTION_KEYS)
+    with metric_labels(section="all"):
+        for chunk in stream_fn(system_prompt=system, user_message=user_message, tool=SECTIONS_TOOL):
+            # 閉じた後も最後まで読む（応答キャッシュへの保存は完走時に行われるため）
+            for key, text in parser.feed(chunk):
+                if on_section:
+                    on_section(key, text)
+    return {key: parser.sections[key] for key in SECTION_KEYS if key in parser.sections}
+
+
+def generate_texts_batch(
+    datas: dict[str, HearingData], submit_fn, model: str = DEFAULT_MODEL,
+) -> tuple[dict[str, dict[str, str]], dict[str, str]]:
+    """複数顧客の10セクション一括生成を1つのバッチジョブ（Message Batches）で実行
+
+    Args:
+        datas: 顧客キー → ヒアリングデータ
+        submit_fn: list[BatchRequest] -> BatchResult（run_message_batch を束縛したもの）
+        model: 使用するモデル
+
+    Returns:
+        (顧客キー → 生成テキスト, 顧客キー → エラー内容)
+    """
+    # custom_id は英数字のみのため、顧客キー（ファイル名）とは別に振る
+    ids = {f"client-{i}": key for i, key in enumerate(datas)}
+    requests = []
+    for custom_id, key in ids.items():
+        system, user_message = build_messages(hearing_to_prompt_data(datas[key]), FULL_PLAN_INSTRUCTION)
+        requests.append(BatchRequest(custom_id, system, user_message, model=model, tool=SECTIONS_TOOL))
+    result = submit_fn(requests)
+
+    texts, errors = {}, {}
+    for custom_id, key in ids.items():
+        if custom_id not in result.texts:
+            errors[key] = result.errors.get(custom_id, "結果がありません")
+            continue
+        parsed = _parse_json_response(result.texts[custom_id])
+        if parsed:
+            texts[key] = parsed
+        else:
+            errors[key] = "JSONの解析に失敗しました"
+    return texts, errors
+
+
+def generate_section(
+    data: HearingData, key: str, generate_text_fn, context_texts: dict[str, str] | None = None,
+) -> str:
+    """1セクションだけを生成し直す
 
-    response = generate_text_fn(
-        system_prompt=SYSTEM_PROMPT,
-        user_message=full_prompt,
+    そのセクションに必要なヒアリングデータ（SECTION_DATA）と、採用済みの前後の
+    セクションだけを送る。同じプロンプトでも別の文章が欲しいため、応答キャッシュは
+    使わない（refresh=True を渡す）。
+
+    Args:
+        data: ヒアリングデータ
+        key: セクションキー
+        generate_text_fn: テキスト生成関数 (system_prompt, user_message, max_tokens, refresh, tool) -> str
+        context_texts: 採用済みの文章（セクションキー → 文章）
+
+    Returns:
+        str: 生成テキスト
+
+    Raises:
+        ValueError: 未知のセクションキー、または応答を解析できない場合
+    """
+    if key not in SECTION_KEYS:
+        raise ValueError(f"未知のセクション: {key}")
+    context_texts = context_texts or {}
+    idx = SECTION_KEYS.index(key)
+    neighbours = {
+        SECTION_LABELS[k]: context_texts[k]
+        for k in SECTION_KEYS[max(0, idx - 1):idx + 2]
+        if k != key and context_texts.get(k)
+    }
+    prompt = build_regenerate_prompt(
+        hearing_to_prompt_data(data), key, SECTION_TARGET_CHARS.get(key, 200), neighbours,
     )
+    with metric_labels(section=key):
+        response = generate_text_fn(
+            system_prompt=[cached_block(SYSTEM_PROMPT)],
+            user_message=prompt,
+            max_tokens=section_max_tokens([key]),
+            refresh=True,
+            tool=PARTIAL_SECTIONS_TOOL,
+        )
+    result = _parse_json_response(response)
+    if key not in result:
+        raise ValueError("JSONの解析に失敗しました")
+    return result[key]
+
+
+def _generate_group(
+    prompt_data: dict, keys: list[str], generate_text_fn, max_retries: int, structured: bool = True,
+) -> dict[str, str]:
+    """1グループ分を生成
+
+    JSONの解析失敗・セクションの欠落と一時的なAPIエラーのときだけこのグループを再試行し、
+    それ以外のエラー（認証エラー・不正なリクエストなど）はすぐに送出する。
+    """
+    system, user_message = build_messages(
+        prompt_data,
+        build_section_instruction({key: SECTION_TARGET_CHARS.get(key, 200) for key in keys}, structured),
+    )
+    tool_kwargs = {"tool": PARTIAL_SECTIONS_TOOL} if structured else {}
+    last_error = None
+    for attempt in range(max_retries + 1):
+        # 再試行では応答キャッシュを使わない（同じ失敗応答が返るため）
+        retry_kwargs = {"refresh": True} if attempt else {}
+        try:
+            with metric_labels(section=",".join(keys), attempt=attempt):
+                response = generate_text_fn(
+                    system_prompt=system,
+                    user_message=user_message,
+                    max_tokens=section_max_tokens(keys),
+                    **tool_kwargs,
+                    **retry_kwargs,
+                )
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            last_error = e
+            continue
+        result = _parse_json_response(response)
+        if all(key in result for key in keys):
+            return {key: result[key] for key in keys}
+        last_error = ValueError(f"JSONの解析に失敗しました: {', '.join(keys)}")
+    raise last_error
 
-    return _parse_json_response(response)
+
+def generate_texts_parallel(
+    data: HearingData,
+    generate_text_fn,
+    groups: list[list[str]] | None = None,
+    max_workers: int | None = None,
+    max_retries: int = 2,
+    on_section=None,
+    prime: bool = True,
+    structured: bool = True,
+    on_error=None,
+) -> dict[str, str]:
+    """セクション（またはグループ）ごとに並列で文章を生成
+
+    全グループに同じ企業情報を渡し、max_tokens はグループの目標文字数から決める。
+
+    プロンプトキャッシュは書き込んだリクエストの応答が始まるまで読めないため、
+    全グループを同時に送ると全件がキャッシュの書き込み（入力の1.25倍の料金）になる。
+    prime のときは目標文字数の最も少ないグループを先に生成してキャッシュを書き、
+    それが終わってから残りを並列に送る（残りはキャッシュの読み込みになる）。
+    所要時間は最も短いグループと最も長いグループ（section_3_1）の生成時間の和程度になる。
+
+    Args:
+        data: ヒアリングデータ
+        generate_text_fn: テキスト生成関数 (system_prompt, user_message, max_tokens, tool) -> str。
+            再試行時は refresh=True も渡す
+        groups: 1リクエストで生成するセクションキーのリスト（Noneで SECTION_GROUPS）
+        max_workers: 同時リクエスト数（Noneでグループ数）
+        max_retries: グループごとの再試行回数
+        on_section: 完了したセクションごとに呼ぶ関数 (key, text)。呼び出し元のスレッドで呼ばれる
+        prime: 1グループを先に生成してプロンプトキャッシュを書いてから残りを送る
+        structured: ツール呼び出しで出力させる（False なら ```json ブロックのテキスト応答）
+        on_error: 失敗したグループごとに呼ぶ関数 (keys, exception)。呼び出し元のスレッドで呼ばれる
+
+    Returns:
+        dict: セクションキー → 生成テキスト（SECTION_KEYS順）。
+            再試行しても失敗したグループのキーは含まれない
+
+    Raises:
+        Exception: 全グループが失敗したときは最後に失敗したグループのエラー
+    """
+    groups = groups or SECTION_GROUPS
+    prompt_data = hearing_to_prompt_data(data)
+    results: dict[str, str] = {}
+    errors: list[Exception] = []
+
+    def collect(futures):
+        for fut in as_completed(futures):
+            try:
+                texts = fut.result()
+            except Exception as e:
+                errors.append(e)
+                if on_error:
+                    on_error(futures[fut], e)
+                continue
+            for key, text in texts.items():
+                results[key] = text
+                if on_section:
+                    on_section(key, text)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(groups)) as pool:
+        def submit(keys):
+            # 呼び出し元の metric_labels（顧客名など）をワーカースレッドに引き継ぐ
+            future = pool.submit(
+                contextvars.copy_context().run,
+                _generate_group, prompt_data, keys, generate_text_fn, max_retries, structured,
+            )
+            return future, keys
+
+        rest = list(groups)
+        if prime and len(groups) > 1:
+            first = min(groups, key=lambda keys: sum(SECTION_TARGET_CHARS.get(key, 200) for key in keys))
+            rest.remove(first)
+            collect(dict([submit(first)]))
+        collect(dict(submit(keys) for keys in rest))
+
+    if errors and not results:
+        raise errors[-1]
+    return {key: results[key] for key in SECTION_KEYS if key in results}
 
 
 def _parse_json_response(response: str) -> dict[str, str]:
-    """Claude APIのレスポンスからJSONを抽出"""
+    """Claude APIのレスポンスからJSONを抽出
+
+    ツール呼び出しの引数（JSONそのもの）を優先し、テキストで返った場合は
+    ```json ブロック、さらに本文中のJSONの順に探す。
+    """
+    try:
+        result = json.loads(response)
+    except json.JSONDecodeError:
+        result = None
+    if isinstance(result, dict):
+        return {k: v for k, v in result.items() if k in SECTION_KEYS and isinstance(v, str)}
+
     # ```json ... ``` ブロックを探す
     json_match = re.search(r"```json\s*\n?(.*?)\n?\s*```", response, re.DOTALL)
     if json_match:
-        json_str = json_match.group(1)
-    else:
-        # JSON部分を直接探す
-        json_match = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-        else:
-            return {}
+        try:
+            result = json.loads(json_match.group(1))
+            # 期待するキーの文字列のみ抽出
+            return {k: v for k, v in result.items() if k in SECTION_KEYS and isinstance(v, str)}
+        except (json.JSONDecodeError, AttributeError):
+            response = json_match.group(1)
 
-    try:
-        result = json.loads(json_str)
-        # 期待するキーのみ抽出
-        return {k: v for k, v in result.items() if k in SECTION_KEYS}
-    except json.JSONDecodeError:
-        return {}
+    # JSON部分を直接探す（線形時間で読み、閉じたセクションだけ取り出す）
+    parser = SectionStreamParser(SECTION_KEYS)
+    parser.feed(response)
+    return dict(parser.sections)
+
+
+def length_band(key: str, tolerance: float = LENGTH_TOLERANCE) -> tuple[int, int]:
+    """セクションの許容文字数 (下限, 上限)"""
+    target = SECTION_TARGET_CHARS.get(key, 200)
+    return round(target * (1 - tolerance)), round(target * (1 + tolerance))
+
+
+def length_violations(
+    texts: dict[str, str], tolerance: float = LENGTH_TOLERANCE,
+) -> dict[str, tuple[int, int, int]]:
+    """許容幅を外れたセクション
+
+    Returns:
+        dict: セクションキー → (文字数, 下限, 上限)。未生成のセクションは含まない
+    """
+    violations = {}
+    for key, text in texts.items():
+        if key not in SECTION_TARGET_CHARS or (key in OPTIONAL_SECTIONS and not text):
+            continue
+        low, high = length_band(key, tolerance)
+        if not low <= len(text) <= high:
+            violations[key] = (len(text), low, high)
+    return violations
+
+
+@dataclass
+class LengthReport:
+    """文字数調整の結果
+
+    Attributes:
+        texts: 調整後の文章（全セクション）
+        rounds: 実行したラウンド数
+        requests: セクションキー → 調整リクエスト数
+        remaining: 調整後も許容幅を外れているセクション（length_violations の形式）
+        input_tokens: 調整にかかった入力トークン（キャッシュ分を含む）
+        output_tokens: 調整にかかった出力トークン
+        full_tokens: 10セクションを一括で生成し直した場合のトークン数の見積もり
+    """
+    texts: dict[str, str]
+    rounds: int = 0
+    requests: dict[str, int] = field(default_factory=dict)
+    remaining: dict[str, tuple[int, int, int]] = field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    full_tokens: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cost_ratio(self) -> float:
+        """一括再生成に対する調整のトークン数の比"""
+        return self.tokens / self.full_tokens if self.full_tokens else 0.0
+
+
+def estimate_full_tokens(data: HearingData) -> int:
+    """10セクションを一括で生成し直す場合のトークン数の見積もり（入力 + 目標文字数分の出力）"""
+    system, user_message = build_messages(hearing_to_prompt_data(data), FULL_PLAN_INSTRUCTION)
+    return estimate_tokens(system, [{"role": "user", "content": user_message}], 0) + sum(
+        SECTION_TARGET_CHARS.values()
+    )
+
+
+def _adjust_section(prompt_data: dict, key: str, text: str, generate_text_fn) -> str:
+    """1セクションの文字数を目標に合わせた文章を生成"""
+    target = SECTION_TARGET_CHARS.get(key, 200)
+    with metric_labels(section=key):
+        response = generate_text_fn(
+            system_prompt=[cached_block(SYSTEM_PROMPT)],
+            user_message=build_adjust_prompt(prompt_data, key, text, target),
+            max_tokens=section_max_tokens([key]),
+            refresh=True,
+            tool=PARTIAL_SECTIONS_TOOL,
+        )
+    result = _parse_json_response(response)
+    if key not in result:
+        raise ValueError(f"JSONの解析に失敗しました: {key}")
+    return result[key]
+
+
+def enforce_lengths(
+    data: HearingData,
+    texts: dict[str, str],
+    generate_text_fn,
+    tolerance: float = LENGTH_TOLERANCE,
+    max_rounds: int = 2,
+    max_workers: int | None = None,
+) -> LengthReport:
+    """許容幅を外れたセクションだけを、目標文字数に合わせて書き直す
+
+    各ラウンドで外れたセクションを並列に短縮・加筆し、外れたセクションが
+    なくなるか max_rounds に達したら終える。書き直した文章が元より目標から
+    離れた場合は元の文章を残す。使ったトークン数は llm_metrics の記録から集計する。
+
+    Args:
+        data: ヒアリングデータ
+        texts: 生成済みの文章（セクションキー → 文章）
+        generate_text_fn: テキスト生成関数 (system_prompt, user_message, max_tokens, refresh, tool) -> str
+        tolerance: 目標文字数に対する許容幅（0.2で±20%）
+        max_rounds: 最大ラウンド数
+        max_workers: 同時リクエスト数（Noneで外れたセクション数）
+
+    Returns:
+        LengthReport
+    """
+    prompt_data = hearing_to_prompt_data(data)
+    report = LengthReport(texts=dict(texts), full_tokens=estimate_full_tokens(data))
+    run_id = uuid.uuid4().hex
+
+    with metric_labels(task="adjust_length", adjust_run=run_id):
+        for _ in range(max_rounds):
+            violations = length_violations(report.texts, tolerance)
+            if not violations:
+                break
+            report.rounds += 1
+            with ThreadPoolExecutor(max_workers=max_workers or len(violations)) as pool:
+                futures = {
+                    pool.submit(
+                        contextvars.copy_context().run,
+                        _adjust_section, prompt_data, key, report.texts[key], generate_text_fn,
+                    ): key
+                    for key in violations
+                }
+                for fut in as_completed(futures):
+                    key = futures[fut]
+                    report.requests[key] = report.requests.get(key, 0) + 1
+                    try:
+                        new_text = fut.result()
+                    except Exception:
+                        continue
+                    target = SECTION_TARGET_CHARS.get(key, 200)
+                    if abs(len(new_text) - target) < abs(len(report.texts[key]) - target):
+                        report.texts[key] = new_text
+
+    report.remaining = length_violations(report.texts, tolerance)
+    for record in get_metrics().records(adjust_run=run_id):
+        report.input_tokens += (
+            record.input_tokens + record.cache_creation_input_tokens + record.cache_read_input_tokens
+        )
+        report.output_tokens += record.output_tokens
+    return report
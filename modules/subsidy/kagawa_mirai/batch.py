@@ -0,0 +1,454 @@
+"""香川県未来投資応援補助金 バッチ書類生成
+
+ディレクトリ内のヒアリングシートをまとめて処理し、顧客ごとに申請書類ZIPを作る。
+
+    python -m modules.subsidy.kagawa_mirai.batch INPUT_DIR [-o OUTPUT_DIR]
+
+読み込み・計算と書類生成はプロセスプールで並列化し、AI文章生成は同時実行数を
+絞ったスレッドプールで実行する。出力ディレクトリの manifest.json に進捗を記録し、
+中断後に再実行すると完了済みの顧客は処理しない（生成済みの文章も再利用する）。
+
+--message-batch を付けると、AI文章生成を先に Message Batches API の1ジョブにまとめて
+実行する（低コスト・高スループットだが完了まで時間がかかる。夜間処理向け）。
+バッチで生成できなかった顧客だけ、通常のAPI呼び出しで生成する。
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from lib.file_utils import create_zip
+from lib.llm_metrics import metric_labels
+
+from .data_models import HearingData
+from .hearing_cache import load_hearing_sheet_cached
+from .pipeline import PlanResult, calculate_all
+from .ai_text_generator import generate_texts, generate_texts_batch
+from .document_generator import TEMPLATES, build_all_documents, output_filename
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_TEMPLATE_DIR = Path(__file__).resolve().parents[3] / "templates" / "kagawa_mirai"
+STAGES = ["parse", "calculate", "texts", "documents"]
+
+
+def file_sha256(path: Path) -> str:
+    """ファイル内容のSHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """顧客ごとの処理状況を記録するチェックポイントファイル
+
+    エントリは入力ファイルのハッシュと紐づけ、シートが差し替えられた場合は
+    完了済み扱いにも文章の再利用にもしない。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.clients: dict[str, dict] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                self.clients = json.load(f).get("clients", {})
+
+    def _entry(self, key: str, sha256: str) -> dict | None:
+        entry = self.clients.get(key)
+        if entry and entry.get("sha256") == sha256:
+            return entry
+        return None
+
+    def is_done(self, key: str, sha256: str, output_dir: Path) -> bool:
+        entry = self._entry(key, sha256)
+        return bool(
+            entry and entry.get("status") == "done"
+            and (output_dir / entry.get("zip", "")).is_file()
+        )
+
+    def cached_texts(self, key: str, sha256: str) -> dict[str, str] | None:
+        entry = self._entry(key, sha256)
+        return entry.get("texts") if entry else None
+
+    def update(self, key: str, sha256: str, **fields):
+        entry = self._entry(key, sha256) or {"sha256": sha256}
+        entry.update(fields)
+        self.clients[key] = entry
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"clients": self.clients}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class BatchStats:
+    """バッチ実行の集計"""
+    total: int = 0
+    completed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    stage_latencies: dict[str, list[float]] = field(
+        default_factory=lambda: {stage: [] for stage in STAGES}
+    )
+    failures: list[tuple[str, str, str]] = field(default_factory=list)
+
+    def record(self, timings: dict[str, float]):
+        for stage, seconds in timings.items():
+            self.stage_latencies.setdefault(stage, []).append(seconds)
+
+    @property
+    def throughput_per_min(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.completed / self.elapsed * 60
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def format_report(stats: BatchStats) -> str:
+    """スループット・ステージ別レイテンシ・失敗一覧のレポート文字列"""
+    lines = [
+        f"処理件数: 完了 {stats.completed} / スキップ {stats.skipped} / "
+        f"失敗 {len(stats.failures)}（対象 {stats.total}件）",
+        f"所要時間: {stats.elapsed:.1f}秒　スループット: {stats.throughput_per_min:.1f}件/分",
+        "ステージ別レイテンシ（秒）:",
+        f"  {'stage':<10} {'n':>5} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}",
+    ]
+    for stage, values in stats.stage_latencies.items():
+        if not values:
+            continue
+        lines.append(
+            f"  {stage:<10} {len(values):>5} {sum(values) / len(values):>8.2f} "
+            f"{_percentile(values, 50):>8.2f} {_percentile(values, 95):>8.2f} {max(values):>8.2f}"
+        )
+    if stats.failures:
+        lines.append("失敗一覧:")
+        for key, stage, error in stats.failures:
+            lines.append(f"  - {key} [{stage}] {error}")
+    return "\n".join(lines)
+
+
+def _parse_and_calculate(path: str) -> tuple[HearingData, PlanResult, dict[str, float]]:
+    """[プロセスプール] ヒアリングシート読み込み → 収支計算"""
+    start = time.perf_counter()
+    data = load_hearing_sheet_cached(Path(path).read_bytes())
+    parsed = time.perf_counter()
+    result = calculate_all(data)
+    return data, result, {
+        "parse": parsed - start,
+        "calculate": time.perf_counter() - parsed,
+    }
+
+
+def _generate_texts(data: HearingData, generate_text_fn) -> tuple[dict[str, str], dict[str, float]]:
+    """[スレッドプール] AI文章生成
+
+    解析できない応答だったときは、キャッシュを使わずにもう1回生成する。
+    """
+    start = time.perf_counter()
+    with metric_labels(customer=data.company.name):
+        texts = generate_texts(data, generate_text_fn)
+        if not texts:
+            texts = generate_texts(data, functools.partial(generate_text_fn, refresh=True))
+    if not texts:
+        raise ValueError("JSONの解析に失敗しました")
+    return texts, {"texts": time.perf_counter() - start}
+
+
+def _render_documents(
+    data: HearingData, result: PlanResult, template_dir: str, zip_path: str,
+) -> dict[str, float]:
+    """[プロセスプール] 4書類を生成してZIPに書き出す"""
+    start = time.perf_counter()
+    errors = {}
+    files = build_all_documents(
+        data, Path(template_dir), subsidy=result.subsidy, plan=result.plan,
+        on_error=lambda name, e: errors.__setitem__(name, f"{type(e).__name__}: {e}"),
+    )
+    missing = [name for name in TEMPLATES if output_filename(name) not in files]
+    if missing:
+        details = [f"{name}（{errors[name]}）" if name in errors else name for name in missing]
+        raise RuntimeError(f"書類生成失敗: {', '.join(details)}")
+
+    part_path = zip_path + ".part"
+    with open(part_path, "wb") as f:
+        f.write(create_zip(files))
+    os.replace(part_path, zip_path)
+    return {"documents": time.perf_counter() - start}
+
+
+def _iter_sheets(input_dir: Path):
+    """処理対象のヒアリングシート（Excelの一時ファイルは除く）"""
+    for path in sorted(input_dir.glob("*.xlsx")):
+        if not path.name.startswith("~$"):
+            yield path
+
+
+def prefetch_texts_by_message_batch(
+    input_dir: Path,
+    output_dir: Path,
+    submit_fn,
+    model: str,
+    log=print,
+) -> tuple[int, int]:
+    """未生成の顧客の文章を1つのバッチジョブでまとめて生成し、マニフェストに保存する
+
+    保存した文章は run_batch が生成済みとして再利用する。
+
+    Args:
+        input_dir: ヒアリングシート（.xlsx）のディレクトリ
+        output_dir: マニフェストの出力先
+        submit_fn: list[BatchRequest] -> BatchResult（run_message_batch を束縛したもの）
+        model: 使用するモデル
+        log: 進捗出力関数
+
+    Returns:
+        (生成できた件数, 生成できなかった件数)
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(output_dir / MANIFEST_NAME)
+    datas, hashes = {}, {}
+    for path in _iter_sheets(input_dir):
+        sha256 = file_sha256(path)
+        if manifest.is_done(path.name, sha256, output_dir) or manifest.cached_texts(path.name, sha256):
+            continue
+        try:
+            datas[path.name] = load_hearing_sheet_cached(path.read_bytes())
+        except Exception as e:
+            log(f"[失敗] {path.name} (parse): {type(e).__name__}: {e}")
+            continue
+        hashes[path.name] = sha256
+    if not datas:
+        return 0, 0
+
+    log(f"バッチジョブで文章を生成: {len(datas)}件")
+    texts, errors = generate_texts_batch(datas, submit_fn, model=model)
+    for key, generated in texts.items():
+        manifest.update(key, hashes[key], status="texts", texts=generated)
+    for key, error in errors.items():
+        log(f"[バッチ失敗] {key}: {error}（通常のAPI呼び出しで再生成します）")
+    return len(texts), len(errors)
+
+
+def run_batch(
+    input_dir: Path,
+    output_dir: Path,
+    template_dir: Path = DEFAULT_TEMPLATE_DIR,
+    generate_text_fn=None,
+    workers: int | None = None,
+    llm_concurrency: int = 4,
+    log=print,
+) -> BatchStats:
+    """ディレクトリ内の全ヒアリングシートを処理する
+
+    Args:
+        input_dir: ヒアリングシート（.xlsx）のディレクトリ
+        output_dir: ZIPとマニフェストの出力先
+        template_dir: テンプレートディレクトリ
+        generate_text_fn: テキスト生成関数（再試行時は refresh=True も渡す）。Noneなら文章生成を省略する
+        workers: プロセスプールのワーカー数（Noneでos.cpu_count()）
+        llm_concurrency: AI文章生成の同時実行数
+        log: 進捗出力関数
+
+    Returns:
+        BatchStats: 実行結果の集計
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(output_dir / MANIFEST_NAME)
+    stats = BatchStats()
+    start = time.perf_counter()
+
+    targets = {}
+    for path in _iter_sheets(input_dir):
+        stats.total += 1
+        sha256 = file_sha256(path)
+        if manifest.is_done(path.name, sha256, output_dir):
+            stats.skipped += 1
+            continue
+        targets[path.name] = (path, sha256)
+
+    log(f"対象 {stats.total}件（完了済み {stats.skipped}件をスキップ）")
+
+    with ProcessPoolExecutor(max_workers=workers) as procs, \
+            ThreadPoolExecutor(max_workers=llm_concurrency) as threads:
+        pending = {}
+        contexts: dict[str, tuple[HearingData, PlanResult]] = {}
+
+        def submit_render(key: str):
+            data, result = contexts[key]
+            zip_name = f"{Path(key).stem}.zip"
+            fut = procs.submit(
+                _render_documents, data, result,
+                str(template_dir), str(output_dir / zip_name),
+            )
+            pending[fut] = (key, "documents")
+
+        for key, (path, _) in targets.items():
+            pending[procs.submit(_parse_and_calculate, str(path))] = (key, "parse")
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key, stage = pending.pop(fut)
+                sha256 = targets[key][1]
+                try:
+                    value = fut.result()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    stats.failures.append((key, stage, error))
+                    manifest.update(key, sha256, status="failed", stage=stage, error=error)
+                    contexts.pop(key, None)
+                    log(f"[失敗] {key} ({stage}): {error}")
+                    continue
+
+                if stage == "parse":
+                    data, result, timings = value
+                    stats.record(timings)
+                    contexts[key] = (data, result)
+                    texts = manifest.cached_texts(key, sha256)
+                    if texts is not None or generate_text_fn is None:
+                        data.generated_texts = texts or {}
+                        submit_render(key)
+                    else:
+                        fut = threads.submit(_generate_texts, data, generate_text_fn)
+                        pending[fut] = (key, "texts")
+
+                elif stage == "texts":
+                    texts, timings = value
+                    stats.record(timings)
+                    manifest.update(key, sha256, status="texts", texts=texts)
+                    contexts[key][0].generated_texts = texts
+                    submit_render(key)
+
+                else:
+                    stats.record(value)
+                    manifest.update(
+                        key, sha256, status="done",
+                        zip=f"{Path(key).stem}.zip", error=None,
+                    )
+                    contexts.pop(key, None)
+                    stats.completed += 1
+                    log(f"[完了] {key} ({stats.completed}/{len(targets)})")
+
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def _make_generate_text_fn(model: str, refresh: bool = False):
+    """ANTHROPIC_API_KEY 環境変数から作ったクライアント（ANTHROPIC_BACKEND 指定時は
+    オフラインの代替）で generate_text を束縛する"""
+    from lib.anthropic_client import PRIORITY_BATCH, generate_text, get_headless_client
+
+    return functools.partial(
+        generate_text, model=model, client=get_headless_client(),
+        refresh=refresh, priority=PRIORITY_BATCH,
+    )
+
+
+def _make_batch_submit_fn(poll_interval: float, refresh: bool = False, log=print):
+    """ANTHROPIC_API_KEY 環境変数から作ったクライアントで run_message_batch を束縛する"""
+    from lib.anthropic_client import get_headless_client, run_message_batch
+
+    def on_status(batch):
+        counts = batch.request_counts
+        log(
+            f"  バッチ {batch.id}: {batch.processing_status} "
+            f"(処理中 {counts.processing} / 成功 {counts.succeeded} / 失敗 {counts.errored})"
+        )
+
+    return functools.partial(
+        run_message_batch, client=get_headless_client(), poll_interval=poll_interval,
+        refresh=refresh, on_status=on_status,
+    )
+
+
+def format_llm_report(summary: dict) -> str:
+    """AI文章生成のAPI呼び出しの集計（llm_metrics.summarize の結果）のレポート文字列"""
+    def seconds(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    return (
+        f"API呼び出し: {summary['api_calls']}件（失敗 {summary['errors']}件）　"
+        f"レイテンシ p50 {seconds(summary['latency_p50'])}秒 / p95 {seconds(summary['latency_p95'])}秒\n"
+        f"トークン: 入力 {summary['input_tokens']:,} / キャッシュ書込 {summary['cache_creation_input_tokens']:,} / "
+        f"キャッシュ読込 {summary['cache_read_input_tokens']:,} / 出力 {summary['output_tokens']:,}　"
+        f"推定費用 ${summary['cost']:.2f}"
+    )
+
+
+def main(argv=None) -> int:
+    from lib.anthropic_client import DEFAULT_MODEL, get_response_cache
+    from lib.llm_metrics import get_metrics, summarize
+
+    parser = argparse.ArgumentParser(
+        prog="python -m modules.subsidy.kagawa_mirai.batch",
+        description="ヒアリングシートのディレクトリから申請書類ZIPを一括生成する",
+    )
+    parser.add_argument("input_dir", type=Path, help="ヒアリングシート（.xlsx）のディレクトリ")
+    parser.add_argument("-o", "--output-dir", type=Path, help="出力先（既定: INPUT_DIR/output）")
+    parser.add_argument("--template-dir", type=Path, default=DEFAULT_TEMPLATE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="プロセスプールのワーカー数")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="AI文章生成の同時実行数")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--skip-texts", action="store_true", help="AI文章生成を省略する")
+    parser.add_argument(
+        "--refresh-texts", action="store_true",
+        help="AI応答キャッシュを使わずに文章を生成し直す",
+    )
+    parser.add_argument(
+        "--message-batch", action="store_true",
+        help="AI文章生成を Message Batches API でまとめて実行する（夜間処理向け）",
+    )
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="バッチの状態確認の間隔（秒）")
+    args = parser.parse_args(argv)
+
+    if not args.input_dir.is_dir():
+        parser.error(f"ディレクトリが見つかりません: {args.input_dir}")
+
+    generate_text_fn = (
+        None if args.skip_texts else _make_generate_text_fn(args.model, args.refresh_texts)
+    )
+    output_dir = args.output_dir or args.input_dir / "output"
+    if args.message_batch and generate_text_fn is not None:
+        prefetch_texts_by_message_batch(
+            args.input_dir, output_dir, _make_batch_submit_fn(args.poll_interval, args.refresh_texts), args.model,
+        )
+    stats = run_batch(
+        input_dir=args.input_dir,
+        output_dir=output_dir,
+        template_dir=args.template_dir,
+        generate_text_fn=generate_text_fn,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+    )
+    print(format_report(stats))
+    if generate_text_fn is not None:
+        cache = get_response_cache().stats()
+        print(
+            f"AI応答キャッシュ: ヒット {cache['hits']} / ミス {cache['misses']}"
+            f"（ヒット率 {cache['hit_rate']:.0%}）"
+        )
+        print(format_llm_report(summarize(get_metrics().records())))
+    return 1 if stats.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
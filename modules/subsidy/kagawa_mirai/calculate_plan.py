@@ -8,8 +8,10 @@
 - 上限: 100万円（売上10億以上は500万円）
 """
 
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List
 
 
 @dataclass
@@ -56,19 +58,190 @@ class SubsidyCalculation:
         return self.total_expense >= 500_000
 
 
-@dataclass
+# 年度ごとの固定フィールド（ThreeYearPlan は年度 × フィールドの int64 配列で保持する）
+PLAN_FIELDS = (
+    "sales", "operating_profit", "depreciation", "personnel_cost",
+    "salary_total", "employee_count", "added_value",
+)
+_N_FIELDS = len(PLAN_FIELDS)
+_FIELD_INDEX = {name: i for i, name in enumerate(PLAN_FIELDS)}
+
+
+def _year_label(year: int) -> str:
+    return "基準年度" if year == 0 else f"{year}年目"
+
+
+class PlanYear(Mapping):
+    """ThreeYearPlan の1年度分の読み取りビュー
+
+    従来の年度dictと同じく "year" / "label" / 各フィールド名で参照できる。
+    """
+
+    __slots__ = ("_plan", "_year")
+
+    def __init__(self, plan: "ThreeYearPlan", year: int):
+        self._plan = plan
+        self._year = year
+
+    def __getitem__(self, key):
+        if key == "year":
+            return self._year
+        if key == "label":
+            return _year_label(self._year)
+        return self._plan._values[self._year * _N_FIELDS + _FIELD_INDEX[key]]
+
+    def __iter__(self):
+        yield "year"
+        yield "label"
+        yield from PLAN_FIELDS
+
+    def __len__(self) -> int:
+        return _N_FIELDS + 2
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class PlanYears(Sequence):
+    """ThreeYearPlan.years の互換ビュー（年度dictのリストとして振る舞う）"""
+
+    __slots__ = ("_plan",)
+
+    def __init__(self, plan: "ThreeYearPlan"):
+        self._plan = plan
+
+    def __len__(self) -> int:
+        return len(self._plan._values) // _N_FIELDS
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("year index out of range")
+        return PlanYear(self._plan, index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (PlanYears, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def append(self, row: Mapping):
+        """年度dictを追加（"year" / "label" は位置から決まるため無視）"""
+        self._plan.append_year(**{name: row.get(name, 0) for name in PLAN_FIELDS})
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 class ThreeYearPlan:
-    """3年間の収支計画"""
-    years: List[Dict] = None
-    added_value_increasing: bool = False
-    salary_increasing: bool = False
-    all_requirements_met: bool = False
-    added_value_growth_rate: float = 0.0
-    salary_growth_rate: float = 0.0
+    """3年間の収支計画
+
+    年度ごとの値は基準年度から順に PLAN_FIELDS の並びで1本の int64 配列に
+    保持する（1計画あたり数百バイト）。years は従来どおり年度dictのリストとして
+    読める互換ビューで、列ごとの値は column()、基準年度からの増加率は
+    growth_rates() で取得できる（増加率は初回に計算して保持する）。
+    """
+
+    __slots__ = (
+        "_values", "_rates",
+        "added_value_increasing", "salary_increasing", "all_requirements_met",
+        "added_value_growth_rate", "salary_growth_rate",
+    )
+
+    def __init__(
+        self,
+        years: Iterable[Mapping] | None = None,
+        added_value_increasing: bool = False,
+        salary_increasing: bool = False,
+        all_requirements_met: bool = False,
+        added_value_growth_rate: float = 0.0,
+        salary_growth_rate: float = 0.0,
+    ):
+        self._values = array("q")
+        self._rates = None
+        self.added_value_increasing = added_value_increasing
+        self.salary_increasing = salary_increasing
+        self.all_requirements_met = all_requirements_met
+        self.added_value_growth_rate = added_value_growth_rate
+        self.salary_growth_rate = salary_growth_rate
+        for row in years or ():
+            self.years.append(row)
+
+    @classmethod
+    def from_values(cls, values: Iterable[int], **flags) -> "ThreeYearPlan":
+        """年度 × PLAN_FIELDS の順に並んだ値から作る"""
+        plan = cls(**flags)
+        plan._values.extend(values)
+        if len(plan._values) % _N_FIELDS:
+            raise ValueError(f"値の個数が{_N_FIELDS}の倍数ではありません")
+        return plan
 
-    def __post_init__(self):
-        if self.years is None:
-            self.years = []
+    @property
+    def years(self) -> PlanYears:
+        return PlanYears(self)
+
+    @property
+    def n_years(self) -> int:
+        return len(self._values) // _N_FIELDS
+
+    def append_year(self, **fields: int):
+        """1年度分を追加（指定のないフィールドは0）"""
+        self._values.extend(int(fields.get(name, 0)) for name in PLAN_FIELDS)
+        self._rates = None
+
+    def value(self, year: int, field_name: str) -> int:
+        return self._values[year * _N_FIELDS + _FIELD_INDEX[field_name]]
+
+    def column(self, field_name: str) -> array:
+        """指定フィールドの年度ごとの値"""
+        return self._values[_FIELD_INDEX[field_name]::_N_FIELDS]
+
+    def growth_rates(self, field_name: str) -> tuple:
+        """基準年度からの増加率[%]（基準年度および基準値が0以下の場合は None）"""
+        if self._rates is None:
+            self._rates = {}
+        rates = self._rates.get(field_name)
+        if rates is None:
+            col = self.column(field_name)
+            base = col[0] if col else 0
+            rates = tuple(
+                None if year == 0 or base <= 0 else (val - base) / base * 100
+                for year, val in enumerate(col)
+            )
+            self._rates[field_name] = rates
+        return rates
+
+    def _flags(self) -> tuple:
+        return (
+            self.added_value_increasing, self.salary_increasing, self.all_requirements_met,
+            self.added_value_growth_rate, self.salary_growth_rate,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ThreeYearPlan):
+            return NotImplemented
+        return self._values == other._values and self._flags() == other._flags()
+
+    def __getstate__(self):
+        return (self._values, self._flags())
+
+    def __setstate__(self, state):
+        values, flags = state
+        self.__init__(None, *flags)
+        self._values = values
+
+    def __repr__(self) -> str:
+        return (
+            f"ThreeYearPlan(years={list(self.years)!r}, "
+            f"added_value_increasing={self.added_value_increasing}, "
+            f"salary_increasing={self.salary_increasing}, "
+            f"all_requirements_met={self.all_requirements_met}, "
+            f"added_value_growth_rate={self.added_value_growth_rate}, "
+            f"salary_growth_rate={self.salary_growth_rate})"
+        )
 
 
 def calculate_subsidy(
@@ -86,6 +259,27 @@ def calculate_subsidy(
     return calc
 
 
+def _effect_ratio(year: int, growth_start_year: int) -> float:
+    """各年度に計上する効果の割合（1年目開始なら0.5→1.0、2年目開始なら0→0.7→1.0）"""
+    if growth_start_year == 1:
+        return 0.5 if year == 1 else 1.0
+    if year == 1:
+        return 0.0
+    elif year == 2:
+        return 0.7
+    return 1.0
+
+
+def _gross_margin(financial: FinancialData) -> float:
+    """売上増加分に掛ける粗利率（上限50%、売上ゼロなら30%）"""
+    if financial.sales > 0:
+        return min(
+            (financial.operating_profit + financial.personnel_cost) / financial.sales,
+            0.5,
+        )
+    return 0.3
+
+
 def calculate_3year_plan(
     financial: FinancialData,
     sales_increase_annual: int = 0,
@@ -98,68 +292,52 @@ def calculate_3year_plan(
     """3年間の収支計画を自動計算"""
     plan = ThreeYearPlan()
 
-    base = {
-        "year": 0, "label": "基準年度",
-        "sales": financial.sales,
-        "operating_profit": financial.operating_profit,
-        "depreciation": financial.depreciation,
-        "personnel_cost": financial.personnel_cost,
-        "salary_total": financial.salary_total,
-        "employee_count": financial.employee_count,
-        "added_value": financial.added_value,
-    }
-    plan.years.append(base)
+    # PLAN_FIELDS の並び（金額は整数で持つため、小数の入力は切り捨てる）
+    plan._values.extend(map(int, (
+        financial.sales,
+        financial.operating_profit,
+        financial.depreciation,
+        financial.personnel_cost,
+        financial.salary_total,
+        financial.employee_count,
+        financial.added_value,
+    )))
+
+    gross_margin = _gross_margin(financial)
 
     for year in range(1, 4):
-        if growth_start_year == 1:
-            effect_ratio = 0.5 if year == 1 else 1.0
-        else:
-            if year == 1:
-                effect_ratio = 0.0
-            elif year == 2:
-                effect_ratio = 0.7
-            else:
-                effect_ratio = 1.0
+        effect_ratio = _effect_ratio(year, growth_start_year)
 
         sales = financial.sales + int(sales_increase_annual * effect_ratio)
         cost_saving = int(cost_reduction_annual * effect_ratio)
-        wage_cumulative = wage_increase_annual * year
+        wage_cumulative = int(wage_increase_annual * year)
         personnel_cost = financial.personnel_cost + wage_cumulative
         salary_total = financial.salary_total + wage_cumulative
-        depreciation = financial.depreciation + new_depreciation
+        depreciation = financial.depreciation + int(new_depreciation)
 
         emp_ratio = year / 3
         employee_count = financial.employee_count + int(employee_change * emp_ratio)
         if employee_count < 1:
             employee_count = 1
 
-        if financial.sales > 0:
-            gross_margin = min(
-                (financial.operating_profit + financial.personnel_cost) / financial.sales,
-                0.5,
-            )
-        else:
-            gross_margin = 0.3
-
         profit_from_sales = int((sales - financial.sales) * gross_margin)
         operating_profit = financial.operating_profit + profit_from_sales + cost_saving - wage_cumulative
         added_value = operating_profit + personnel_cost + depreciation
 
-        plan.years.append({
-            "year": year, "label": f"{year}年目",
-            "sales": sales,
-            "operating_profit": operating_profit,
-            "depreciation": depreciation,
-            "personnel_cost": personnel_cost,
-            "salary_total": salary_total,
-            "employee_count": employee_count,
-            "added_value": added_value,
-        })
-
-    base_av = plan.years[0]["added_value"]
-    final_av = plan.years[3]["added_value"]
-    base_sal = plan.years[0]["salary_total"]
-    final_sal = plan.years[3]["salary_total"]
+        plan._values.extend(map(int, (
+            sales,
+            operating_profit,
+            depreciation,
+            personnel_cost,
+            salary_total,
+            employee_count,
+            added_value,
+        )))
+
+    base_av = plan.value(0, "added_value")
+    final_av = plan.value(3, "added_value")
+    base_sal = plan.value(0, "salary_total")
+    final_sal = plan.value(3, "salary_total")
 
     plan.added_value_increasing = final_av > base_av
     plan.salary_increasing = final_sal > base_sal
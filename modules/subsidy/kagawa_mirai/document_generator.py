@@ -5,17 +5,34 @@
 2. 事業計画書（別紙1）.docx
 3. 誓約書（別紙2）.pdf（テンプレートコピー）
 4. チェックリスト.xlsx
+
+書類への書き込み内容は *_ops が (書類, 位置, 値) の操作の列（write_plan.WritePlan）として
+作り、render_ops が次のどちらかのライターでテンプレートに適用する。
+
+- "ooxml"（既定）: テンプレートのZIPのうち書き込みのあるXMLの部品だけを直接書き換える
+  （ooxml_writer）。テンプレートのチェックボックスや図形もそのまま残る
+- "openpyxl": openpyxl / python-docx で解析したテンプレートの複製に書き込んで保存し直す
+
+テンプレートは TemplateCache で1回だけ読み込む。build_* は書類をバイト列で返し
+（ファイルを書かない）、generate_* はそれを出力ディレクトリに書き出してパスを返す。
 """
 
+import datetime
+import io
+import multiprocessing
 import os
-import shutil
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-import openpyxl
-from docx import Document
-from docx.shared import Pt
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.writer.excel import ExcelWriter
 
 from .data_models import HearingData
+from .ooxml_writer import DocxPatch, XlsxPatch
+from .template_cache import TemplateCache, get_template_cache
+from .write_plan import WriteOp, WritePlan, apply_to_tables, apply_to_workbook
 
 TEMPLATES = {
     "交付申請書": ("02_kofushinseisho.xlsx", "交付申請書_完成版.xlsx"),
@@ -24,47 +41,134 @@ TEMPLATES = {
     "チェックリスト": ("05_checklist.xlsx", "チェックリスト_完成版.xlsx"),
 }
 
+WRITERS = ("ooxml", "openpyxl")
+DEFAULT_WRITER = "ooxml"
+
 
-def _copy_template(template_key: str, output_dir: str, template_dir: Path) -> str | None:
-    """テンプレートをコピーして出力パスを返す"""
+def _template_path(template_key: str, template_dir: Path) -> Path | None:
+    """テンプレートのパス（なければNone）"""
     if template_key not in TEMPLATES:
         return None
-    src_name, dst_name = TEMPLATES[template_key]
-    src_path = template_dir / src_name
+    src_path = template_dir / TEMPLATES[template_key][0]
     if not src_path.exists():
         return None
-    dst_path = os.path.join(output_dir, dst_name)
-    shutil.copy2(str(src_path), dst_path)
-    return dst_path
+    return src_path
+
+
+def output_filename(template_key: str) -> str:
+    """書類の出力ファイル名"""
+    return TEMPLATES[template_key][1]
+
+
+def _write_output(template_key: str, output_dir: str, content: bytes | None) -> str | None:
+    """生成した書類を出力ディレクトリに書き出してパスを返す"""
+    if content is None:
+        return None
+    output_path = os.path.join(output_dir, output_filename(template_key))
+    with open(output_path, "wb") as f:
+        f.write(content)
+    return output_path
+
+
+class _MemoryExcelWriter(ExcelWriter):
+    """シートのXMLを一時ファイルではなくメモリ上に書き出す ExcelWriter
+
+    openpyxl の既定の ExcelWriter はシートごとに一時ファイルを作って書き、
+    それをZIPに詰める。ここではシートもBytesIOに書いてファイルを作らない。
+    openpyxl の内部（ws._drawing など）に依存するため、requirements.txt で
+    openpyxl を 3.1 系に固定している。
+    """
+
+    def write_worksheet(self, ws):
+        ws._drawing = SpreadsheetDrawing()
+        ws._drawing.charts = ws._charts
+        ws._drawing.images = ws._images
+        writer = WorksheetWriter(ws, out=io.BytesIO())
+        writer.write()
+        ws._rels = writer._rels
+        self._archive.writestr(ws.path[1:], writer.read())
+        self.manifest.append(ws)
 
 
-def _write_content_to_cell(cell, content: str):
-    """テーブルセルの内容を本文に置き換える"""
-    for p in cell.paragraphs:
-        for run in p.runs:
-            run.text = ""
-    if cell.paragraphs:
-        p = cell.paragraphs[0]
-        p.text = ""
-        run = p.add_run(content)
-        run.font.size = Pt(9)
-        run.font.name = "游ゴシック"
+def _save_workbook(wb) -> bytes:
+    """Workbook をファイルに書かずにバイト列にする（openpyxl の save_workbook と同じ手順）"""
+    buffer = io.BytesIO()
+    archive = zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, allowZip64=True)
+    wb.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    _MemoryExcelWriter(wb, archive).save()
+    return buffer.getvalue()
+
+
+def _save_document(doc) -> bytes:
+    """Document をファイルに書かずにバイト列にする"""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _check_writer(writer: str):
+    if writer not in WRITERS:
+        raise ValueError(f"不明なライター: {writer}（{', '.join(WRITERS)} のいずれか）")
+
+
+def render_ops(
+    name: str, ops: list[WriteOp], template_dir: Path,
+    templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
+) -> bytes | None:
+    """書き込み計画の操作をテンプレートに適用して書類のバイト列にする
+
+    テンプレートが xlsx / docx でなければ（誓約書の pdf）テンプレートのまま返す。
+    """
+    _check_writer(writer)
+    src_path = _template_path(name, template_dir)
+    if not src_path:
+        return None
+    templates = templates or get_template_cache()
+    suffix = src_path.suffix.lower()
+    if suffix == ".xlsx":
+        if writer == "ooxml":
+            wb = XlsxPatch(templates.raw(src_path))
+            apply_to_workbook(wb, ops)
+            return wb.to_bytes()
+        wb = templates.workbook(src_path)
+        apply_to_workbook(wb, ops)
+        return _save_workbook(wb)
+    if suffix == ".docx":
+        if writer == "ooxml":
+            doc = DocxPatch(templates.raw(src_path))
+            apply_to_tables(doc.tables, ops)
+            return doc.to_bytes()
+        doc = templates.document(src_path)
+        apply_to_tables(doc.tables, ops)
+        return _save_document(doc)
+    return templates.raw(src_path)
 
 
 def generate_application_form(
     data: HearingData, output_dir: str, template_dir: Path,
-    subsidy=None, plan=None,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
 ) -> str | None:
     """交付申請書（様式1）を生成"""
-    output_path = _copy_template("交付申請書", output_dir, template_dir)
-    if not output_path:
-        return None
+    return _write_output(
+        "交付申請書", output_dir, build_application_form(data, template_dir, subsidy, plan, templates, writer)
+    )
+
 
-    wb = openpyxl.load_workbook(output_path)
-    ws = wb["様式１"]
+def build_application_form(
+    data: HearingData, template_dir: Path,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
+) -> bytes | None:
+    """交付申請書（様式1）をバイト列で生成"""
+    ops = application_form_ops(data, subsidy, plan)
+    return render_ops("交付申請書", ops, template_dir, templates, writer)
+
+
+def application_form_ops(data: HearingData, subsidy=None, plan=None) -> list[WriteOp]:
+    """交付申請書（様式1）への書き込み"""
+    ops = []
 
     def set_cell(col_letter, row, value):
-        ws[f"{col_letter}{row}"] = value
+        ops.append(WriteOp("交付申請書", f"様式１!{col_letter}{row}", value))
 
     # 申請者情報（上部）
     set_cell("Z", 4, data.company.postal_code)
@@ -151,153 +255,120 @@ def generate_application_form(
     if est:
         set_cell("AA", 36, est)
 
-    wb.save(output_path)
-    return output_path
+    return ops
 
 
 def generate_business_plan(
     data: HearingData, output_dir: str, template_dir: Path,
-    subsidy=None, plan=None,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
 ) -> str | None:
     """事業計画書（別紙1）を生成"""
-    output_path = _copy_template("事業計画書", output_dir, template_dir)
-    if not output_path:
-        return None
+    return _write_output(
+        "事業計画書", output_dir, build_business_plan(data, template_dir, subsidy, plan, templates, writer)
+    )
+
+
+def build_business_plan(
+    data: HearingData, template_dir: Path,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
+) -> bytes | None:
+    """事業計画書（別紙1）をバイト列で生成"""
+    ops = business_plan_ops(data, subsidy, plan)
+    return render_ops("事業計画書", ops, template_dir, templates, writer)
 
-    doc = Document(output_path)
-    tables = doc.tables
+
+def business_plan_ops(data: HearingData, subsidy=None, plan=None) -> list[WriteOp]:
+    """事業計画書（別紙1）の本文の表への書き込み"""
+    ops = []
     texts = data.generated_texts or {}
 
+    def cell(table, row, col, value, action="set"):
+        ops.append(WriteOp("事業計画書", f"tables[{table}].rows[{row}].cells[{col}]", value, action))
+
     # Table 0: 申請者名
-    if len(tables) > 0:
-        tables[0].rows[0].cells[1].text = data.company.name
+    cell(0, 0, 1, data.company.name)
 
     # Table 1: 事業名/事業分野
-    if len(tables) > 1:
-        t1 = tables[1]
-        t1.rows[0].cells[1].text = data.business.project_name
-        t1.rows[1].cells[1].text = f"（{data.business.current_field}）"
-        t1.rows[2].cells[1].text = f"（{data.business.plan_field}）"
-
-    # Table 2: 目的/手法/直近売上高/付加価値額/賃上げ
-    if len(tables) > 2:
-        t2 = tables[2]
-        purpose_text = t2.rows[0].cells[1].text
-        if "新事業展開" in data.business.purpose or "事業分野拡大" in data.business.purpose:
-            purpose_text = purpose_text.replace("新事業展開／事業分野拡大", "☑ 新事業展開／事業分野拡大")
-            purpose_text = purpose_text.replace("生産性の向上", "□ 生産性の向上")
-        else:
-            purpose_text = purpose_text.replace("新事業展開／事業分野拡大", "□ 新事業展開／事業分野拡大")
-            purpose_text = purpose_text.replace("生産性の向上", "☑ 生産性の向上")
-        t2.rows[0].cells[1].text = purpose_text
-
-        method_text = t2.rows[1].cells[1].text
-        method_map = {
-            "機械設備": "機械設備の導入・更新",
-            "システム": "システムの開発・導入",
-            "改装": "工場・店舗等の改装",
-        }
-        for key, label in method_map.items():
-            if key in data.business.method:
-                method_text = method_text.replace(label, f"☑ {label}")
-            else:
-                method_text = method_text.replace(label, f"□ {label}")
-        t2.rows[1].cells[1].text = method_text
-
-        is_over_1b = "10億" in data.company.sales_category and "以上" in data.company.sales_category
-        sales_text = t2.rows[2].cells[1].text
-        if is_over_1b:
-            sales_text = sales_text.replace("10億円未満", "□ 10億円未満")
-            sales_text = sales_text.replace("10億円以上", "☑ 10億円以上")
-        else:
-            sales_text = sales_text.replace("10億円未満", "☑ 10億円未満")
-            sales_text = sales_text.replace("10億円以上", "□ 10億円以上")
-        t2.rows[2].cells[1].text = sales_text
-
-        if plan and plan.years:
-            y3 = plan.years[-1]
-            base_av = plan.years[0].get("added_value", 0)
-            if base_av > 0:
-                av_rate = (y3.get("added_value", 0) - base_av) / base_av * 100
-                t2.rows[3].cells[2].text = (
-                    f"付加価値額増加率\n（{av_rate:.1f}）％\n\n"
-                    "※「5全体の収支計画」における(b3)３年目の、⑥付加価値額の増加率を記載してください。"
-                )
-
-        if plan and plan.years:
-            y3 = plan.years[-1]
-            base_sal = plan.years[0].get("salary_total", 0)
-            if base_sal > 0:
-                sal_rate = (y3.get("salary_total", 0) - base_sal) / base_sal * 100
-                t2.rows[4].cells[2].text = (
-                    "※常時使用する従業員がいないを選択した場合は記入不要です。\n"
-                    f"給与支給総額増加率\n（{sal_rate:.1f}）％\n\n"
-                    "※「5全体の収支計画」における（b3）３年目の、⑧給与支給総額の増加率を記載してください。"
-                )
+    cell(1, 0, 1, data.business.project_name)
+    cell(1, 1, 1, f"（{data.business.current_field}）")
+    cell(1, 2, 1, f"（{data.business.plan_field}）")
+
+    # Table 2: 目的/手法/直近売上高/付加価値額/賃上げ（テンプレートの選択肢に□☑を付ける）
+    if "新事業展開" in data.business.purpose or "事業分野拡大" in data.business.purpose:
+        purpose = [["新事業展開／事業分野拡大", "☑ 新事業展開／事業分野拡大"], ["生産性の向上", "□ 生産性の向上"]]
+    else:
+        purpose = [["新事業展開／事業分野拡大", "□ 新事業展開／事業分野拡大"], ["生産性の向上", "☑ 生産性の向上"]]
+    cell(2, 0, 1, purpose, "replace")
+
+    method_map = {
+        "機械設備": "機械設備の導入・更新",
+        "システム": "システムの開発・導入",
+        "改装": "工場・店舗等の改装",
+    }
+    cell(2, 1, 1, [
+        [label, f"☑ {label}" if key in data.business.method else f"□ {label}"]
+        for key, label in method_map.items()
+    ], "replace")
+
+    is_over_1b = "10億" in data.company.sales_category and "以上" in data.company.sales_category
+    if is_over_1b:
+        sales = [["10億円未満", "□ 10億円未満"], ["10億円以上", "☑ 10億円以上"]]
+    else:
+        sales = [["10億円未満", "☑ 10億円未満"], ["10億円以上", "□ 10億円以上"]]
+    cell(2, 2, 1, sales, "replace")
+
+    if plan and plan.years:
+        av_rate = plan.growth_rates("added_value")[-1]
+        if av_rate is not None:
+            cell(2, 3, 2, (
+                f"付加価値額増加率\n（{av_rate:.1f}）％\n\n"
+                "※「5全体の収支計画」における(b3)３年目の、⑥付加価値額の増加率を記載してください。"
+            ))
+
+    if plan and plan.years:
+        sal_rate = plan.growth_rates("salary_total")[-1]
+        if sal_rate is not None:
+            cell(2, 4, 2, (
+                "※常時使用する従業員がいないを選択した場合は記入不要です。\n"
+                f"給与支給総額増加率\n（{sal_rate:.1f}）％\n\n"
+                "※「5全体の収支計画」における（b3）３年目の、⑧給与支給総額の増加率を記載してください。"
+            ))
 
     # Table 3: スケジュール
-    if len(tables) > 3:
-        schedule = f"令和　{data.business.schedule_order}　～　令和　{data.business.schedule_complete}"
-        tables[3].rows[0].cells[1].text = schedule
+    schedule = f"令和　{data.business.schedule_order}　～　令和　{data.business.schedule_complete}"
+    cell(3, 0, 1, schedule)
 
     # Table 4: セクション2（沿革 + 物価高騰）
-    if len(tables) > 4:
-        t4 = tables[4]
-        if "section_2_1" in texts:
-            _write_content_to_cell(t4.rows[0].cells[1], texts["section_2_1"])
-        if "section_2_2" in texts:
-            _write_content_to_cell(t4.rows[1].cells[1], texts["section_2_2"])
-
     # Table 5: セクション3（事業内容 + 賃上げ計画）
-    if len(tables) > 5:
-        t5 = tables[5]
-        if "section_3_1" in texts:
-            _write_content_to_cell(t5.rows[0].cells[1], texts["section_3_1"])
-        if "section_3_2" in texts:
-            _write_content_to_cell(t5.rows[1].cells[1], texts["section_3_2"])
-
     # Table 6: セクション4（効果6項目）
-    if len(tables) > 6:
-        t6 = tables[6]
-        section_map = {
-            0: "section_4_1", 1: "section_4_2", 2: "section_4_3",
-            3: "section_4_4", 4: "section_4_5", 5: "section_4_6",
-        }
-        for row_idx, key in section_map.items():
-            if key in texts and row_idx < len(t6.rows):
-                _write_content_to_cell(t6.rows[row_idx].cells[1], texts[key])
+    section_cells = {
+        "section_2_1": (4, 0), "section_2_2": (4, 1),
+        "section_3_1": (5, 0), "section_3_2": (5, 1),
+        "section_4_1": (6, 0), "section_4_2": (6, 1), "section_4_3": (6, 2),
+        "section_4_4": (6, 3), "section_4_5": (6, 4), "section_4_6": (6, 5),
+    }
+    for key, (table, row) in section_cells.items():
+        if key in texts:
+            cell(table, row, 1, texts[key], "content")
 
     # Table 8: セクション5（収支計画 3年間）
-    if len(tables) > 8 and plan and plan.years:
-        t8 = tables[8]
+    if plan and plan.years:
         fm = data.company.fiscal_month
         if fm:
-            t8.rows[0].cells[1].text = f"申請時の直近期末(a)\n\n（R　年{fm}月期）"
+            cell(8, 0, 1, f"申請時の直近期末(a)\n\n（R　年{fm}月期）")
 
         def write_plan_row(row_idx, data_key, unit=1000):
-            if row_idx >= len(t8.rows):
-                return
-            row = t8.rows[row_idx]
-            for col, year_data in enumerate(plan.years):
-                if col + 1 < len(row.cells):
-                    val = year_data.get(data_key, 0)
-                    if unit != 1:
-                        val = val // unit
-                    row.cells[col + 1].text = f"{val:,}" if val else "0"
+            for col, val in enumerate(plan.column(data_key)):
+                if unit != 1:
+                    val = val // unit
+                cell(8, row_idx, col + 1, f"{val:,}" if val else "0")
 
         def write_plan_rate_row(row_idx, data_key):
-            if row_idx >= len(t8.rows):
-                return
-            row = t8.rows[row_idx]
-            base = plan.years[0].get(data_key.replace("_rate", ""), 0) if plan.years else 0
-            for col, year_data in enumerate(plan.years):
-                if col + 1 < len(row.cells):
-                    if col == 0:
-                        row.cells[col + 1].text = "―"
-                    elif base > 0:
-                        val = year_data.get(data_key.replace("_rate", ""), 0)
-                        rate = (val - base) / base * 100
-                        row.cells[col + 1].text = f"{rate:.1f}%"
+            for col, rate in enumerate(plan.growth_rates(data_key.replace("_rate", ""))):
+                if col == 0:
+                    cell(8, row_idx, col + 1, "―")
+                elif rate is not None:
+                    cell(8, row_idx, col + 1, f"{rate:.1f}%")
 
         write_plan_row(1, "sales", 1000)
         write_plan_row(2, "operating_profit", 1000)
@@ -310,44 +381,47 @@ def generate_business_plan(
         write_plan_row(9, "employee_count", 1)
 
     # Table 10: セクション6（補助対象経費）
-    if len(tables) > 10:
-        t10 = tables[10]
-        for i, expense in enumerate(data.expenses[:15]):
-            row_idx = i + 2
-            if row_idx < len(t10.rows):
-                row = t10.rows[row_idx]
-                row.cells[1].text = expense.category
-                row.cells[2].text = expense.item_name
-                row.cells[3].text = f"{expense.amount:,}"
-
-        total_expense = sum(e.amount for e in data.expenses)
-        if subsidy:
-            total_expense = subsidy.total_expense
-        if 17 < len(t10.rows):
-            t10.rows[17].cells[3].text = f"{total_expense:,}"
-
-        subsidy_amount = 0
-        if subsidy:
-            subsidy_amount = subsidy.subsidy_amount
-        if 18 < len(t10.rows):
-            t10.rows[18].cells[3].text = f"{subsidy_amount:,}"
-
-    doc.save(output_path)
-    return output_path
+    for i, expense in enumerate(data.expenses[:15]):
+        row_idx = i + 2
+        cell(10, row_idx, 1, expense.category)
+        cell(10, row_idx, 2, expense.item_name)
+        cell(10, row_idx, 3, f"{expense.amount:,}")
+
+    total_expense = sum(e.amount for e in data.expenses)
+    if subsidy:
+        total_expense = subsidy.total_expense
+    cell(10, 17, 3, f"{total_expense:,}")
+
+    subsidy_amount = 0
+    if subsidy:
+        subsidy_amount = subsidy.subsidy_amount
+    cell(10, 18, 3, f"{subsidy_amount:,}")
+
+    return ops
 
 
 def generate_checklist(
     data: HearingData, output_dir: str, template_dir: Path,
-    subsidy=None, plan=None,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
 ) -> str | None:
     """チェックリストを生成"""
-    output_path = _copy_template("チェックリスト", output_dir, template_dir)
-    if not output_path:
-        return None
+    return _write_output(
+        "チェックリスト", output_dir, build_checklist(data, template_dir, subsidy, plan, templates, writer)
+    )
 
-    wb = openpyxl.load_workbook(output_path)
-    ws = wb["申請者別"]
-    ws["C4"] = data.company.name
+
+def build_checklist(
+    data: HearingData, template_dir: Path,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
+) -> bytes | None:
+    """チェックリストをバイト列で生成"""
+    ops = checklist_ops(data, subsidy, plan)
+    return render_ops("チェックリスト", ops, template_dir, templates, writer)
+
+
+def checklist_ops(data: HearingData, subsidy=None, plan=None) -> list[WriteOp]:
+    """チェックリストへの書き込み"""
+    ops = [WriteOp("チェックリスト", "申請者別!C4", data.company.name)]
 
     entity = data.company.entity_type
     if "中堅" in entity or "中小" in entity:
@@ -360,9 +434,8 @@ def generate_checklist(
         check_col = "D"
 
     def auto_check(row):
-        current = ws[f"{check_col}{row}"].value
-        if current == "□":
-            ws[f"{check_col}{row}"] = "☑"
+        # テンプレートで "□" のセルだけを "☑" にする
+        ops.append(WriteOp("チェックリスト", f"申請者別!{check_col}{row}", "☑", "check"))
 
     # 交付申請書セクション
     if "香川" in data.company.address:
@@ -420,33 +493,202 @@ def generate_checklist(
     auto_check(58)
     auto_check(59)
 
-    wb.save(output_path)
+    return ops
 
-    # チェック数を集計して返す
-    checked = 0
-    total = 0
-    for row in range(9, 67):
-        val = ws[f"{check_col}{row}"].value
-        if val == "☑":
-            checked += 1
-            total += 1
-        elif val == "□":
-            total += 1
 
-    return output_path
+# 書類名 → 書き込みを作る関数（誓約書はテンプレートのまま）
+DOCUMENT_OPS = {
+    "交付申請書": application_form_ops,
+    "事業計画書": business_plan_ops,
+    "チェックリスト": checklist_ops,
+}
+
 
+def build_write_plan(data: HearingData, subsidy=None, plan=None) -> WritePlan:
+    """全書類への書き込み計画（テンプレートを開かない）
+
+    ドライラン（build_write_plan(...).to_json()）や、編集前後の計画の差分
+    （write_plan.diff_plans）の表示に使う。
+    """
+    return WritePlan([op for make_ops in DOCUMENT_OPS.values() for op in make_ops(data, subsidy, plan)])
 
-def copy_seiyakusho(output_dir: str, template_dir: Path) -> str | None:
+
+def copy_seiyakusho(output_dir: str, template_dir: Path, templates: TemplateCache | None = None) -> str | None:
     """誓約書をコピー（自署が必要なためテンプレートのまま）"""
-    return _copy_template("誓約書", output_dir, template_dir)
+    return _write_output("誓約書", output_dir, build_seiyakusho(template_dir, templates))
+
+
+def build_seiyakusho(template_dir: Path, templates: TemplateCache | None = None) -> bytes | None:
+    """誓約書のバイト列（テンプレートのまま）"""
+    src_path = _template_path("誓約書", template_dir)
+    if not src_path:
+        return None
+    return (templates or get_template_cache()).raw(src_path)
+
+
+def build_document(
+    name: str, data: HearingData, template_dir: Path,
+    subsidy=None, plan=None, templates: TemplateCache | None = None, writer: str = DEFAULT_WRITER,
+) -> bytes | None:
+    """書類名を指定して1書類をバイト列で生成
+
+    プロセスプールに渡せるようにモジュールの関数にしている（lambda は渡せない）。
+    """
+    if name == "誓約書":
+        return build_seiyakusho(template_dir, templates)
+    return render_ops(name, DOCUMENT_OPS[name](data, subsidy, plan), template_dir, templates, writer)
+
+
+def warm_templates(template_dir: Path, writer: str = DEFAULT_WRITER):
+    """プロセス内で共有するキャッシュにテンプレートを読み込んでおく（プロセスプールの initializer 用）
+
+    writer が "openpyxl" ならテンプレートの解析まで済ませておく。
+    """
+    cache = get_template_cache()
+    for src_name, _ in TEMPLATES.values():
+        path = Path(template_dir) / src_name
+        cache.raw(path)
+        if writer == "openpyxl" and path.suffix == ".xlsx":
+            cache.workbook(path)
+        elif writer == "openpyxl" and path.suffix == ".docx":
+            cache.document(path)
+
+
+def document_executor(
+    template_dir: Path, max_workers: int = 3, writer: str = DEFAULT_WRITER,
+) -> ProcessPoolExecutor:
+    """書類生成用のプロセスプール（各ワーカーでテンプレートを読み込み済み）
+
+    openpyxl / python-docx の処理はGILを手放さないため、並列に生成するには
+    スレッドではなくプロセスを使う。プロセスの起動とテンプレートの読み込みには
+    時間がかかるため、作ったプールは使い回す。Streamlit のようにスレッドの多い
+    プロセスから fork すると子プロセスが固まることがあるため、spawn で起動する。
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_templates,
+        initargs=(template_dir, writer),
+    )
+
+
+def build_all_documents(
+    data: HearingData, template_dir: Path,
+    subsidy=None, plan=None,
+    on_progress=None,
+    templates: TemplateCache | None = None,
+    executor: Executor | None = None,
+    on_error=None,
+    writer: str = DEFAULT_WRITER,
+) -> dict[str, bytes]:
+    """全4書類をメモリ上で一括生成（ファイルを書かない）
+
+    書き込み計画（build_write_plan）を作り、render_all_documents で書類にする。
+
+    Args:
+        data: ヒアリングデータ
+        template_dir: テンプレートディレクトリ
+        subsidy: 補助金計算結果
+        plan: 3年計画
+        on_progress: 進捗コールバック (step, total, label)（render_all_documents 参照）
+        templates: テンプレートのキャッシュ（Noneでプロセス内で共有するもの）
+        executor: 書類を同時に生成する Executor（render_all_documents 参照）
+        on_error: 生成に失敗した書類ごとに呼ぶ関数 (name, exception)。
+            Noneなら失敗した書類の例外を送出する
+        writer: 書類のライター（"ooxml" / "openpyxl"）
+
+    Returns:
+        dict: 出力ファイル名 → 内容（create_zip にそのまま渡せる。TEMPLATES の順）。
+            テンプレートがない書類・生成に失敗した書類は含まない
+    """
+    return render_all_documents(
+        build_write_plan(data, subsidy, plan), template_dir, on_progress, templates, executor, on_error, writer,
+    )
+
+
+def render_all_documents(
+    write_plan: WritePlan, template_dir: Path,
+    on_progress=None,
+    templates: TemplateCache | None = None,
+    executor: Executor | None = None,
+    on_error=None,
+    writer: str = DEFAULT_WRITER,
+) -> dict[str, bytes]:
+    """書き込み計画どおりに全4書類をメモリ上で生成（ファイルを書かない）
+
+    各書類には write_plan.for_document(書類名) の操作だけを適用する（誓約書は
+    テンプレートのまま）。executor を渡すと4書類を同時に生成する。テンプレートに
+    書き込む3書類を executor で、テンプレートのバイト列を返すだけの誓約書は
+    呼び出し元のスレッドで生成する。1書類の失敗は他の書類に影響しない。on_error が
+    あれば失敗を渡して結果から除き、なければ全書類を生成し終えてから最初に失敗した
+    書類の例外を送出する。
+
+    Args:
+        write_plan: 書き込み計画（build_write_plan）
+        template_dir: テンプレートディレクトリ
+        on_progress: 進捗コールバック (step, total, label)。各書類の生成が終わるたびに
+            呼ぶ（executor ありでは完了した順）
+        templates: テンプレートのキャッシュ（Noneでプロセス内で共有するもの。
+            プロセスプールでは各プロセスで共有するものを使う）
+        executor: 書類を同時に生成する Executor（document_executor() のプロセスプール、
+            または ThreadPoolExecutor）。Noneで1書類ずつ生成する
+        on_error: 生成に失敗した書類ごとに呼ぶ関数 (name, exception)。
+            Noneなら失敗した書類の例外を送出する
+        writer: 書類のライター（"ooxml" / "openpyxl"）
+
+    Returns:
+        dict: 出力ファイル名 → 内容（create_zip にそのまま渡せる。TEMPLATES の順）。
+            テンプレートがない書類・生成に失敗した書類は含まない
+    """
+    names = list(TEMPLATES)
+    contents: dict[str, bytes | None] = {}
+    failures: dict[str, Exception] = {}
+
+    def finish(step, name, build):
+        try:
+            contents[name] = build()
+        except Exception as e:
+            failures[name] = e
+            if on_error:
+                on_error(name, e)
+        if on_progress:
+            on_progress(step, len(names), name)
+
+    def render(name):
+        return render_ops(name, write_plan.for_document(name), template_dir, templates, writer)
+
+    if executor is None:
+        for i, name in enumerate(names):
+            finish(i + 1, name, lambda: render(name))
+    else:
+        # キャッシュ（ロックを持つ）はプロセスをまたいで渡せない
+        shared = None if isinstance(executor, ProcessPoolExecutor) else templates
+        futures = {
+            executor.submit(render_ops, name, write_plan.for_document(name), template_dir, shared, writer): name
+            for name in names if name != "誓約書"
+        }
+        # 誓約書はテンプレートのバイト列を返すだけなので、プールを待たずに済ませる
+        finish(1, "誓約書", lambda: render("誓約書"))
+        done = 1
+        for future in as_completed(futures):
+            done += 1
+            finish(done, futures[future], future.result)
+
+    if failures and on_error is None:
+        raise next(failures[name] for name in names if name in failures)
+    return {output_filename(name): contents[name] for name in names if contents.get(name) is not None}
 
 
 def generate_all_documents(
     data: HearingData, output_dir: str, template_dir: Path,
     subsidy=None, plan=None,
     on_progress=None,
+    templates: TemplateCache | None = None,
+    executor: Executor | None = None,
+    on_error=None,
+    writer: str = DEFAULT_WRITER,
 ) -> dict[str, str | None]:
-    """全4書類を一括生成
+    """全4書類を一括生成して出力ディレクトリに書き出す（build_all_documents のファイル版）
 
     Args:
         data: ヒアリングデータ
@@ -455,23 +697,20 @@ def generate_all_documents(
         subsidy: 補助金計算結果
         plan: 3年計画
         on_progress: 進捗コールバック (step, total, label)
+        templates: テンプレートのキャッシュ（Noneでプロセス内で共有するもの）
+        executor: 書類を同時に生成する Executor（build_all_documents 参照）
+        on_error: 生成に失敗した書類ごとに呼ぶ関数 (name, exception)。
+            Noneなら失敗した書類の例外を送出する（build_all_documents 参照）
+        writer: 書類のライター（"ooxml" / "openpyxl"）
 
     Returns:
-        dict: 書類名 → 出力パス
+        dict: 書類名 → 出力パス（生成できなかった書類はNone）
     """
     os.makedirs(output_dir, exist_ok=True)
-    results = {}
-
-    steps = [
-        ("交付申請書", lambda: generate_application_form(data, output_dir, template_dir, subsidy, plan)),
-        ("事業計画書", lambda: generate_business_plan(data, output_dir, template_dir, subsidy, plan)),
-        ("誓約書", lambda: copy_seiyakusho(output_dir, template_dir)),
-        ("チェックリスト", lambda: generate_checklist(data, output_dir, template_dir, subsidy, plan)),
-    ]
-
-    for i, (name, gen_func) in enumerate(steps):
-        if on_progress:
-            on_progress(i + 1, len(steps), name)
-        results[name] = gen_func()
-
-    return results
+    files = build_all_documents(
+        data, template_dir, subsidy, plan, on_progress, templates, executor, on_error, writer
+    )
+    return {
+        name: _write_output(name, output_dir, files.get(output_filename(name)))
+        for name in TEMPLATES
+    }
@@ -36,21 +36,35 @@ SYSTEM_PROMPT = """あなたは補助金申請の専門家です。
 - たまに短い文を入れる「これが課題である。」
 """
 
-FULL_PLAN_PROMPT = """
-以下の企業情報・ヒアリングデータを基に、香川県未来投資応援補助金の事業計画書（別紙1）の
-セクション2〜4の全文を一括で生成してください。
-
-セクション5（収支計画）とセクション6（経費一覧）は自動計算するため不要です。
+# プロンプトは「企業情報（静的な前半）」と「指示（後半）」に分ける。前半はどの生成リクエストでも
+# 同じ内容になるため、SYSTEM_PROMPT と合わせてAPI側のプロンプトキャッシュの対象にできる。
+CONTEXT_PROMPT = """
+以下は、香川県未来投資応援補助金の事業計画書（別紙1）を作成する企業の情報・ヒアリングデータです。
 
 ### 企業・事業情報
 {all_data}
+"""
 
-### 出力形式
-以下のJSON形式で出力してください：
+# 出力形式。生成は write_sections ツールの呼び出しを強制する（構造化出力）ので TOOL_OUTPUT、
+# ツールを使わないテキスト応答のときだけ ```json ブロックで出力させる JSON_OUTPUT を使う
+TOOL_OUTPUT = """write_sections ツールを呼び出し、{target}を次のキーに書き込んでください。
+値は本文のみ（見出しは付けない）にしてください。{empty}
+
+{spec}
+"""
+
+JSON_OUTPUT = """以下のJSON形式で、{target}を出力してください。{empty}
 
 ```json
 {{
-  "section_2_1": "会社の沿革やこれまでの既存事業の内容（400字程度）",
+{spec}
+}}
+```
+"""
+
+EMPTY_NOTE = "\n書くべき内容がない場合（その他特筆すべき事項など）は空文字にしてください。"
+
+FULL_PLAN_SPEC = """  "section_2_1": "会社の沿革やこれまでの既存事業の内容（400字程度）",
   "section_2_2": "物価高騰による経営面等への影響（400字程度）",
   "section_3_1": "事業の内容（500字程度）",
   "section_3_2": "賃上げの具体的な計画（200字程度）",
@@ -59,15 +73,97 @@ FULL_PLAN_PROMPT = """
   "section_4_3": "持続性（150字程度）",
   "section_4_4": "有効性（150字程度）",
   "section_4_5": "波及性（150字程度）",
-  "section_4_6": "その他特筆すべき事項（100字程度、なければ空文字）"
-}}
-```
+  "section_4_6": "その他特筆すべき事項（100字程度、なければ空文字）\""""
+
+FULL_PLAN_TEMPLATE = """
+上記の企業情報・ヒアリングデータを基に、事業計画書（別紙1）の
+セクション2〜4の全文を一括で生成してください。
 
+セクション5（収支計画）とセクション6（経費一覧）は自動計算するため不要です。
+
+### 出力形式
+{output}
 ### 文字数の目標合計: 2,500〜3,500字
+"""
+
+SECTION_INSTRUCTION = """
+上記の企業情報・ヒアリングデータを基に、事業計画書（別紙1）の
+指定したセクションの文章を生成してください。
+
+### 出力形式
+{output}"""
+
+REGENERATE_INSTRUCTION = """
+上記の企業情報・ヒアリングデータを基に、事業計画書（別紙1）の
+指定したセクションの文章を書き直してください。
+{neighbours}
+### 出力形式
+{output}"""
+
+ADJUST_INSTRUCTION = """
+上記の企業情報・ヒアリングデータを基に、事業計画書（別紙1）の次の文章を{direction}。
+内容と文章のトーンは変えず、{target_chars}字程度にしてください（現在{current_chars}字）。
+
+### 元の文章
+{text}
 
-{system_prompt}
+### 出力形式
+{output}"""
+
+
+def build_output_format(spec: str, tool: bool = True, partial: bool = True, allow_empty: bool = False) -> str:
+    """出力形式の指示を構築
+
+    Args:
+        spec: セクションごとの '  "キー": "内容（N字程度）"' の行
+        tool: write_sections ツールで出力させる（False なら ```json ブロックのテキスト応答）
+        partial: 指定したセクションだけを出力させる
+        allow_empty: 書くべき内容がなければ空文字でよいと伝える
+    """
+    return (TOOL_OUTPUT if tool else JSON_OUTPUT).format(
+        target="指定したセクションの文章のみ" if partial else "各セクションの文章",
+        empty=EMPTY_NOTE if allow_empty else "",
+        spec=spec,
+    )
+
+
+FULL_PLAN_INSTRUCTION = FULL_PLAN_TEMPLATE.format(output=build_output_format(FULL_PLAN_SPEC, partial=False))
+FULL_PLAN_JSON_INSTRUCTION = FULL_PLAN_TEMPLATE.format(
+    output=build_output_format(FULL_PLAN_SPEC, tool=False, partial=False)
+)
+
+NEIGHBOUR_PROMPT = """
+### 前後のセクション（採用済み。内容・表現が矛盾しないようにしてください）
+{texts}
 """
 
+# セクションごとに必要なヒアリングデータ（再生成時はこれだけを送る）
+SECTION_DATA = {
+    "section_2_1": ("company",),
+    "section_2_2": ("company", "price_impact"),
+    "section_3_1": ("company", "business"),
+    "section_3_2": ("company", "wage"),
+    "section_4_1": ("business", "effect"),
+    "section_4_2": ("wage",),
+    "section_4_3": ("business", "effect"),
+    "section_4_4": ("business", "effect"),
+    "section_4_5": ("company", "effect"),
+    "section_4_6": ("company", "effect"),
+}
+
+SECTION_DESCRIPTIONS = {
+    "section_2_1": "会社の沿革やこれまでの既存事業の内容",
+    "section_2_2": "物価高騰による経営面等への影響",
+    "section_3_1": "事業の内容",
+    "section_3_2": "賃上げの具体的な計画",
+    "section_4_1": "付加価値額の増加",
+    "section_4_2": "賃上げの内容",
+    "section_4_3": "持続性",
+    "section_4_4": "有効性",
+    "section_4_5": "波及性",
+    "section_4_6": "その他特筆すべき事項",
+}
+
 
 def format_company_info(data: dict) -> str:
     lines = []
@@ -153,18 +249,105 @@ def format_wage_info(data: dict) -> str:
     return "\n".join(lines)
 
 
-def build_full_prompt(hearing_data: dict) -> str:
-    """全データからフルプロンプトを構築"""
+_DATA_GROUPS = [
+    ("company", "## 企業基本情報", format_company_info),
+    ("price_impact", "## 物価高騰の影響", format_price_impact),
+    ("business", "## 補助事業の内容", format_business_content),
+    ("effect", "## 補助事業の効果", format_effect_info),
+    ("wage", "## 賃上げ計画", format_wage_info),
+]
+
+
+def format_all_data(hearing_data: dict, groups=None) -> str:
+    """全データ（groups指定時はその区分のみ）を企業・事業情報のテキストに整形"""
     sections = []
-    sections.append("## 企業基本情報")
-    sections.append(format_company_info(hearing_data.get("company", {})))
-    sections.append("\n## 物価高騰の影響")
-    sections.append(format_price_impact(hearing_data.get("price_impact", {})))
-    sections.append("\n## 補助事業の内容")
-    sections.append(format_business_content(hearing_data.get("business", {})))
-    sections.append("\n## 補助事業の効果")
-    sections.append(format_effect_info(hearing_data.get("effect", {})))
-    sections.append("\n## 賃上げ計画")
-    sections.append(format_wage_info(hearing_data.get("wage", {})))
-    all_data = "\n".join(sections)
-    return FULL_PLAN_PROMPT.format(all_data=all_data, system_prompt=SYSTEM_PROMPT)
+    for name, heading, formatter in _DATA_GROUPS:
+        if groups is not None and name not in groups:
+            continue
+        sections.append(("\n" if sections else "") + heading)
+        sections.append(formatter(hearing_data.get(name, {})))
+    return "\n".join(sections)
+
+
+def build_context_prompt(hearing_data: dict) -> str:
+    """企業情報部分（全リクエスト共通の静的な前半）を構築"""
+    return CONTEXT_PROMPT.format(all_data=format_all_data(hearing_data))
+
+
+def build_section_instruction(targets: dict[str, int], tool: bool = True) -> str:
+    """指定セクションだけを生成する指示（後半）を構築
+
+    Args:
+        targets: セクションキー → 目標文字数
+        tool: write_sections ツールで出力させる（False なら ```json ブロック）
+    """
+    spec = ",\n".join(
+        f'  "{key}": "{SECTION_DESCRIPTIONS[key]}（{chars}字程度）"'
+        for key, chars in targets.items()
+    )
+    return SECTION_INSTRUCTION.format(output=build_output_format(spec, tool, allow_empty=True))
+
+
+def build_regenerate_prompt(
+    hearing_data: dict, key: str, target_chars: int, neighbours: dict[str, str], tool: bool = True,
+) -> str:
+    """1セクションの再生成プロンプトを構築
+
+    Args:
+        hearing_data: hearing_to_prompt_data の出力
+        key: 再生成するセクションキー
+        target_chars: 目標文字数
+        neighbours: 見出し → 採用済みの前後セクションの文章
+        tool: write_sections ツールで出力させる（False なら ```json ブロック）
+    """
+    context = CONTEXT_PROMPT.format(all_data=format_all_data(hearing_data, SECTION_DATA.get(key)))
+    neighbour_text = ""
+    if neighbours:
+        neighbour_text = NEIGHBOUR_PROMPT.format(
+            texts="\n".join(f"【{label}】\n{text}" for label, text in neighbours.items())
+        )
+    spec = f'  "{key}": "{SECTION_DESCRIPTIONS[key]}（{target_chars}字程度）"'
+    return context + REGENERATE_INSTRUCTION.format(
+        neighbours=neighbour_text, output=build_output_format(spec, tool, allow_empty=True),
+    )
+
+
+def build_adjust_prompt(
+    hearing_data: dict, key: str, text: str, target_chars: int, tool: bool = True,
+) -> str:
+    """1セクションの文字数を目標に合わせる（短縮・加筆）プロンプトを構築
+
+    Args:
+        hearing_data: hearing_to_prompt_data の出力
+        key: セクションキー
+        text: 現在の文章
+        target_chars: 目標文字数
+        tool: write_sections ツールで出力させる（False なら ```json ブロック）
+    """
+    context = CONTEXT_PROMPT.format(all_data=format_all_data(hearing_data, SECTION_DATA.get(key)))
+    if len(text) > target_chars:
+        direction = "短く書き直してください"
+    else:
+        direction = "ヒアリングデータの具体的な内容を補って書き足してください"
+    spec = f'  "{key}": "{SECTION_DESCRIPTIONS[key]}（{target_chars}字程度）"'
+    return context + ADJUST_INSTRUCTION.format(
+        direction=direction, target_chars=target_chars, current_chars=len(text), text=text,
+        output=build_output_format(spec, tool),
+    )
+
+
+def build_full_prompt(hearing_data: dict, tool: bool = True) -> str:
+    """全データからフルプロンプトを構築（tool=False なら ```json ブロックで出力させる）"""
+    instruction = FULL_PLAN_INSTRUCTION if tool else FULL_PLAN_JSON_INSTRUCTION
+    return build_context_prompt(hearing_data) + instruction
+
+
+def build_section_prompt(hearing_data: dict, targets: dict[str, int], tool: bool = True) -> str:
+    """指定セクションだけを生成するプロンプトを構築
+
+    Args:
+        hearing_data: hearing_to_prompt_data の出力
+        targets: セクションキー → 目標文字数
+        tool: write_sections ツールで出力させる（False なら ```json ブロック）
+    """
+    return build_context_prompt(hearing_data) + build_section_instruction(targets, tool)
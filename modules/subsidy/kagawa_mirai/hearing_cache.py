@@ -0,0 +1,121 @@
+"""香川県未来投資応援補助金 ヒアリングシートのパース結果キャッシュ
+
+アップロードされたバイト列のSHA-256と READER_VERSION をキーに、読み込み済みの
+HearingData をJSONでローカルディスクに保存する。内容が同じシートの再アップロードは
+openpyxl を通さずに復元し、内容が1バイトでも変われば別キーになる。
+
+ディスク上のファイルなので、Streamlitの複数セッションやバッチ処理のワーカー
+プロセスから共有できる。合計サイズが上限を超えたら最終アクセスが古い順に削除する。
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from .data_models import HearingData, SubsidyExpenseItem
+from .hearing_reader import READER_VERSION, _SECTION_CLASSES, load_hearing_sheet
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("KAGAWA_HEARING_CACHE_DIR")
+    or Path.home() / ".cache" / "subsidy-ai-apps" / "hearing"
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def hearing_to_dict(data: HearingData) -> dict:
+    """HearingDataをJSON化できるdictに変換"""
+    return dataclasses.asdict(data)
+
+
+def hearing_from_dict(d: dict) -> HearingData:
+    """hearing_to_dictの逆変換"""
+    data = HearingData(**{
+        section: cls(**d.get(section, {}))
+        for section, cls in _SECTION_CLASSES.items()
+    })
+    data.expenses = [SubsidyExpenseItem(**e) for e in d.get("expenses", [])]
+    data.generated_texts = dict(d.get("generated_texts", {}))
+    return data
+
+
+class HearingCache:
+    """ディスク上のLRUキャッシュ（アップロード内容のハッシュ → HearingData）"""
+
+    def __init__(self, cache_dir: Path | str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key_for(payload: bytes) -> str:
+        """バイト列とリーダーのバージョンからキャッシュキーを作る"""
+        h = hashlib.sha256(payload)
+        h.update(f"\0reader-v{READER_VERSION}".encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> HearingData | None:
+        """キャッシュ済みならHearingDataを返す（壊れたエントリは削除してNone）"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = hearing_from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # LRU用に最終アクセス時刻を更新
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key: str, data: HearingData):
+        """HearingDataを保存し、上限を超えた分を古い順に削除する"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(hearing_to_dict(data), f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def load(self, payload: bytes) -> HearingData:
+        """キャッシュにあれば復元し、なければ読み込んで保存する"""
+        key = self.key_for(payload)
+        data = self.get(key)
+        if data is None:
+            data = load_hearing_sheet(payload)
+            self.put(key, data)
+        return data
+
+
+@lru_cache(maxsize=1)
+def get_default_cache() -> HearingCache:
+    """プロセス内で共有する既定のキャッシュ"""
+    return HearingCache()
+
+
+def load_hearing_sheet_cached(payload: bytes, cache: HearingCache | None = None) -> HearingData:
+    """load_hearing_sheet のキャッシュ付き版"""
+    return (cache or get_default_cache()).load(payload)
@@ -1,5 +1,7 @@
 """香川県未来投資応援補助金 ヒアリングシート読み込み"""
 
+import io
+
 import openpyxl
 
 from .data_models import (
@@ -8,11 +10,145 @@ from .data_models import (
 )
 
 
-def read_hearing_sheet(file_path: str) -> HearingData:
-    """ヒアリングシートExcelを読み込み、HearingDataを返す。
+# セル配置や変換規則を変えたら上げる（パース結果キャッシュのキーに含まれる）
+READER_VERSION = "2"
+
+# ヒアリングシートのセル配置: (シート名, 行, 列, セクション, 属性名, 型, デフォルト値)
+_FIELD_SPECS = [
+    # Sheet 1: 企業基本情報
+    ("1_企業基本情報", 6, 2, "company", "name", str, ""),
+    ("1_企業基本情報", 7, 2, "company", "corporate_number", str, ""),
+    ("1_企業基本情報", 8, 2, "company", "representative", str, ""),
+    ("1_企業基本情報", 9, 2, "company", "representative_title", str, "代表取締役"),
+    ("1_企業基本情報", 10, 2, "company", "postal_code", str, ""),
+    ("1_企業基本情報", 11, 2, "company", "address", str, ""),
+    ("1_企業基本情報", 12, 2, "company", "phone", str, ""),
+    ("1_企業基本情報", 13, 2, "company", "fax", str, ""),
+    ("1_企業基本情報", 14, 2, "company", "email", str, ""),
+    ("1_企業基本情報", 15, 2, "company", "industry", str, ""),
+    ("1_企業基本情報", 16, 2, "company", "industry_code", str, ""),
+    ("1_企業基本情報", 17, 2, "company", "business_description", str, ""),
+    ("1_企業基本情報", 18, 2, "company", "employee_count", int, 0),
+    ("1_企業基本情報", 19, 2, "company", "capital", int, 0),
+    ("1_企業基本情報", 20, 2, "company", "established_date", str, ""),
+    ("1_企業基本情報", 21, 2, "company", "fiscal_month", int, 0),
+    ("1_企業基本情報", 22, 2, "company", "entity_type", str, ""),
+    ("1_企業基本情報", 23, 2, "company", "sales_category", str, ""),
+    # Sheet 2: 事業と物価高騰
+    ("2_事業と物価高騰", 4, 2, "price_impact", "history", str, ""),
+    ("2_事業と物価高騰", 5, 2, "price_impact", "main_business", str, ""),
+    ("2_事業と物価高騰", 6, 2, "price_impact", "strengths", str, ""),
+    ("2_事業と物価高騰", 7, 2, "price_impact", "customers", str, ""),
+    ("2_事業と物価高騰", 8, 2, "price_impact", "achievements", str, ""),
+    ("2_事業と物価高騰", 10, 2, "price_impact", "material_name", str, ""),
+    ("2_事業と物価高騰", 11, 2, "price_impact", "price_increase_rate", str, ""),
+    ("2_事業と物価高騰", 12, 2, "price_impact", "monthly_cost_increase", str, ""),
+    ("2_事業と物価高騰", 13, 2, "price_impact", "energy_impact", str, ""),
+    ("2_事業と物価高騰", 14, 2, "price_impact", "labor_cost_impact", str, ""),
+    ("2_事業と物価高騰", 15, 2, "price_impact", "annual_total_increase", str, ""),
+    ("2_事業と物価高騰", 16, 2, "price_impact", "cost_to_sales_ratio", str, ""),
+    ("2_事業と物価高騰", 17, 2, "price_impact", "countermeasures", str, ""),
+    ("2_事業と物価高騰", 18, 2, "price_impact", "limitations", str, ""),
+    # Sheet 3: 補助事業の内容
+    ("3_補助事業の内容", 4, 2, "business", "project_name", str, ""),
+    ("3_補助事業の内容", 5, 2, "business", "purpose", str, ""),
+    ("3_補助事業の内容", 6, 2, "business", "method", str, ""),
+    ("3_補助事業の内容", 7, 2, "business", "current_field", str, ""),
+    ("3_補助事業の内容", 8, 2, "business", "plan_field", str, ""),
+    ("3_補助事業の内容", 10, 2, "business", "equipment_name", str, ""),
+    ("3_補助事業の内容", 11, 2, "business", "equipment_description", str, ""),
+    ("3_補助事業の内容", 12, 2, "business", "equipment_maker", str, ""),
+    ("3_補助事業の内容", 13, 2, "business", "selection_reason", str, ""),
+    ("3_補助事業の内容", 14, 2, "business", "before_process", str, ""),
+    ("3_補助事業の内容", 15, 2, "business", "after_process", str, ""),
+    ("3_補助事業の内容", 16, 2, "business", "comparison", str, ""),
+    ("3_補助事業の内容", 18, 2, "business", "schedule_order", str, ""),
+    ("3_補助事業の内容", 19, 2, "business", "schedule_delivery", str, ""),
+    ("3_補助事業の内容", 20, 2, "business", "schedule_start", str, ""),
+    ("3_補助事業の内容", 21, 2, "business", "schedule_complete", str, ""),
+    # Sheet 4: 補助事業の効果
+    ("4_補助事業の効果", 4, 2, "effect", "sales_increase_annual", int, 0),
+    ("4_補助事業の効果", 5, 2, "effect", "sales_increase_reason", str, ""),
+    ("4_補助事業の効果", 6, 2, "effect", "cost_reduction_annual", int, 0),
+    ("4_補助事業の効果", 7, 2, "effect", "cost_reduction_reason", str, ""),
+    ("4_補助事業の効果", 9, 2, "effect", "useful_life", str, ""),
+    ("4_補助事業の効果", 10, 2, "effect", "maintenance", str, ""),
+    ("4_補助事業の効果", 11, 2, "effect", "ease_of_operation", str, ""),
+    ("4_補助事業の効果", 12, 2, "effect", "payback_estimate", str, ""),
+    ("4_補助事業の効果", 14, 2, "effect", "regional_contribution", str, ""),
+    ("4_補助事業の効果", 15, 2, "effect", "reference_for_others", str, ""),
+    ("4_補助事業の効果", 16, 2, "effect", "other_notes", str, ""),
+    # Sheet 5: 賃上げ計画
+    ("5_賃上げ計画", 4, 2, "wage", "start_date", str, ""),
+    ("5_賃上げ計画", 5, 2, "wage", "target_employees", str, ""),
+    ("5_賃上げ計画", 6, 2, "wage", "method", str, ""),
+    ("5_賃上げ計画", 7, 2, "wage", "amount", str, ""),
+    ("5_賃上げ計画", 8, 2, "wage", "annual_increase", int, 0),
+    ("5_賃上げ計画", 9, 2, "wage", "funding_source", str, ""),
+    # Sheet 6: 財務情報
+    ("6_財務情報", 5, 2, "financial", "sales", int, 0),
+    ("6_財務情報", 6, 2, "financial", "operating_profit", int, 0),
+    ("6_財務情報", 7, 2, "financial", "personnel_cost", int, 0),
+    ("6_財務情報", 8, 2, "financial", "depreciation", int, 0),
+    ("6_財務情報", 9, 2, "financial", "salary_total", int, 0),
+    ("6_財務情報", 10, 2, "financial", "employee_count", int, 1),
+]
+
+_SECTION_CLASSES = {
+    "company": CompanyInfo,
+    "price_impact": PriceImpact,
+    "business": BusinessPlan,
+    "effect": EffectPlan,
+    "wage": WagePlan,
+    "financial": FinancialInfo,
+}
+
+# Sheet 7: 補助対象経費（B〜F列 × 5〜19行）
+_EXPENSE_SHEET = "7_補助対象経費"
+_EXPENSE_ROWS = (5, 19)
+_EXPENSE_COLS = (2, 6)
+
+
+def _convert(value, type_, default):
+    """旧get_cellと同じ規則でセル値を変換する"""
+    if value is None:
+        value = default
+    if type_ is int:
+        return int(value or default)
+    return str(value)
+
+
+def _compile_field_table(specs) -> dict:
+    """セル配置をシート単位の読み取り範囲と (行, 列) → フィールド の表にまとめる"""
+    table = {}
+    for sheet, row, col, section, attr, type_, default in specs:
+        entry = table.setdefault(sheet, {"min_row": row, "max_row": row, "max_col": col, "cells": {}})
+        entry["min_row"] = min(entry["min_row"], row)
+        entry["max_row"] = max(entry["max_row"], row)
+        entry["max_col"] = max(entry["max_col"], col)
+        entry["cells"][(row, col)] = (section, attr, type_, default)
+    return table
+
+
+_FIELD_TABLE = _compile_field_table(_FIELD_SPECS)
+
+
+def _open_source(source):
+    """bytes / ファイルライクオブジェクト / パスを openpyxl が読める形に揃える"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def load_hearing_sheet(source) -> HearingData:
+    """ヒアリングシートを読み取り専用モードで1パス読み込みし、HearingDataを返す。
+
+    各シートは必要な行範囲だけを一度ずつ走査し、事前にまとめたセル配置表で
+    フィールドへ振り分ける。アップロードされたバイト列をそのまま渡せるため、
+    一時ファイルへの書き出しは不要。
 
     Args:
-        file_path: ヒアリングシートのファイルパス
+        source: xlsxのバイト列、ファイルライクオブジェクト、またはファイルパス
 
     Returns:
         HearingData: 読み込んだヒアリングデータ
@@ -21,130 +157,74 @@ def read_hearing_sheet(file_path: str) -> HearingData:
         FileNotFoundError: ファイルが見つからない場合
         ValueError: シート構造が不正な場合
     """
-    wb = openpyxl.load_workbook(file_path, data_only=True)
-    data = HearingData()
+    wb = openpyxl.load_workbook(_open_source(source), read_only=True, data_only=True)
+    try:
+        sheet_names = set(wb.sheetnames)
+        values = {
+            section: {
+                attr: _convert(None, type_, default)
+                for _, _, _, sec, attr, type_, default in _FIELD_SPECS
+                if sec == section
+            }
+            for section in _SECTION_CLASSES
+        }
 
-    def get_cell(sheet_name, row, col, default=""):
-        try:
-            ws = wb[sheet_name]
-            val = ws.cell(row=row, column=col).value
-            return val if val is not None else default
-        except Exception:
-            return default
+        for sheet_name, entry in _FIELD_TABLE.items():
+            if sheet_name not in sheet_names:
+                continue
+            cells = entry["cells"]
+            rows = wb[sheet_name].iter_rows(
+                min_row=entry["min_row"], max_row=entry["max_row"],
+                max_col=entry["max_col"], values_only=True,
+            )
+            for row_idx, row in enumerate(rows, start=entry["min_row"]):
+                for col_idx, value in enumerate(row, start=1):
+                    field_spec = cells.get((row_idx, col_idx))
+                    if field_spec is None or value is None:
+                        continue
+                    section, attr, type_, default = field_spec
+                    values[section][attr] = _convert(value, type_, default)
 
-    # Sheet 1: 企業基本情報
-    data.company = CompanyInfo(
-        name=str(get_cell("1_企業基本情報", 6, 2, "")),
-        corporate_number=str(get_cell("1_企業基本情報", 7, 2, "")),
-        representative=str(get_cell("1_企業基本情報", 8, 2, "")),
-        representative_title=str(get_cell("1_企業基本情報", 9, 2, "代表取締役")),
-        postal_code=str(get_cell("1_企業基本情報", 10, 2, "")),
-        address=str(get_cell("1_企業基本情報", 11, 2, "")),
-        phone=str(get_cell("1_企業基本情報", 12, 2, "")),
-        fax=str(get_cell("1_企業基本情報", 13, 2, "")),
-        email=str(get_cell("1_企業基本情報", 14, 2, "")),
-        industry=str(get_cell("1_企業基本情報", 15, 2, "")),
-        industry_code=str(get_cell("1_企業基本情報", 16, 2, "")),
-        business_description=str(get_cell("1_企業基本情報", 17, 2, "")),
-        employee_count=int(get_cell("1_企業基本情報", 18, 2, 0) or 0),
-        capital=int(get_cell("1_企業基本情報", 19, 2, 0) or 0),
-        established_date=str(get_cell("1_企業基本情報", 20, 2, "")),
-        fiscal_month=int(get_cell("1_企業基本情報", 21, 2, 0) or 0),
-        entity_type=str(get_cell("1_企業基本情報", 22, 2, "")),
-        sales_category=str(get_cell("1_企業基本情報", 23, 2, "")),
-    )
+        data = HearingData(**{
+            section: cls(**values[section])
+            for section, cls in _SECTION_CLASSES.items()
+        })
 
-    # Sheet 2: 事業と物価高騰
-    data.price_impact = PriceImpact(
-        history=str(get_cell("2_事業と物価高騰", 4, 2, "")),
-        main_business=str(get_cell("2_事業と物価高騰", 5, 2, "")),
-        strengths=str(get_cell("2_事業と物価高騰", 6, 2, "")),
-        customers=str(get_cell("2_事業と物価高騰", 7, 2, "")),
-        achievements=str(get_cell("2_事業と物価高騰", 8, 2, "")),
-        material_name=str(get_cell("2_事業と物価高騰", 10, 2, "")),
-        price_increase_rate=str(get_cell("2_事業と物価高騰", 11, 2, "")),
-        monthly_cost_increase=str(get_cell("2_事業と物価高騰", 12, 2, "")),
-        energy_impact=str(get_cell("2_事業と物価高騰", 13, 2, "")),
-        labor_cost_impact=str(get_cell("2_事業と物価高騰", 14, 2, "")),
-        annual_total_increase=str(get_cell("2_事業と物価高騰", 15, 2, "")),
-        cost_to_sales_ratio=str(get_cell("2_事業と物価高騰", 16, 2, "")),
-        countermeasures=str(get_cell("2_事業と物価高騰", 17, 2, "")),
-        limitations=str(get_cell("2_事業と物価高騰", 18, 2, "")),
-    )
+        if _EXPENSE_SHEET in sheet_names:
+            rows = wb[_EXPENSE_SHEET].iter_rows(
+                min_row=_EXPENSE_ROWS[0], max_row=_EXPENSE_ROWS[1],
+                min_col=_EXPENSE_COLS[0], max_col=_EXPENSE_COLS[1], values_only=True,
+            )
+            for category, item_name, amount, has_quote, note in rows:
+                if not item_name:
+                    continue
+                data.expenses.append(SubsidyExpenseItem(
+                    category=str(category or ""),
+                    item_name=str(item_name),
+                    amount=int(amount or 0),
+                    has_quote=bool(has_quote),
+                    note=str(note or ""),
+                ))
+    finally:
+        wb.close()
 
-    # Sheet 3: 補助事業の内容
-    data.business = BusinessPlan(
-        project_name=str(get_cell("3_補助事業の内容", 4, 2, "")),
-        purpose=str(get_cell("3_補助事業の内容", 5, 2, "")),
-        method=str(get_cell("3_補助事業の内容", 6, 2, "")),
-        current_field=str(get_cell("3_補助事業の内容", 7, 2, "")),
-        plan_field=str(get_cell("3_補助事業の内容", 8, 2, "")),
-        equipment_name=str(get_cell("3_補助事業の内容", 10, 2, "")),
-        equipment_description=str(get_cell("3_補助事業の内容", 11, 2, "")),
-        equipment_maker=str(get_cell("3_補助事業の内容", 12, 2, "")),
-        selection_reason=str(get_cell("3_補助事業の内容", 13, 2, "")),
-        before_process=str(get_cell("3_補助事業の内容", 14, 2, "")),
-        after_process=str(get_cell("3_補助事業の内容", 15, 2, "")),
-        comparison=str(get_cell("3_補助事業の内容", 16, 2, "")),
-        schedule_order=str(get_cell("3_補助事業の内容", 18, 2, "")),
-        schedule_delivery=str(get_cell("3_補助事業の内容", 19, 2, "")),
-        schedule_start=str(get_cell("3_補助事業の内容", 20, 2, "")),
-        schedule_complete=str(get_cell("3_補助事業の内容", 21, 2, "")),
-    )
+    return data
 
-    # Sheet 4: 補助事業の効果
-    data.effect = EffectPlan(
-        sales_increase_annual=int(get_cell("4_補助事業の効果", 4, 2, 0) or 0),
-        sales_increase_reason=str(get_cell("4_補助事業の効果", 5, 2, "")),
-        cost_reduction_annual=int(get_cell("4_補助事業の効果", 6, 2, 0) or 0),
-        cost_reduction_reason=str(get_cell("4_補助事業の効果", 7, 2, "")),
-        useful_life=str(get_cell("4_補助事業の効果", 9, 2, "")),
-        maintenance=str(get_cell("4_補助事業の効果", 10, 2, "")),
-        ease_of_operation=str(get_cell("4_補助事業の効果", 11, 2, "")),
-        payback_estimate=str(get_cell("4_補助事業の効果", 12, 2, "")),
-        regional_contribution=str(get_cell("4_補助事業の効果", 14, 2, "")),
-        reference_for_others=str(get_cell("4_補助事業の効果", 15, 2, "")),
-        other_notes=str(get_cell("4_補助事業の効果", 16, 2, "")),
-    )
 
-    # Sheet 5: 賃上げ計画
-    data.wage = WagePlan(
-        start_date=str(get_cell("5_賃上げ計画", 4, 2, "")),
-        target_employees=str(get_cell("5_賃上げ計画", 5, 2, "")),
-        method=str(get_cell("5_賃上げ計画", 6, 2, "")),
-        amount=str(get_cell("5_賃上げ計画", 7, 2, "")),
-        annual_increase=int(get_cell("5_賃上げ計画", 8, 2, 0) or 0),
-        funding_source=str(get_cell("5_賃上げ計画", 9, 2, "")),
-    )
+def read_hearing_sheet(file_path: str) -> HearingData:
+    """ヒアリングシートExcelを読み込み、HearingDataを返す。
 
-    # Sheet 6: 財務情報
-    data.financial = FinancialInfo(
-        sales=int(get_cell("6_財務情報", 5, 2, 0) or 0),
-        operating_profit=int(get_cell("6_財務情報", 6, 2, 0) or 0),
-        personnel_cost=int(get_cell("6_財務情報", 7, 2, 0) or 0),
-        depreciation=int(get_cell("6_財務情報", 8, 2, 0) or 0),
-        salary_total=int(get_cell("6_財務情報", 9, 2, 0) or 0),
-        employee_count=int(get_cell("6_財務情報", 10, 2, 1) or 1),
-    )
-
-    # Sheet 7: 補助対象経費
-    try:
-        ws_exp = wb["7_補助対象経費"]
-        for row in range(5, 20):
-            item_name = ws_exp.cell(row=row, column=3).value
-            if not item_name:
-                continue
-            data.expenses.append(SubsidyExpenseItem(
-                category=str(ws_exp.cell(row=row, column=2).value or ""),
-                item_name=str(item_name),
-                amount=int(ws_exp.cell(row=row, column=4).value or 0),
-                has_quote=bool(ws_exp.cell(row=row, column=5).value),
-                note=str(ws_exp.cell(row=row, column=6).value or ""),
-            ))
-    except KeyError:
-        pass
+    Args:
+        file_path: ヒアリングシートのファイルパス
 
-    return data
+    Returns:
+        HearingData: 読み込んだヒアリングデータ
+
+    Raises:
+        FileNotFoundError: ファイルが見つからない場合
+        ValueError: シート構造が不正な場合
+    """
+    return load_hearing_sheet(file_path)
 
 
 def hearing_to_prompt_data(data: HearingData) -> dict:
@@ -0,0 +1,302 @@
+"""香川県未来投資応援補助金 テンプレートのZIPを直接書き換える書類ライター
+
+openpyxl / python-docx はパッケージ全体を解析して書き出し直すため、数十セルを
+書くだけでも時間がかかり、対応していない部品（フォームのチェックボックス、
+図形など）は保存時に落ちる。ここではテンプレートのZIPのうち書き込みのある
+XMLの部品だけを書き換え、それ以外の部品はテンプレートの内容のまま詰め直す。
+
+- xlsx: 対象シートのXMLと共有文字列（sharedStrings.xml）
+- docx: 本文（word/document.xml）
+
+書き込む側（write_plan の apply_*）からは openpyxl の Workbook・
+python-docx の表と同じように使える。
+"""
+
+import io
+import posixpath
+import zipfile
+
+from docx.oxml import parse_xml
+from docx.table import Table
+from lxml import etree
+from openpyxl.utils.cell import (
+    column_index_from_string, coordinate_from_string, get_column_letter, range_boundaries,
+)
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_OFFICE_DOCUMENT = f"{_REL_NS}/officeDocument"
+_SHARED_STRINGS = f"{_REL_NS}/sharedStrings"
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _m(tag: str) -> str:
+    return f"{{{_MAIN_NS}}}{tag}"
+
+
+def _serialize(root) -> bytes:
+    """部品のXMLをバイト列にする（python-docx の serialize_part_xml と同じ形式）"""
+    return etree.tostring(root, encoding="UTF-8", standalone=True)
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    """部品のリレーションシップ Id → (Type, 参照先の部品名)（外部参照は除く）"""
+    directory, name = posixpath.split(part)
+    rels_name = posixpath.join(directory, "_rels", f"{name}.rels")
+    if rels_name not in archive.namelist():
+        return {}
+    rels = {}
+    for rel in etree.fromstring(archive.read(rels_name)).iter(f"{{{_PKG_REL_NS}}}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(directory, target))
+        rels[rel.get("Id")] = (rel.get("Type"), target)
+    return rels
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    """パッケージの本体の部品名（xl/workbook.xml, word/document.xml など）"""
+    for type_, target in _relationships(archive, "").values():
+        if type_ == _OFFICE_DOCUMENT:
+            return target
+    raise ValueError("officeDocument の部品がありません")
+
+
+def _rezip(archive: zipfile.ZipFile, replaced: dict[str, bytes]) -> bytes:
+    """replaced の部品だけ差し替え、他の部品はテンプレートの内容のまま詰め直す"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as out:
+        for info in archive.infolist():
+            content = replaced[info.filename] if info.filename in replaced else archive.read(info)
+            # writestr は渡した ZipInfo のサイズ・CRCを書き換えるので、テンプレートのものは渡さない
+            part = zipfile.ZipInfo(info.filename, info.date_time)
+            part.compress_type = info.compress_type
+            part.external_attr = info.external_attr
+            out.writestr(part, content)
+    return buffer.getvalue()
+
+
+def _text(element) -> str:
+    """si / is 要素の文字列（ふりがな rPh は含めない）"""
+    return "".join(t.text or "" for t in element.iter(_m("t")) if t.getparent().tag != _m("rPh"))
+
+
+class _Cell:
+    """シートのセル（openpyxl の Cell と同じく .value で読み書きする）"""
+
+    def __init__(self, sheet: "_SheetPatch", coordinate: str):
+        self._sheet = sheet
+        self.coordinate = coordinate
+
+    @property
+    def value(self):
+        return self._sheet._read(self.coordinate)
+
+    @value.setter
+    def value(self, value):
+        self._sheet._write(self.coordinate, value)
+
+
+class _SheetPatch:
+    """XlsxPatch の1シート（ws[座標] = 値 / ws[座標].value で読み書きする）"""
+
+    def __init__(self, book: "XlsxPatch", part: str):
+        self._book = book
+        self.part = part
+        self.root = etree.fromstring(book._archive.read(part))
+        self._sheet_data = self.root.find(_m("sheetData"))
+        self._rows = {int(row.get("r")): row for row in self._sheet_data.iter(_m("row"))}
+        self._cells = {c.get("r"): c for row in self._rows.values() for c in row.iter(_m("c"))}
+        self.changed = False
+
+    def __getitem__(self, coordinate: str) -> _Cell:
+        return _Cell(self, coordinate)
+
+    def __setitem__(self, coordinate: str, value):
+        self._write(coordinate, value)
+
+    def _read(self, coordinate: str):
+        c = self._cells.get(coordinate)
+        if c is None:
+            return None
+        type_ = c.get("t", "n")
+        if type_ == "inlineStr":
+            is_ = c.find(_m("is"))
+            return _text(is_) if is_ is not None else None
+        v = c.find(_m("v"))
+        if v is None or v.text is None:
+            return None
+        if type_ == "s":
+            return self._book._strings[int(v.text)]
+        if type_ == "b":
+            return v.text == "1"
+        if type_ == "n":
+            return float(v.text) if any(ch in v.text for ch in ".eE") else int(v.text)
+        return v.text
+
+    def _cell(self, coordinate: str):
+        """セルの要素（なければ行・列の順を保って作る）"""
+        c = self._cells.get(coordinate)
+        if c is not None:
+            return c
+        column, row_number = coordinate_from_string(coordinate)
+        row = self._rows.get(row_number)
+        if row is None:
+            row = etree.Element(_m("row"), r=str(row_number))
+            following = [r for n, r in self._rows.items() if n > row_number]
+            if following:
+                min(following, key=lambda r: int(r.get("r"))).addprevious(row)
+            else:
+                self._sheet_data.append(row)
+            self._rows[row_number] = row
+        c = etree.Element(_m("c"), r=coordinate)
+        column_index = column_index_from_string(column)
+        for sibling in row.iter(_m("c")):
+            if column_index_from_string(coordinate_from_string(sibling.get("r"))[0]) > column_index:
+                sibling.addprevious(c)
+                break
+        else:
+            row.append(c)
+        self._cells[coordinate] = c
+        self._extend_dimension(coordinate)
+        return c
+
+    def _extend_dimension(self, coordinate: str):
+        dimension = self.root.find(_m("dimension"))
+        if dimension is None:
+            return
+        min_col, min_row, max_col, max_row = range_boundaries(dimension.get("ref"))
+        column, row = coordinate_from_string(coordinate)
+        col = column_index_from_string(column)
+        min_col, max_col = min(min_col, col), max(max_col, col)
+        min_row, max_row = min(min_row, row), max(max_row, row)
+        dimension.set(
+            "ref", f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"
+        )
+
+    def _write(self, coordinate: str, value):
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise TypeError(f"Cannot convert {value!r} to Excel")
+        c = self._cell(coordinate)
+        if c.get("t") == "s":
+            self._book._sst_refs -= 1
+        for child in list(c):
+            if child.tag in (_m("f"), _m("v"), _m("is")):
+                c.remove(child)
+        c.attrib.pop("t", None)
+        self.changed = True
+        if value is None or value == "":
+            # openpyxl と同じく空文字は値のないセルにする
+            return
+
+        if isinstance(value, bool):
+            c.set("t", "b")
+            text = "1" if value else "0"
+        elif isinstance(value, (int, float)):
+            c.set("t", "n")
+            text = repr(value)
+        elif self._book._sst is not None:
+            c.set("t", "s")
+            text = str(self._book._shared_string(value))
+            self._book._sst_refs += 1
+        else:
+            # 共有文字列の部品がないブックはセルに直接書く
+            c.set("t", "inlineStr")
+            t = etree.SubElement(etree.SubElement(c, _m("is")), _m("t"))
+            t.text = value
+            if value != value.strip():
+                t.set(_XML_SPACE, "preserve")
+            return
+        # v は extLst の前に置く
+        v = etree.Element(_m("v"))
+        v.text = text
+        ext = c.find(_m("extLst"))
+        if ext is not None:
+            ext.addprevious(v)
+        else:
+            c.append(v)
+
+
+class XlsxPatch:
+    """xlsx テンプレートへの書き込みを、シートのXMLと共有文字列に直接反映する
+
+    openpyxl の Workbook と同じく wb[シート名] でシートを取り出し、
+    ws[座標] = 値 / ws[座標].value で読み書きする。to_bytes() で書き込み後の
+    xlsx を返す。セルの書式（s 属性）はテンプレートのまま。
+    値は str（共有文字列）、int / float、bool、None・空文字（値を消す）に対応する。
+    """
+
+    def __init__(self, template: bytes):
+        self._archive = zipfile.ZipFile(io.BytesIO(template))
+        workbook_part = _main_part(self._archive)
+        rels = _relationships(self._archive, workbook_part)
+        workbook = etree.fromstring(self._archive.read(workbook_part))
+        self._sheet_parts = {
+            sheet.get("name"): rels[sheet.get(f"{{{_REL_NS}}}id")][1]
+            for sheet in workbook.iter(_m("sheet"))
+        }
+        self._sheets: dict[str, _SheetPatch] = {}
+
+        self._sst_part = next((target for type_, target in rels.values() if type_ == _SHARED_STRINGS), None)
+        self._sst = etree.fromstring(self._archive.read(self._sst_part)) if self._sst_part else None
+        self._strings = [_text(si) for si in self._sst.iter(_m("si"))] if self._sst is not None else []
+        self._string_index = {}
+        for i, s in enumerate(self._strings):
+            self._string_index.setdefault(s, i)
+        self._unique_strings = len(self._strings)
+        self._sst_count = int(self._sst.get("count", 0)) if self._sst is not None else 0
+        self._sst_refs = 0  # 書き込みによる共有文字列の参照数の増減
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return list(self._sheet_parts)
+
+    def __getitem__(self, sheet_name: str) -> _SheetPatch:
+        if sheet_name not in self._sheet_parts:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        if sheet_name not in self._sheets:
+            self._sheets[sheet_name] = _SheetPatch(self, self._sheet_parts[sheet_name])
+        return self._sheets[sheet_name]
+
+    def _shared_string(self, value: str) -> int:
+        index = self._string_index.get(value)
+        if index is None:
+            si = etree.SubElement(self._sst, _m("si"))
+            t = etree.SubElement(si, _m("t"))
+            t.text = value
+            if value != value.strip():
+                t.set(_XML_SPACE, "preserve")
+            index = len(self._strings)
+            self._strings.append(value)
+            self._string_index[value] = index
+        return index
+
+    def to_bytes(self) -> bytes:
+        """書き込み後の xlsx のバイト列"""
+        replaced = {sheet.part: _serialize(sheet.root) for sheet in self._sheets.values() if sheet.changed}
+        if self._sst is not None and (self._sst_refs or len(self._strings) != self._unique_strings):
+            if self._sst.get("count") is not None:
+                self._sst.set("count", str(self._sst_count + self._sst_refs))
+            self._sst.set("uniqueCount", str(len(self._strings)))
+            replaced[self._sst_part] = _serialize(self._sst)
+        return _rezip(self._archive, replaced)
+
+
+class DocxPatch:
+    """docx テンプレートの本文の表への書き込みを word/document.xml に直接反映する
+
+    tables は python-docx の Table（doc.tables と同じ）で、セルの書き換え方も
+    python-docx と同じ。to_bytes() で本文だけを書き出し直した docx を返す。
+    """
+
+    def __init__(self, template: bytes):
+        self._archive = zipfile.ZipFile(io.BytesIO(template))
+        self._document_part = _main_part(self._archive)
+        self._root = parse_xml(self._archive.read(self._document_part))
+        self.tables = [Table(tbl, None) for tbl in self._root.body.tbl_lst]
+
+    def to_bytes(self) -> bytes:
+        """書き込み後の docx のバイト列"""
+        return _rezip(self._archive, {self._document_part: _serialize(self._root)})
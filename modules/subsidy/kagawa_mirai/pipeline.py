@@ -0,0 +1,102 @@
+"""香川県未来投資応援補助金 ヒアリングデータ → 計算結果の変換
+
+画面とバッチ処理で共通の、HearingDataから補助金額・3年計画を求める手順。
+"""
+
+from dataclasses import dataclass
+
+from .data_models import HearingData
+from .calculate_plan import (
+    FinancialData,
+    SubsidyExpense,
+    SubsidyCalculation,
+    ThreeYearPlan,
+    calculate_subsidy,
+    calculate_3year_plan,
+    estimate_depreciation,
+    calculate_investment_payback,
+)
+
+
+@dataclass
+class PlanResult:
+    """計算結果一式"""
+    financial: FinancialData
+    subsidy: SubsidyCalculation
+    plan: ThreeYearPlan
+    new_depreciation: int = 0
+    payback: float = 0.0
+
+
+def to_financial_data(data: HearingData) -> FinancialData:
+    """ヒアリングシートの財務情報（千円単位）を円単位のFinancialDataに変換"""
+    return FinancialData(
+        sales=data.financial.sales * 1000,
+        operating_profit=data.financial.operating_profit * 1000,
+        depreciation=data.financial.depreciation * 1000,
+        personnel_cost=data.financial.personnel_cost * 1000,
+        salary_total=data.financial.salary_total * 1000,
+        employee_count=data.financial.employee_count,
+    )
+
+
+def to_subsidy_expenses(data: HearingData) -> list[SubsidyExpense]:
+    """経費項目を計算用のSubsidyExpenseに変換"""
+    return [
+        SubsidyExpense(
+            category=e.category, item_name=e.item_name,
+            amount=e.amount, has_quote=e.has_quote,
+        )
+        for e in data.expenses
+    ]
+
+
+def is_sales_over_1billion(data: HearingData) -> bool:
+    """直近売上高区分が10億円以上か"""
+    return "10億" in data.company.sales_category and "以上" in data.company.sales_category
+
+
+def parse_useful_life(data: HearingData, default: int = 5) -> int:
+    """「10年」等の耐用年数表記を年数に変換（読めなければdefault）"""
+    useful_life_str = data.effect.useful_life.replace("年", "") if data.effect.useful_life else str(default)
+    try:
+        return int(useful_life_str)
+    except ValueError:
+        return default
+
+
+def compute_subsidy(data: HearingData) -> SubsidyCalculation:
+    """経費項目から補助金額を計算"""
+    return calculate_subsidy(
+        to_subsidy_expenses(data),
+        sales_over_1billion=is_sales_over_1billion(data),
+    )
+
+
+def compute_plan(
+    data: HearingData, financial: FinancialData, subsidy: SubsidyCalculation,
+) -> PlanResult:
+    """3年計画・投資回収期間を計算"""
+    new_dep = estimate_depreciation(
+        sum(e.amount for e in data.expenses),
+        useful_life=parse_useful_life(data),
+    )
+    plan = calculate_3year_plan(
+        financial=financial,
+        sales_increase_annual=data.effect.sales_increase_annual,
+        cost_reduction_annual=data.effect.cost_reduction_annual,
+        wage_increase_annual=data.wage.annual_increase,
+        new_depreciation=new_dep,
+        growth_start_year=1,
+    )
+    annual_effect = data.effect.sales_increase_annual + data.effect.cost_reduction_annual
+    payback = calculate_investment_payback(subsidy, annual_effect)
+    return PlanResult(
+        financial=financial, subsidy=subsidy, plan=plan,
+        new_depreciation=new_dep, payback=payback,
+    )
+
+
+def calculate_all(data: HearingData) -> PlanResult:
+    """補助金額・3年計画・投資回収期間をまとめて計算"""
+    return compute_plan(data, to_financial_data(data), compute_subsidy(data))
@@ -0,0 +1,158 @@
+"""香川県未来投資応援補助金 要件を満たす最小値の逆算
+
+calculate_3year_plan の3年目（効果の割合は開始年度によらず1.0）を式で解き、
+付加価値額・給与支給総額の要件を満たすのに必要な最小の
+賃上げ額・売上増加額・コスト削減額を求める。
+
+3年目の値は次のとおり（S: 売上増加額, C: コスト削減額, W: 賃上げ額, N: 新規減価償却費,
+g: 粗利率）:
+
+    付加価値額   = 基準年度 + int(S × g) + C + N   （賃上げ分は人件費と営業利益で相殺）
+    給与支給総額 = 基準年度 + 3W
+
+したがって賃上げ額は給与要件だけに、売上増加額・コスト削減額は付加価値額要件だけに
+効く。求める値は0以上の整数の範囲での最小値で、浮動小数点の丸めで1ずれる場合だけ
+前後1円を確かめて補正する（試行錯誤のループではない）。
+"""
+
+import math
+from dataclasses import dataclass
+
+from .calculate_plan import FinancialData, _gross_margin
+
+
+@dataclass
+class RequirementSolution:
+    """逆算結果
+
+    Attributes:
+        parameter: 求めたパラメータ名
+        minimum: 必要な最小値（円）。他のパラメータを固定したままでは
+            達成できない場合は None
+        added_value_delta_required: 3年目に必要な付加価値額の増加額
+        salary_delta_required: 3年目に必要な給与支給総額の増加額
+        reason: 達成できない理由
+    """
+    parameter: str
+    minimum: int | None
+    added_value_delta_required: int = 1
+    salary_delta_required: int = 1
+    reason: str = ""
+
+    @property
+    def feasible(self) -> bool:
+        return self.minimum is not None
+
+
+def _required_delta(base: int, target_rate: float | None) -> int:
+    """base からの増加率が target_rate[%] 以上、かつ増加（1円以上）になる最小の増加額
+
+    増加率は ThreeYearPlan と同じく (増加額) / base * 100 で判定する。
+    base が0以下のときは増加率が計算されないため、増加していればよい。
+    """
+    if target_rate is None or base <= 0:
+        return 1
+    delta = max(1, math.ceil(target_rate * base / 100))
+    # 浮動小数点の丸め補正
+    if delta / base * 100 < target_rate:
+        delta += 1
+    elif delta > 1 and (delta - 1) / base * 100 >= target_rate:
+        delta -= 1
+    return delta
+
+
+def _min_sales_for(profit_needed: int, gross_margin: float) -> int | None:
+    """int(S × g) >= profit_needed となる最小の S >= 0（なければ None）"""
+    if profit_needed <= 0:
+        return 0
+    if gross_margin <= 0:
+        return None
+    sales = math.ceil(profit_needed / gross_margin)
+    # 浮動小数点の丸め補正
+    if int(sales * gross_margin) < profit_needed:
+        sales += 1
+    elif sales > 0 and int((sales - 1) * gross_margin) >= profit_needed:
+        sales -= 1
+    return sales
+
+
+def solve_min_wage_increase(
+    financial: FinancialData,
+    sales_increase_annual: int = 0,
+    cost_reduction_annual: int = 0,
+    new_depreciation: int = 0,
+    target_added_value_rate: float | None = None,
+    target_salary_rate: float | None = None,
+) -> RequirementSolution:
+    """要件を満たす最小の年間賃上げ額（wage_increase_annual）を求める"""
+    av_needed = _required_delta(financial.added_value, target_added_value_rate)
+    sal_needed = _required_delta(financial.salary_total, target_salary_rate)
+    result = RequirementSolution(
+        parameter="wage_increase_annual", minimum=None,
+        added_value_delta_required=av_needed, salary_delta_required=sal_needed,
+    )
+
+    av_delta = (
+        int(sales_increase_annual * _gross_margin(financial))
+        + cost_reduction_annual + new_depreciation
+    )
+    if av_delta < av_needed:
+        result.reason = "賃上げ額では付加価値額が増えないため、売上増加かコスト削減が必要です"
+        return result
+
+    result.minimum = max(0, -(-sal_needed // 3))
+    return result
+
+
+def solve_min_sales_increase(
+    financial: FinancialData,
+    cost_reduction_annual: int = 0,
+    wage_increase_annual: int = 0,
+    new_depreciation: int = 0,
+    target_added_value_rate: float | None = None,
+    target_salary_rate: float | None = None,
+) -> RequirementSolution:
+    """要件を満たす最小の年間売上増加額（sales_increase_annual）を求める"""
+    av_needed = _required_delta(financial.added_value, target_added_value_rate)
+    sal_needed = _required_delta(financial.salary_total, target_salary_rate)
+    result = RequirementSolution(
+        parameter="sales_increase_annual", minimum=None,
+        added_value_delta_required=av_needed, salary_delta_required=sal_needed,
+    )
+
+    if wage_increase_annual * 3 < sal_needed:
+        result.reason = "売上増加額では給与支給総額が増えないため、賃上げ額の見直しが必要です"
+        return result
+
+    result.minimum = _min_sales_for(
+        av_needed - cost_reduction_annual - new_depreciation,
+        _gross_margin(financial),
+    )
+    if result.minimum is None:
+        result.reason = "粗利率が0以下のため、売上増加では付加価値額が増えません"
+    return result
+
+
+def solve_min_cost_reduction(
+    financial: FinancialData,
+    sales_increase_annual: int = 0,
+    wage_increase_annual: int = 0,
+    new_depreciation: int = 0,
+    target_added_value_rate: float | None = None,
+    target_salary_rate: float | None = None,
+) -> RequirementSolution:
+    """要件を満たす最小の年間コスト削減額（cost_reduction_annual）を求める"""
+    av_needed = _required_delta(financial.added_value, target_added_value_rate)
+    sal_needed = _required_delta(financial.salary_total, target_salary_rate)
+    result = RequirementSolution(
+        parameter="cost_reduction_annual", minimum=None,
+        added_value_delta_required=av_needed, salary_delta_required=sal_needed,
+    )
+
+    if wage_increase_annual * 3 < sal_needed:
+        result.reason = "コスト削減額では給与支給総額が増えないため、賃上げ額の見直しが必要です"
+        return result
+
+    profit_from_sales = int(sales_increase_annual * _gross_margin(financial))
+    result.minimum = max(0, av_needed - profit_from_sales - new_depreciation)
+    return result
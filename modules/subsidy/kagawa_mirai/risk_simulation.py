@@ -0,0 +1,147 @@
+"""香川県未来投資応援補助金 3年計画のリスク評価（モンテカルロ）
+
+ヒアリングシートに書かれた売上増加額・コスト削減額・賃上げ額は見込みに過ぎないため、
+記載値のまわりに分布を置いてN通りを抽出し、calculate_3year_plan_batch でまとめて
+計算する。3年目に付加価値額・給与支給総額の要件を満たす確率と、付加価値額の
+パーセンタイル帯を返す。乱数は seed で固定できる。
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .calculate_plan import FinancialData
+from .scenario_engine import calculate_3year_plan_batch
+
+DISTRIBUTIONS = ["fixed", "uniform", "triangular", "normal"]
+
+
+@dataclass
+class Uncertainty:
+    """記載値に対するばらつきの指定
+
+    Attributes:
+        distribution: "fixed" / "uniform" / "triangular" / "normal"
+        low: uniform・triangular の下限（記載値に対する倍率）
+        high: uniform・triangular の上限（記載値に対する倍率）
+        sd: normal の標準偏差（記載値の絶対値に対する倍率）
+    """
+    distribution: str = "triangular"
+    low: float = 0.5
+    high: float = 1.1
+    sd: float = 0.2
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"未知の分布: {self.distribution}")
+        if self.low > self.high:
+            raise ValueError("low は high 以下にしてください")
+
+    def sample(self, value: int, n: int, rng: np.random.Generator) -> np.ndarray:
+        """記載値 value のまわりから n 個を抽出（円単位に丸める）"""
+        if self.distribution == "fixed" or value == 0:
+            return np.full(n, value, dtype=np.int64)
+        if self.distribution == "normal":
+            draws = rng.normal(value, abs(value) * self.sd, n)
+        else:
+            lo, hi = sorted((value * self.low, value * self.high))
+            if self.distribution == "uniform" or lo == hi:
+                draws = rng.uniform(lo, hi, n)
+            else:
+                draws = rng.triangular(lo, min(max(value, lo), hi), hi, n)
+        return np.rint(draws).astype(np.int64)
+
+
+# 既定のばらつき: 売上は下振れしやすく、コスト削減は中程度、賃上げは自社で決めるため小さい
+DEFAULT_SALES_UNCERTAINTY = Uncertainty("triangular", low=0.3, high=1.1)
+DEFAULT_COST_UNCERTAINTY = Uncertainty("triangular", low=0.5, high=1.1)
+DEFAULT_WAGE_UNCERTAINTY = Uncertainty("triangular", low=0.8, high=1.0)
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class RiskReport:
+    """リスク評価の結果
+
+    Attributes:
+        n_samples: 抽出数
+        p_added_value: 3年目に付加価値額が増加している確率
+        p_salary: 3年目に給与支給総額が増加している確率
+        p_all: 両方を満たす確率
+        percentiles: added_value_bands の行に対応するパーセンタイル
+        added_value_bands: 形状 (len(percentiles), 4) の付加価値額（列0が基準年度）
+    """
+    n_samples: int
+    p_added_value: float
+    p_salary: float
+    p_all: float
+    percentiles: tuple = DEFAULT_PERCENTILES
+    added_value_bands: np.ndarray = field(default_factory=lambda: np.zeros((0, 4)))
+
+    @property
+    def risk_level(self) -> str:
+        """要件達成確率から見たリスク区分（"低" / "中" / "高"）"""
+        if self.p_all >= 0.9:
+            return "低"
+        if self.p_all >= 0.6:
+            return "中"
+        return "高"
+
+
+def simulate_plan_risk(
+    financial: FinancialData,
+    sales_increase_annual: int = 0,
+    cost_reduction_annual: int = 0,
+    wage_increase_annual: int = 0,
+    new_depreciation: int = 0,
+    employee_change: int = 0,
+    growth_start_year: int = 1,
+    n_samples: int = 50_000,
+    seed: int | None = 0,
+    sales_uncertainty: Uncertainty = DEFAULT_SALES_UNCERTAINTY,
+    cost_uncertainty: Uncertainty = DEFAULT_COST_UNCERTAINTY,
+    wage_uncertainty: Uncertainty = DEFAULT_WAGE_UNCERTAINTY,
+    percentiles: tuple = DEFAULT_PERCENTILES,
+) -> RiskReport:
+    """記載値のばらつきを考慮して3年計画の要件達成確率を求める
+
+    Args:
+        financial: 基準年度の財務データ
+        sales_increase_annual: 記載された年間売上増加額
+        cost_reduction_annual: 記載された年間コスト削減額
+        wage_increase_annual: 記載された年間賃上げ額
+        new_depreciation: 新規設備の年間減価償却費（固定）
+        employee_change: 従業員数の増減（固定）
+        growth_start_year: 効果の開始年度（固定）
+        n_samples: 抽出数
+        seed: 乱数シード（Noneなら毎回異なる）
+        sales_uncertainty: 売上増加額のばらつき
+        cost_uncertainty: コスト削減額のばらつき
+        wage_uncertainty: 賃上げ額のばらつき
+        percentiles: 付加価値額の帯に使うパーセンタイル
+
+    Returns:
+        RiskReport: 要件達成確率と付加価値額のパーセンタイル帯
+    """
+    if n_samples < 1:
+        raise ValueError("n_samples は1以上にしてください")
+    rng = np.random.default_rng(seed)
+    batch = calculate_3year_plan_batch(
+        financial,
+        sales_increase_annual=sales_uncertainty.sample(sales_increase_annual, n_samples, rng),
+        cost_reduction_annual=cost_uncertainty.sample(cost_reduction_annual, n_samples, rng),
+        wage_increase_annual=wage_uncertainty.sample(wage_increase_annual, n_samples, rng),
+        new_depreciation=new_depreciation,
+        employee_change=employee_change,
+        growth_start_year=growth_start_year,
+    )
+    req = batch.requirements
+    return RiskReport(
+        n_samples=n_samples,
+        p_added_value=float(req["added_value_increasing"].mean()),
+        p_salary=float(req["salary_increasing"].mean()),
+        p_all=float(req["all_requirements_met"].mean()),
+        percentiles=tuple(percentiles),
+        added_value_bands=np.percentile(batch.years["added_value"], percentiles, axis=0),
+    )
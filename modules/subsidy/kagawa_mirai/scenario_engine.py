@@ -0,0 +1,168 @@
+"""香川県未来投資応援補助金 3年計画のシナリオ一括計算
+
+calculate_3year_plan と同じ計算を、売上増加額・コスト削減額・賃上げ額などを
+配列で受け取ってNumPyでまとめて行う。1社の財務データに対して数万〜数十万通りの
+パラメータを流し、要件を満たす組み合わせを探すためのもの。
+
+整数への切り捨て（int()）や粗利率の上限も含めてスカラー版と同じ結果になる。
+金額がおよそ9千兆円（2**53）を超えると浮動小数点の丸めが変わるため対象外。
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .calculate_plan import (
+    PLAN_FIELDS, FinancialData, ThreeYearPlan, _effect_ratio, _gross_margin,
+)
+
+YEAR_FIELDS = list(PLAN_FIELDS)
+
+YEAR_DTYPE = np.dtype([("year", np.int8)] + [(name, np.int64) for name in YEAR_FIELDS])
+
+REQUIREMENT_DTYPE = np.dtype([
+    ("added_value_increasing", np.bool_),
+    ("salary_increasing", np.bool_),
+    ("all_requirements_met", np.bool_),
+    ("added_value_growth_rate", np.float64),
+    ("salary_growth_rate", np.float64),
+])
+
+SCENARIO_PARAMS = [
+    "sales_increase_annual", "cost_reduction_annual", "wage_increase_annual",
+    "new_depreciation", "employee_change", "growth_start_year",
+]
+
+
+@dataclass
+class PlanBatch:
+    """シナリオ一括計算の結果
+
+    Attributes:
+        years: 形状 (N, 4) の構造化配列（YEAR_DTYPE、列0が基準年度）
+        requirements: 形状 (N,) の構造化配列（REQUIREMENT_DTYPE）
+    """
+    years: np.ndarray
+    requirements: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.requirements)
+
+    def to_plan(self, i: int) -> ThreeYearPlan:
+        """i番目のシナリオをThreeYearPlanに戻す"""
+        req = self.requirements[i]
+        return ThreeYearPlan.from_values(
+            [v for row in self.years[i][YEAR_FIELDS].tolist() for v in row],
+            added_value_increasing=bool(req["added_value_increasing"]),
+            salary_increasing=bool(req["salary_increasing"]),
+            all_requirements_met=bool(req["all_requirements_met"]),
+            added_value_growth_rate=float(req["added_value_growth_rate"]),
+            salary_growth_rate=float(req["salary_growth_rate"]),
+        )
+
+
+def _trunc(x: np.ndarray) -> np.ndarray:
+    """Pythonのint()と同じゼロ方向への切り捨て"""
+    return np.trunc(x).astype(np.int64)
+
+
+def calculate_3year_plan_batch(
+    financial: FinancialData,
+    sales_increase_annual=0,
+    cost_reduction_annual=0,
+    wage_increase_annual=0,
+    new_depreciation=0,
+    employee_change=0,
+    growth_start_year=1,
+) -> PlanBatch:
+    """calculate_3year_plan のベクトル化版
+
+    各パラメータはスカラーまたは1次元配列で、互いにブロードキャストされる。
+
+    Returns:
+        PlanBatch: 年度別の構造化配列と要件判定の構造化配列
+    """
+    params = np.broadcast_arrays(*[
+        np.atleast_1d(np.asarray(v, dtype=np.int64)) for v in (
+            sales_increase_annual, cost_reduction_annual, wage_increase_annual,
+            new_depreciation, employee_change, growth_start_year,
+        )
+    ])
+    sales_inc, cost_red, wage_inc, new_dep, emp_change, start_year = params
+    n = sales_inc.shape[0]
+
+    gross_margin = _gross_margin(financial)
+    starts_year1 = start_year == 1
+
+    years = np.empty((n, 4), dtype=YEAR_DTYPE)
+    base = years[:, 0]
+    base["year"] = 0
+    base["sales"] = financial.sales
+    base["operating_profit"] = financial.operating_profit
+    base["depreciation"] = financial.depreciation
+    base["personnel_cost"] = financial.personnel_cost
+    base["salary_total"] = financial.salary_total
+    base["employee_count"] = financial.employee_count
+    base["added_value"] = financial.added_value
+
+    for year in range(1, 4):
+        effect_ratio = np.where(
+            starts_year1, _effect_ratio(year, 1), _effect_ratio(year, 2),
+        )
+        sales_delta = _trunc(sales_inc * effect_ratio)
+        cost_saving = _trunc(cost_red * effect_ratio)
+        wage_cumulative = wage_inc * year
+        personnel_cost = financial.personnel_cost + wage_cumulative
+        depreciation = financial.depreciation + new_dep
+        employee_count = np.maximum(
+            financial.employee_count + _trunc(emp_change * (year / 3)), 1,
+        )
+        profit_from_sales = _trunc(sales_delta * gross_margin)
+        operating_profit = (
+            financial.operating_profit + profit_from_sales + cost_saving - wage_cumulative
+        )
+
+        row = years[:, year]
+        row["year"] = year
+        row["sales"] = financial.sales + sales_delta
+        row["operating_profit"] = operating_profit
+        row["depreciation"] = depreciation
+        row["personnel_cost"] = personnel_cost
+        row["salary_total"] = financial.salary_total + wage_cumulative
+        row["employee_count"] = employee_count
+        row["added_value"] = operating_profit + personnel_cost + depreciation
+
+    requirements = np.zeros(n, dtype=REQUIREMENT_DTYPE)
+    base_av = financial.added_value
+    base_sal = financial.salary_total
+    final_av = years[:, 3]["added_value"]
+    final_sal = years[:, 3]["salary_total"]
+    requirements["added_value_increasing"] = final_av > base_av
+    requirements["salary_increasing"] = final_sal > base_sal
+    requirements["all_requirements_met"] = (
+        requirements["added_value_increasing"] & requirements["salary_increasing"]
+    )
+    if base_av > 0:
+        requirements["added_value_growth_rate"] = (final_av - base_av) / base_av * 100
+    if base_sal > 0:
+        requirements["salary_growth_rate"] = (final_sal - base_sal) / base_sal * 100
+
+    return PlanBatch(years=years, requirements=requirements)
+
+
+def scenario_grid(**axes) -> dict[str, np.ndarray]:
+    """パラメータごとの候補値の全組み合わせを平坦な配列にする
+
+    例: scenario_grid(sales_increase_annual=range(0, 5_000_000, 100_000),
+                      wage_increase_annual=[0, 300_000, 600_000])
+
+    Returns:
+        dict: パラメータ名 → 長さ（候補数の積）の配列。
+            calculate_3year_plan_batch にそのまま ** で渡せる。
+    """
+    unknown = set(axes) - set(SCENARIO_PARAMS)
+    if unknown:
+        raise ValueError(f"未知のパラメータ: {', '.join(sorted(unknown))}")
+    names = list(axes)
+    grids = np.meshgrid(*[np.asarray(list(axes[name]), dtype=np.int64) for name in names], indexing="ij")
+    return {name: grid.ravel() for name, grid in zip(names, grids)}
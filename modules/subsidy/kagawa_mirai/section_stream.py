@@ -0,0 +1,119 @@
+"""香川県未来投資応援補助金 ストリーミング応答のセクション抽出
+
+Claude APIのストリーミング応答（チャンク）を順に受け取り、最上位のJSONオブジェクトの
+"section_*" の文字列値が閉じた時点でそのセクションを取り出す。
+1文字ずつの状態遷移で処理するため、応答全体に対して線形時間で、
+正規表現のバックトラックも起きない。
+"""
+
+import json
+import re
+
+# 文字列の中で意味を持つ文字（閉じ引用符・エスケープ）。1文字クラスなのでバックトラックしない
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+_EXPECT_KEY = "key"
+_EXPECT_COLON = "colon"
+_EXPECT_VALUE = "value"
+_EXPECT_COMMA = "comma"
+
+
+def _decode_string(raw: str) -> str:
+    """JSON文字列の中身（エスケープ込み）を復号。壊れていればそのまま返す"""
+    try:
+        return json.loads(f'"{raw}"', strict=False)
+    except json.JSONDecodeError:
+        return raw
+
+
+class SectionStreamParser:
+    """JSONオブジェクトを逐次読み、文字列値を閉じた順に取り出すパーサー
+
+    最初の "{" より前（```json などの前置き）は読み飛ばし、最上位の
+    オブジェクトが閉じた後の入力は無視する。入れ子のオブジェクト・配列の値は
+    読み飛ばす。
+
+    使い方:
+        parser = SectionStreamParser(SECTION_KEYS)
+        for chunk in stream:
+            for key, text in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self, keys=None):
+        self.keys = set(keys) if keys is not None else None
+        self.sections: dict[str, str] = {}
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: list[str] = []
+        self._expect = _EXPECT_KEY
+        self._key = None
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """チャンクを読み、このチャンクで閉じたセクションを (キー, 本文) のリストで返す"""
+        emitted = []
+        i, n = 0, len(chunk)
+        while i < n and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._append(chunk[i])
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_SPECIAL.search(chunk, i)
+                if m is None:
+                    self._append(chunk[i:])
+                    break
+                self._append(chunk[i:m.start()])
+                if m.group() == "\\":
+                    self._append("\\")
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    self._end_string(emitted)
+                i = m.end()
+                continue
+
+            ch = chunk[i]
+            i += 1
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and self._expect == _EXPECT_VALUE:
+                    self._expect = _EXPECT_COMMA
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+            elif self._depth == 1:
+                if ch == ":" and self._expect == _EXPECT_COLON:
+                    self._expect = _EXPECT_VALUE
+                elif ch == ",":
+                    self._expect = _EXPECT_KEY
+        return emitted
+
+    def _append(self, text: str):
+        if self._depth == 1 and text:
+            self._buf.append(text)
+
+    def _end_string(self, emitted: list):
+        if self._depth != 1:
+            return
+        value = _decode_string("".join(self._buf))
+        self._buf = []
+        if self._expect == _EXPECT_KEY:
+            self._key = value
+            self._expect = _EXPECT_COLON
+        elif self._expect == _EXPECT_VALUE:
+            self._expect = _EXPECT_COMMA
+            if self.keys is None or self._key in self.keys:
+                self.sections[self._key] = value
+                emitted.append((self._key, value))
@@ -0,0 +1,92 @@
+"""香川県未来投資応援補助金 画面用のステージグラフ
+
+ヒアリング読込 → 財務データ → 補助金額 → 3年計画 → 要件検証 → 文章 → 書き込み計画・書類 の各段階を
+StageGraph に登録する。各段階は入力のハッシュでメモ化されるため、再実行のたびに
+入力が変わった段階だけが再計算される（文章を編集しても計算系は再実行されない）。
+
+入力:
+    upload: アップロードされたヒアリングシートのバイト列
+    edited_texts: 生成・編集済みの文章（セクションキー → 文章）
+"""
+
+from dataclasses import replace
+from pathlib import Path
+
+from lib.file_utils import create_zip
+from lib.stage_graph import StageGraph
+
+from .data_models import HearingData
+from .hearing_cache import load_hearing_sheet_cached
+from .pipeline import PlanResult, to_financial_data, compute_subsidy, compute_plan
+from .risk_simulation import simulate_plan_risk
+from .validator import validate_requirements
+from .document_generator import TEMPLATES, build_write_plan, output_filename, render_all_documents
+from .write_plan import WritePlan
+
+STAGES = ["hearing", "financials", "subsidy", "plan", "validation", "risk", "texts", "write_plan", "documents"]
+
+
+def assess_risk(data: HearingData, calc: PlanResult):
+    """記載された見込み額のばらつきを考慮したリスク評価"""
+    return simulate_plan_risk(
+        calc.financial,
+        sales_increase_annual=data.effect.sales_increase_annual,
+        cost_reduction_annual=data.effect.cost_reduction_annual,
+        wage_increase_annual=data.wage.annual_increase,
+        new_depreciation=calc.new_depreciation,
+    )
+
+
+def plan_documents(data: HearingData, texts: dict, calc: PlanResult) -> WritePlan:
+    """書類への書き込み計画（テンプレートを開かないので、編集のたびに作り直してよい）"""
+    return build_write_plan(replace(data, generated_texts=dict(texts)), calc.subsidy, calc.plan)
+
+
+def render_documents(write_plan: WritePlan, template_dir: Path, on_progress=None, executor=None) -> dict:
+    """書き込み計画どおりに4書類をメモリ上で生成してZIPにまとめる（ファイルは書かない）
+
+    executor を渡すと4書類を同時に生成する（render_all_documents 参照）。
+    1書類の失敗では止めず、生成できた書類だけをZIPにする。
+
+    Returns:
+        dict: {"results": 書類名 → ファイル名（失敗時は空文字）, "errors": 書類名 → エラー内容,
+            "zip_bytes": ZIPのバイト列, "write_plan": 書類に書き込んだ内容（渡した write_plan）}
+    """
+    errors = {}
+    files = render_all_documents(
+        write_plan,
+        template_dir,
+        on_progress=on_progress,
+        executor=executor,
+        on_error=lambda name, e: errors.__setitem__(name, str(e) or type(e).__name__),
+    )
+    return {
+        "results": {
+            name: output_filename(name) if output_filename(name) in files else ""
+            for name in TEMPLATES
+        },
+        "errors": errors,
+        "zip_bytes": create_zip(files),
+        "write_plan": write_plan,
+    }
+
+
+def build_stage_graph(template_dir: Path) -> StageGraph:
+    """画面用のステージグラフを組み立てる"""
+    graph = StageGraph()
+    graph.add_stage("hearing", load_hearing_sheet_cached, deps=["upload"])
+    graph.add_stage("financials", to_financial_data, deps=["hearing"])
+    graph.add_stage("subsidy", compute_subsidy, deps=["hearing"])
+    graph.add_stage("plan", compute_plan, deps=["hearing", "financials", "subsidy"])
+    graph.add_stage("validation", lambda calc: validate_requirements(calc.plan, calc.subsidy), deps=["plan"])
+    graph.add_stage("risk", assess_risk, deps=["hearing", "plan"])
+    graph.add_stage("texts", lambda texts: dict(texts or {}), deps=["edited_texts"])
+    graph.add_stage("write_plan", plan_documents, deps=["hearing", "texts", "plan"])
+    graph.add_stage(
+        "documents",
+        lambda write_plan, on_progress=None, executor=None: render_documents(
+            write_plan, template_dir, on_progress=on_progress, executor=executor,
+        ),
+        deps=["write_plan"],
+    )
+    return graph
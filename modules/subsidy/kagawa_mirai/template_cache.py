@@ -0,0 +1,113 @@
+"""香川県未来投資応援補助金 テンプレートのプロセス内キャッシュ
+
+テンプレート（xlsx / docx / pdf）を1プロセスにつき1回だけ読み込んで解析し、
+書類の生成ごとにメモリ上の複製を渡す。ディスクへのコピーと再解析をしない。
+
+- xlsx: 解析済みの Workbook を pickle したものを保持し、複製は pickle.loads
+  （openpyxl の Workbook は deepcopy できないため。load_workbook の数十分の一の時間）
+- docx: 解析済みの Document を保持し、複製は copy.deepcopy
+- pdf など: バイト列を保持する
+
+解析は workbook() / document() を初めて呼んだときに行う（raw() だけなら解析しない）。
+取得のたびにファイルの mtime とサイズを確認し、変わっていればハッシュを計算して、
+内容が変わっていれば読み込み直す。複数スレッドから同時に使ってよい。
+"""
+
+import copy
+import hashlib
+import io
+import pickle
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import openpyxl
+from docx import Document
+
+
+@dataclass
+class _Entry:
+    mtime_ns: int
+    size: int
+    digest: str
+    raw: bytes
+    master: object = None  # xlsx: pickle したバイト列、docx: Document（未解析ならNone）
+
+
+class TemplateCache:
+    """テンプレートのパス → 解析済みテンプレート"""
+
+    def __init__(self):
+        self._entries: dict[Path, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    @staticmethod
+    def _parse(path: Path, raw: bytes):
+        suffix = path.suffix.lower()
+        if suffix == ".xlsx":
+            return pickle.dumps(openpyxl.load_workbook(io.BytesIO(raw)), pickle.HIGHEST_PROTOCOL)
+        if suffix == ".docx":
+            return Document(io.BytesIO(raw))
+        return None
+
+    def _entry(self, path: Path | str) -> _Entry | None:
+        """最新の内容のエントリ（ファイルがなければNone）"""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self.hits += 1
+                return entry
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry and entry.digest == digest:
+                # 触られただけで内容は同じ
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                self.hits += 1
+                return entry
+            entry = _Entry(stat.st_mtime_ns, stat.st_size, digest, raw)
+            self._entries[path] = entry
+            self.loads += 1
+            return entry
+
+    def _master(self, path: Path | str):
+        """解析済みのテンプレート（初回に解析する。ファイルがなければNone）"""
+        entry = self._entry(path)
+        if entry is None:
+            return None
+        with self._lock:
+            if entry.master is None:
+                entry.master = self._parse(Path(path), entry.raw)
+            return entry.master
+
+    def raw(self, path: Path | str) -> bytes | None:
+        """テンプレートのバイト列"""
+        entry = self._entry(path)
+        return entry.raw if entry else None
+
+    def workbook(self, path: Path | str) -> openpyxl.Workbook | None:
+        """xlsxテンプレートの複製（書き換えてよい）"""
+        master = self._master(path)
+        return pickle.loads(master) if master is not None else None
+
+    def document(self, path: Path | str):
+        """docxテンプレートの複製（書き換えてよい）"""
+        master = self._master(path)
+        return copy.deepcopy(master) if master is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache(maxsize=1)
+def get_template_cache() -> TemplateCache:
+    """プロセス内で共有する既定のキャッシュ"""
+    return TemplateCache()
@@ -0,0 +1,153 @@
+"""香川県未来投資応援補助金 書類への書き込み計画
+
+ヒアリングデータ・補助金計算・3年計画から、テンプレートのどこに何を書くかを
+(書類, 位置, 値) の操作の列（WritePlan）にする。書類のライター（ooxml / openpyxl）は
+計画の操作をテンプレートに適用するだけで、どのセルに何を書くかは知らない。
+
+- 計画はテンプレートを開かずに作れる（to_json でドライランの結果として出力する）
+- 2つの計画の差分（diff_plans）で、編集によってどのセルが変わるかを書類を
+  作り直さずに示せる
+
+位置の書き方:
+- xlsx: "シート名!A1"
+- docx: "tables[8].rows[1].cells[2]"（python-docx の doc.tables と同じ番号）
+
+操作の種類（action）:
+- set: 値を書く（docx は cell.text）
+- content: 文章をセルの1段落目に書く（docx。9pt 游ゴシック）
+- check: テンプレートのセルが "□" のときだけ値（"☑"）を書く（xlsx）
+- replace: セルの文字列に置換 [[old, new], ...] を順に行う（docx）
+
+テンプレートにない表・行・セルへの操作は飛ばす。
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+
+from docx.shared import Pt
+
+_TABLE_CELL = re.compile(r"tables\[(\d+)\]\.rows\[(\d+)\]\.cells\[(\d+)\]")
+
+
+@dataclass
+class WriteOp:
+    """書類への1つの書き込み"""
+    document: str  # 書類名（document_generator.TEMPLATES のキー）
+    locator: str  # "シート名!A1" / "tables[i].rows[j].cells[k]"
+    value: str | int | float | list | None
+    action: str = "set"
+
+
+@dataclass
+class PlanChange:
+    """2つの計画で書き込みが異なる位置（before / after はそれぞれの計画の操作、なければNone）"""
+    document: str
+    locator: str
+    before: WriteOp | None
+    after: WriteOp | None
+
+
+@dataclass
+class WritePlan:
+    """全書類への書き込み計画"""
+    ops: list[WriteOp] = field(default_factory=list)
+
+    def for_document(self, document: str) -> list[WriteOp]:
+        return [op for op in self.ops if op.document == document]
+
+    def to_json(self, indent: int | None = None) -> str:
+        # asdict は値を再帰的にコピーして遅いので、属性の dict をそのまま渡す
+        return json.dumps({"ops": [vars(op) for op in self.ops]}, ensure_ascii=False, indent=indent)
+
+    @classmethod
+    def from_json(cls, text: str) -> "WritePlan":
+        return cls([WriteOp(**op) for op in json.loads(text)["ops"]])
+
+
+def diff_plans(old: WritePlan, new: WritePlan) -> list[PlanChange]:
+    """2つの計画で書き込みの異なる位置（new の順、その後に new にない位置）
+
+    同じ位置への操作が複数あるときは最後の操作で比べる。
+    """
+    def last_ops(plan: WritePlan) -> dict[tuple[str, str], WriteOp]:
+        return {(op.document, op.locator): op for op in plan.ops}
+
+    before, after = last_ops(old), last_ops(new)
+    changes = []
+    for key, op in after.items():
+        prev = before.get(key)
+        if prev is None or (prev.action, prev.value) != (op.action, op.value):
+            changes.append(PlanChange(*key, prev, op))
+    for key, op in before.items():
+        if key not in after:
+            changes.append(PlanChange(*key, op, None))
+    return changes
+
+
+def split_cell_locator(locator: str) -> tuple[str, str]:
+    """"シート名!A1" → (シート名, "A1")"""
+    sheet, _, coordinate = locator.rpartition("!")
+    return sheet, coordinate
+
+
+def apply_to_workbook(wb, ops: list[WriteOp]):
+    """xlsx の操作を適用する（wb は openpyxl の Workbook または XlsxPatch）"""
+    for op in ops:
+        sheet, coordinate = split_cell_locator(op.locator)
+        ws = wb[sheet]
+        if op.action == "set":
+            ws[coordinate] = op.value
+        elif op.action == "check":
+            if ws[coordinate].value == "□":
+                ws[coordinate] = op.value
+        else:
+            raise ValueError(f"xlsx に適用できない操作: {op.action}（{op.document} {op.locator}）")
+
+
+def _write_content_to_cell(cell, content: str):
+    """テーブルセルの内容を本文に置き換える"""
+    for p in cell.paragraphs:
+        for run in p.runs:
+            run.text = ""
+    if cell.paragraphs:
+        p = cell.paragraphs[0]
+        p.text = ""
+        run = p.add_run(content)
+        run.font.size = Pt(9)
+        run.font.name = "游ゴシック"
+
+
+def apply_to_tables(tables, ops: list[WriteOp]):
+    """docx の操作を適用する（tables は python-docx の Table のリスト）"""
+    rows_cache = {}
+    cells_cache = {}  # row.cells は呼ぶたびに表を走査するので行ごとに1回だけ
+    for op in ops:
+        match = _TABLE_CELL.fullmatch(op.locator)
+        if not match:
+            raise ValueError(f"docx の位置ではない: {op.locator}（{op.document}）")
+        t, r, c = map(int, match.groups())
+        if t >= len(tables):
+            continue
+        if t not in rows_cache:
+            rows_cache[t] = tables[t].rows
+        if r >= len(rows_cache[t]):
+            continue
+        if (t, r) not in cells_cache:
+            cells_cache[t, r] = rows_cache[t][r].cells
+        cells = cells_cache[t, r]
+        if c >= len(cells):
+            continue
+        cell = cells[c]
+
+        if op.action == "set":
+            cell.text = op.value
+        elif op.action == "content":
+            _write_content_to_cell(cell, op.value)
+        elif op.action == "replace":
+            text = cell.text
+            for old, new in op.value:
+                text = text.replace(old, new)
+            cell.text = text
+        else:
+            raise ValueError(f"docx に適用できない操作: {op.action}（{op.document} {op.locator}）")
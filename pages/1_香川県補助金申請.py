@@ -3,33 +3,40 @@
 ヒアリングシート（Excel）から申請書類4種を自動生成する。
 """
 
-import io
 import os
-import tempfile
-import zipfile
+import time
+import uuid
+from functools import partial
 from pathlib import Path
 
 import streamlit as st
 
 from lib.auth import check_auth
 from lib.styles import apply_styles, page_header, footer
-from lib.anthropic_client import generate_text
+from lib.anthropic_client import (
+    TokenUsage, generate_text, generate_streaming, get_client, get_rate_limiter,
+    get_response_cache,
+)
+from lib.llm_metrics import aggregate, get_metrics, metric_labels, summarize
 
 from modules.subsidy.kagawa_mirai import (
-    read_hearing_sheet,
+    HearingCache,
     HearingData,
-    FinancialData,
-    SubsidyExpense,
-    calculate_subsidy,
-    calculate_3year_plan,
-    estimate_depreciation,
-    calculate_investment_payback,
-    generate_all_documents,
-    generate_texts,
-    validate_requirements,
+    solve_min_wage_increase,
+    solve_min_sales_increase,
+    solve_min_cost_reduction,
+    build_stage_graph,
+    diff_plans,
+    document_executor,
+    generate_texts_parallel,
+    generate_texts_streaming,
+    generate_section,
+    enforce_lengths,
+    length_violations,
     SECTION_KEYS,
     SECTION_LABELS,
     SECTION_TARGET_CHARS,
+    TOTAL_TARGET_CHARS,
 )
 
 # ---------------------------------------------------------------------------
@@ -56,6 +63,148 @@ st.divider()
 TEMPLATE_DIR = Path(__file__).parent.parent / "templates" / "kagawa_mirai"
 ASSET_DIR = Path(__file__).parent.parent / "assets" / "kagawa_mirai"
 
+
+@st.cache_data
+def load_sample_sheet(path: str) -> bytes:
+    """サンプルのヒアリングシートを読み込む"""
+    return Path(path).read_bytes()
+
+
+@st.cache_resource
+def get_document_executor():
+    """書類4種を同時に生成するプロセスプール（全セッションで共有）
+
+    CPUが1つの環境では同時に生成しても速くならないため、None（1書類ずつ生成）。
+    """
+    if (os.cpu_count() or 1) < 2:
+        return None
+    return document_executor(TEMPLATE_DIR)
+
+
+def show_run_stats(graph):
+    """各ステージの再計算の有無・所要時間、AI応答キャッシュのヒット率、API呼び出しの待ち状況をサイドバーに表示"""
+    with st.sidebar.expander("処理時間（ステージ別）", expanded=False):
+        st.dataframe(
+            [
+                {
+                    "ステージ": t.name,
+                    "状態": "再計算" if t.recomputed else "スキップ",
+                    "時間(ms)": f"{t.seconds * 1000:.1f}",
+                }
+                for t in graph.timings
+            ],
+            use_container_width=True,
+        )
+    cache = get_response_cache().stats()
+    lookups = cache["hits"] + cache["misses"]
+    st.sidebar.caption(
+        f"AI応答キャッシュ: ヒット率 {cache['hit_rate']:.0%}（{cache['hits']}/{lookups}）・"
+        f"保存 {cache['entries']}件"
+    )
+    limiter = get_rate_limiter().stats()
+    st.sidebar.caption(
+        f"API呼び出し: 待機中 {limiter['queue_depth']}件・"
+        f"平均待ち {limiter['avg_wait']:.1f}秒（最大 {limiter['max_wait']:.1f}秒）"
+    )
+
+
+@st.cache_data(ttl=60)
+def load_usage_history(days: int) -> list[dict]:
+    """API呼び出しの記録（JSONL）を顧客別・日別に集計"""
+    records = get_metrics().history(since=time.time() - days * 24 * 3600)
+    return aggregate(records, label="customer")
+
+
+def format_seconds(*values) -> str:
+    return " / ".join("-" if v is None else f"{v:.1f}" for v in values)
+
+
+def record_llm_run(label: str, run_id: str, elapsed: float) -> dict:
+    """1回の生成（run_id のラベルが付いた呼び出し）の費用・時間をセッションに記録"""
+    summary = summarize(get_metrics().records(run=run_id))
+    row = {
+        "処理": label,
+        "API呼び出し": summary["api_calls"],
+        "入力トークン": summary["input_tokens"] + summary["cache_creation_input_tokens"]
+        + summary["cache_read_input_tokens"],
+        "出力トークン": summary["output_tokens"],
+        "推定費用(USD)": f"{summary['cost']:.4f}",
+        "所要時間(秒)": f"{elapsed:.1f}",
+        "レイテンシp50/p95(秒)": format_seconds(summary["latency_p50"], summary["latency_p95"]),
+        "初回応答p50(秒)": format_seconds(summary["ttft_p50"]),
+        "待ち時間p95(秒)": format_seconds(summary["queue_wait_p95"]),
+    }
+    st.session_state.setdefault("km_llm_runs", []).append(row)
+    return row
+
+
+def show_usage_history():
+    """顧客別・日別のAPI利用状況（p50/p95レイテンシ・トークン・費用）をサイドバーに表示"""
+    with st.sidebar.expander("API利用状況（直近30日）", expanded=False):
+        rows = load_usage_history(30)
+        if not rows:
+            st.caption("記録がありません")
+            return
+        st.dataframe(
+            [
+                {
+                    "日付": row["period"],
+                    "顧客": row["customer"] or "-",
+                    "呼び出し": row["api_calls"],
+                    "p50(秒)": format_seconds(row["latency_p50"]),
+                    "p95(秒)": format_seconds(row["latency_p95"]),
+                    "入力": row["input_tokens"] + row["cache_creation_input_tokens"]
+                    + row["cache_read_input_tokens"],
+                    "出力": row["output_tokens"],
+                    "費用(USD)": f"{row['cost']:.3f}",
+                }
+                for row in rows
+            ],
+            use_container_width=True,
+        )
+
+
+def preview_op(op, limit: int = 40) -> str:
+    """書き込み計画の操作の値を一覧表示用に短くする"""
+    if op is None:
+        return "（なし）"
+    value = op.value
+    if op.action == "replace":
+        # 置換の後の選択肢（"☑ 生産性の向上" など）だけを見せる
+        value = "　".join(new for _, new in value)
+    text = "" if value is None else str(value).replace("\n", " ")
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def show_plan_changes(old_plan, new_plan):
+    """前回生成した書類から書き込みが変わる箇所（書類は作り直さず、書き込み計画だけを比べる）"""
+    if old_plan is None:
+        return
+    changes = diff_plans(old_plan, new_plan)
+    with st.expander(f"前回の生成から変わる箇所（{len(changes)}件）", expanded=False):
+        if not changes:
+            st.caption("書類に書き込む内容は変わりません")
+            return
+        st.dataframe(
+            [
+                {
+                    "書類": c.document,
+                    "位置": c.locator,
+                    "変更前": preview_op(c.before),
+                    "変更後": preview_op(c.after),
+                }
+                for c in changes
+            ],
+            use_container_width=True,
+        )
+
+
+# 入力が変わったステージだけを再計算するためのグラフ（セッションごと）
+if "km_graph" not in st.session_state:
+    st.session_state["km_graph"] = build_stage_graph(TEMPLATE_DIR)
+graph = st.session_state["km_graph"]
+graph.begin_run()
+
 # ---------------------------------------------------------------------------
 # セクション1: ファイルアップロード
 # ---------------------------------------------------------------------------
@@ -73,13 +222,12 @@ with col_upload:
 with col_sample:
     sample_path = ASSET_DIR / "hearing_sheet.xlsx"
     if sample_path.exists():
-        with open(sample_path, "rb") as f:
-            st.download_button(
-                label="サンプルDL",
-                data=f.read(),
-                file_name="hearing_sheet_sample.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+        st.download_button(
+            label="サンプルDL",
+            data=load_sample_sheet(str(sample_path)),
+            file_name="hearing_sheet_sample.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
 if not uploaded:
     st.info("ヒアリングシート（.xlsx）をアップロードしてください。")
@@ -92,27 +240,25 @@ if not uploaded:
 st.divider()
 st.subheader("2. データプレビュー")
 
-# ヒアリングシート読み込み（キャッシュ）
-if "km_hearing_data" not in st.session_state or st.session_state.get("km_uploaded_name") != uploaded.name:
-    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-        tmp.write(uploaded.getvalue())
-        tmp_path = tmp.name
-
-    try:
-        data = read_hearing_sheet(tmp_path)
-        st.session_state["km_hearing_data"] = data
-        st.session_state["km_uploaded_name"] = uploaded.name
-        # リセット
-        st.session_state.pop("km_generated_texts", None)
-        st.session_state.pop("km_documents", None)
-    except Exception as e:
-        st.error(f"ヒアリングシートの読み込みに失敗しました: {e}")
-        footer()
-        st.stop()
-    finally:
-        os.unlink(tmp_path)
-
-data: HearingData = st.session_state["km_hearing_data"]
+# ヒアリングシート読み込み（内容のハッシュでキャッシュ）
+upload_bytes = uploaded.getvalue()
+upload_key = HearingCache.key_for(upload_bytes)
+if st.session_state.get("km_upload_key") != upload_key:
+    st.session_state["km_upload_key"] = upload_key
+    # リセット
+    st.session_state.pop("km_generated_texts", None)
+    st.session_state.pop("km_texts_failed", None)
+    st.session_state.pop("km_documents", None)
+    st.session_state.pop("km_llm_runs", None)
+
+graph.set_input("upload", upload_bytes)
+graph.set_input("edited_texts", st.session_state.get("km_generated_texts", {}))
+try:
+    data: HearingData = graph.get("hearing")
+except Exception as e:
+    st.error(f"ヒアリングシートの読み込みに失敗しました: {e}")
+    footer()
+    st.stop()
 
 # 企業概要
 col1, col2, col3, col4 = st.columns(4)
@@ -174,44 +320,10 @@ with st.expander("補助対象経費", expanded=False):
 # ---------------------------------------------------------------------------
 # 収支計算（自動）
 # ---------------------------------------------------------------------------
-financial = FinancialData(
-    sales=data.financial.sales * 1000,
-    operating_profit=data.financial.operating_profit * 1000,
-    depreciation=data.financial.depreciation * 1000,
-    personnel_cost=data.financial.personnel_cost * 1000,
-    salary_total=data.financial.salary_total * 1000,
-    employee_count=data.financial.employee_count,
-)
-
-expenses = [
-    SubsidyExpense(
-        category=e.category, item_name=e.item_name,
-        amount=e.amount, has_quote=e.has_quote,
-    )
-    for e in data.expenses
-]
-
-is_over_1b = "10億" in data.company.sales_category and "以上" in data.company.sales_category
-subsidy = calculate_subsidy(expenses, sales_over_1billion=is_over_1b)
-
-useful_life_str = data.effect.useful_life.replace("年", "") if data.effect.useful_life else "5"
-try:
-    useful_life = int(useful_life_str)
-except ValueError:
-    useful_life = 5
-new_dep = estimate_depreciation(sum(e.amount for e in data.expenses), useful_life=useful_life)
-
-plan = calculate_3year_plan(
-    financial=financial,
-    sales_increase_annual=data.effect.sales_increase_annual,
-    cost_reduction_annual=data.effect.cost_reduction_annual,
-    wage_increase_annual=data.wage.annual_increase,
-    new_depreciation=new_dep,
-    growth_start_year=1,
-)
-
-annual_effect = data.effect.sales_increase_annual + data.effect.cost_reduction_annual
-payback = calculate_investment_payback(subsidy, annual_effect)
+calc = graph.get("plan")
+subsidy = calc.subsidy
+plan = calc.plan
+payback = calc.payback
 
 # ---------------------------------------------------------------------------
 # セクション3: AI文章生成
@@ -222,22 +334,73 @@ st.subheader("3. AI文章生成（Claude API）")
 st.caption("事業計画書のセクション2〜4（10セクション分）の文章をClaude APIで自動生成します。")
 
 if "km_generated_texts" not in st.session_state:
+    generation_mode = st.radio(
+        "生成方式",
+        ["セクションごとに並列", "一括（ストリーミング）"],
+        horizontal=True,
+        help="並列: 10セクションを同時に生成し、失敗したセクションだけ再試行します。"
+        "一括: 1回の生成で、書き上がったセクションから順に表示します。",
+    )
+    # 前回失敗したときは、同じ応答を再利用しないようキャッシュを使わない
+    refresh = st.checkbox(
+        "キャッシュを使わずに生成する",
+        value=st.session_state.get("km_texts_failed", False),
+        help="同じ内容で生成済みの文章があれば通常はそれを再利用します。生成し直す場合はチェックしてください。",
+    )
     if st.button("文章を生成する", type="primary"):
         with st.status("事業計画書の文章を生成中...", expanded=True) as status:
             try:
-                texts = generate_texts(data, generate_text)
+                # 書き上がったセクションから表示する
+                placeholders = {key: st.empty() for key in SECTION_KEYS}
+
+                def on_section(key, text):
+                    placeholders[key].text_area(
+                        f"{SECTION_LABELS.get(key, key)}（{len(text)}字）",
+                        value=text, height=100, disabled=True,
+                    )
+
+                # クライアントはワーカースレッドではなくここで取得する（secrets参照のため）
+                client = get_client()
+                usage = TokenUsage()
+                run_id = uuid.uuid4().hex
+                started = time.perf_counter()
+                group_errors: list[str] = []
+                with metric_labels(customer=data.company.name, run=run_id):
+                    if generation_mode == "セクションごとに並列":
+                        generate_fn = partial(generate_text, client=client, refresh=refresh, on_usage=usage.add)
+                        texts = generate_texts_parallel(
+                            data, generate_fn, on_section=on_section,
+                            on_error=lambda keys, e: group_errors.extend(
+                                f"{SECTION_LABELS.get(k, k)}（{e}）" for k in keys
+                            ),
+                        )
+                    else:
+                        stream_fn = partial(generate_streaming, client=client, refresh=refresh, on_usage=usage.add)
+                        texts = generate_texts_streaming(data, stream_fn, on_section=on_section)
+                run = record_llm_run(generation_mode, run_id, time.perf_counter() - started)
+                if usage.requests:
+                    st.caption(
+                        f"入力トークン: キャッシュ読込 {usage.cache_read_input_tokens:,} / "
+                        f"キャッシュ書込 {usage.cache_creation_input_tokens:,} / "
+                        f"通常 {usage.input_tokens:,}（キャッシュ率 {usage.cached_ratio:.0%}）・"
+                        f"推定費用 ${run['推定費用(USD)']}・所要時間 {run['所要時間(秒)']}秒"
+                    )
+                missing = [SECTION_LABELS.get(k, k) for k in SECTION_KEYS if k not in texts]
+                if missing and texts:
+                    st.warning(f"一部のセクションを生成できませんでした: {'、'.join(group_errors or missing)}")
                 if texts:
                     st.session_state["km_generated_texts"] = texts
-                    data.generated_texts = texts
-                    st.session_state["km_hearing_data"] = data
+                    st.session_state.pop("km_texts_failed", None)
                     total_chars = sum(len(v) for v in texts.values())
                     st.write(f"生成完了: {len(texts)}セクション / {total_chars:,}字")
                     status.update(label=f"文章生成完了（{total_chars:,}字）", state="complete")
                 else:
                     status.update(label="文章生成エラー", state="error")
-                    st.error("JSONの解析に失敗しました。再度お試しください。")
+                    st.session_state["km_texts_failed"] = True
+                    st.error("JSONの解析に失敗しました。再度お試しください（次回はキャッシュを使わずに生成します）。")
             except Exception as e:
                 status.update(label="文章生成エラー", state="error")
+                st.session_state["km_texts_failed"] = True
                 st.error(f"文章生成に失敗しました: {e}")
 else:
     st.success("文章生成済み")
@@ -253,6 +416,9 @@ if "km_generated_texts" in st.session_state:
     texts = st.session_state["km_generated_texts"]
     edited_texts = {}
     total_chars = 0
+    violations = length_violations(texts)
+    if "km_length_message" in st.session_state:
+        st.info(st.session_state.pop("km_length_message"))
 
     for key in SECTION_KEYS:
         label = SECTION_LABELS.get(key, key)
@@ -261,7 +427,24 @@ if "km_generated_texts" in st.session_state:
         char_count = len(current_text)
         total_chars += char_count
 
-        with st.expander(f"{label}（{char_count}字 / 目標{target}字）", expanded=False):
+        out_of_range = "・範囲外" if key in violations else ""
+        with st.expander(f"{label}（{char_count}字 / 目標{target}字{out_of_range}）", expanded=False):
+            # このセクションだけを生成し直す（前後のセクションは採用済みとして渡す）
+            if st.button("再生成", key=f"regen_{key}"):
+                with st.spinner(f"{label}を再生成中..."):
+                    try:
+                        run_id = uuid.uuid4().hex
+                        started = time.perf_counter()
+                        with metric_labels(customer=data.company.name, run=run_id):
+                            new_text = generate_section(
+                                data, key, partial(generate_text, client=get_client()), context_texts=texts,
+                            )
+                        record_llm_run(f"再生成: {label}", run_id, time.perf_counter() - started)
+                        st.session_state["km_generated_texts"] = {**texts, key: new_text}
+                        st.session_state.pop(f"text_{key}", None)
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"再生成に失敗しました: {e}")
             edited = st.text_area(
                 f"{label}",
                 value=current_text,
@@ -271,13 +454,42 @@ if "km_generated_texts" in st.session_state:
             )
             edited_texts[key] = edited
 
-    st.metric("合計文字数", f"{total_chars:,}字（目標: 2,500〜3,500字）")
+    st.metric("合計文字数", f"{total_chars:,}字（目標: {TOTAL_TARGET_CHARS[0]:,}〜{TOTAL_TARGET_CHARS[1]:,}字）")
+
+    # 目標文字数（±20%）を外れたセクションだけを短縮・加筆する
+    if violations:
+        labels = "、".join(SECTION_LABELS.get(k, k) for k in violations)
+        st.warning(f"目標文字数の範囲外: {labels}")
+        if st.button(f"範囲外の{len(violations)}セクションを目標文字数に合わせる"):
+            with st.spinner("文字数を調整中..."):
+                run_id = uuid.uuid4().hex
+                started = time.perf_counter()
+                group_errors: list[str] = []
+                with metric_labels(customer=data.company.name, run=run_id):
+                    report = enforce_lengths(data, texts, partial(generate_text, client=get_client()))
+                record_llm_run("文字数調整", run_id, time.perf_counter() - started)
+            for k in SECTION_KEYS:
+                if report.texts.get(k) != texts.get(k):
+                    st.session_state.pop(f"text_{k}", None)
+            st.session_state["km_generated_texts"] = report.texts
+            message = (
+                f"{sum(report.requests.values())}件のリクエスト（{report.rounds}ラウンド）で調整しました。"
+                f"使用トークン {report.tokens:,}（一括で生成し直す場合の見込み {report.full_tokens:,} の"
+                f"{report.cost_ratio:.0%}）。"
+            )
+            if report.remaining:
+                message += "範囲外のまま: " + "、".join(SECTION_LABELS.get(k, k) for k in report.remaining)
+            st.session_state["km_length_message"] = message
+            st.rerun()
+
+    if st.session_state.get("km_llm_runs"):
+        with st.expander("AI生成の費用・所要時間", expanded=False):
+            st.dataframe(st.session_state["km_llm_runs"], use_container_width=True)
 
     # 編集結果をセッションに反映
     if edited_texts != texts:
         st.session_state["km_generated_texts"] = edited_texts
-        data.generated_texts = edited_texts
-        st.session_state["km_hearing_data"] = data
+    graph.set_input("edited_texts", st.session_state["km_generated_texts"])
 
     # ---------------------------------------------------------------------------
     # セクション5: 書類生成
@@ -285,56 +497,33 @@ if "km_generated_texts" in st.session_state:
     st.divider()
     st.subheader("5. 書類生成")
 
-    if "km_documents" not in st.session_state:
+    # 文章・計算結果が前回の書類生成時から変わっていなければ再生成しない
+    if "km_documents" in st.session_state and graph.is_fresh("documents"):
+        st.success("書類生成済み")
+    else:
+        if "km_documents" in st.session_state:
+            st.warning("書類生成後に文章が編集されています。再度生成してください。")
+            show_plan_changes(st.session_state["km_documents"].get("write_plan"), graph.get("write_plan"))
         if st.button("申請書類を生成する", type="primary"):
-            # 最新の編集テキストを反映
-            data.generated_texts = st.session_state["km_generated_texts"]
-
             if not TEMPLATE_DIR.exists():
                 st.error("テンプレートディレクトリが見つかりません。")
                 st.stop()
 
-            with tempfile.TemporaryDirectory() as tmpdir:
-                output_dir = os.path.join(tmpdir, "output")
-                os.makedirs(output_dir, exist_ok=True)
+            progress = st.progress(0, text="書類を生成中...")
 
-                progress = st.progress(0, text="書類を生成中...")
+            def on_progress(step, total, label):
+                # 同時に生成するときは、終わった順に呼ばれる
+                pct = int(step / total * 100)
+                progress.progress(pct, text=f"{label}の生成が完了 ({step}/{total})")
 
-                def on_progress(step, total, label):
-                    pct = int(step / total * 100)
-                    progress.progress(pct, text=f"{label}を生成中... ({step}/{total})")
-
-                try:
-                    results = generate_all_documents(
-                        data=data,
-                        output_dir=output_dir,
-                        template_dir=TEMPLATE_DIR,
-                        subsidy=subsidy,
-                        plan=plan,
-                        on_progress=on_progress,
-                    )
-                    progress.progress(100, text="書類生成完了")
-
-                    # ZIPにまとめる
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                        for root, dirs, files in os.walk(output_dir):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                arcname = os.path.relpath(file_path, output_dir)
-                                zf.write(file_path, arcname)
-                    zip_buffer.seek(0)
-
-                    st.session_state["km_documents"] = {
-                        "results": results,
-                        "zip_bytes": zip_buffer.getvalue(),
-                    }
-
-                except Exception as e:
-                    progress.progress(100, text="エラー")
-                    st.error(f"書類生成エラー: {e}")
-    else:
-        st.success("書類生成済み")
+            try:
+                st.session_state["km_documents"] = graph.get(
+                    "documents", on_progress=on_progress, executor=get_document_executor(),
+                )
+                progress.progress(100, text="書類生成完了")
+            except Exception as e:
+                progress.progress(100, text="エラー")
+                st.error(f"書類生成エラー: {e}")
 
     # ---------------------------------------------------------------------------
     # セクション6: 検証結果
@@ -343,13 +532,26 @@ if "km_generated_texts" in st.session_state:
         st.divider()
         st.subheader("6. 検証結果")
 
-        validation = validate_requirements(plan, subsidy)
+        validation = graph.get("validation")
 
-        # 全要件判定
-        if validation["all_met"]:
-            st.success("全要件をクリアしています")
-        else:
-            st.error("一部の要件を満たしていません")
+        # 全要件判定 + 見込み額のばらつきを考慮したリスク評価
+        risk = graph.get("risk")
+        col_req, col_risk = st.columns([3, 1])
+        with col_req:
+            if validation["all_met"]:
+                st.success("全要件をクリアしています")
+            else:
+                st.error("一部の要件を満たしていません")
+        with col_risk:
+            st.metric(
+                f"未達リスク: {risk.risk_level}",
+                f"{risk.p_all:.0%}",
+                help=(
+                    "売上増加・コスト削減・賃上げの見込み額がばらついた場合に、"
+                    f"3年目に要件を満たす確率（{risk.n_samples:,}通りの試算）。"
+                    f"付加価値額 {risk.p_added_value:.0%} / 給与支給総額 {risk.p_salary:.0%}"
+                ),
+            )
 
         # 個別表示
         for key in ["added_value", "salary", "expense_min"]:
@@ -359,6 +561,46 @@ if "km_generated_texts" in st.session_state:
             else:
                 st.error(item["message"])
 
+        # 未達の要件に必要な最小値（他の入力値は固定）
+        # 付加価値額は賃上げ額に、給与支給総額は売上・コスト削減額に依存しないため、
+        # 両方未達のときは一方を満たした前提で他方の最小値を求める
+        sales_fixed = data.effect.sales_increase_annual
+        cost_fixed = data.effect.cost_reduction_annual
+        if not validation["added_value"]["ok"]:
+            wage_fixed = data.wage.annual_increase if validation["salary"]["ok"] else 1
+            sales_sol = solve_min_sales_increase(
+                calc.financial,
+                cost_reduction_annual=cost_fixed,
+                wage_increase_annual=wage_fixed,
+                new_depreciation=calc.new_depreciation,
+            )
+            cost_sol = solve_min_cost_reduction(
+                calc.financial,
+                sales_increase_annual=sales_fixed,
+                wage_increase_annual=wage_fixed,
+                new_depreciation=calc.new_depreciation,
+            )
+            hints = []
+            if sales_sol.feasible:
+                hints.append(f"売上増加の見込み額を最低 {sales_sol.minimum:,}円（現在 {sales_fixed:,}円）")
+            if cost_sol.feasible:
+                hints.append(f"コスト削減の見込み額を最低 {cost_sol.minimum:,}円（現在 {cost_fixed:,}円）")
+                cost_fixed = cost_sol.minimum
+            if hints:
+                st.info("付加価値額の要件を満たすには、" + " または ".join(hints) + " にする必要があります")
+        if not validation["salary"]["ok"]:
+            wage_sol = solve_min_wage_increase(
+                calc.financial,
+                sales_increase_annual=sales_fixed,
+                cost_reduction_annual=cost_fixed,
+                new_depreciation=calc.new_depreciation,
+            )
+            if wage_sol.feasible:
+                st.info(
+                    f"給与支給総額の要件を満たすには、年間の給与支給総額増加額が最低 "
+                    f"{wage_sol.minimum:,}円 必要です（現在 {data.wage.annual_increase:,}円）"
+                )
+
         # 補助金サマリー
         st.info(
             f"補助対象経費: {subsidy.total_expense:,}円　|　"
@@ -382,9 +624,8 @@ if "km_generated_texts" in st.session_state:
             table_data = []
             for label, key in rows:
                 row_data = {"項目": label}
-                for i, year_data in enumerate(plan.years):
+                for i, val in enumerate(plan.column(key)):
                     col_name = headers[i + 1]
-                    val = year_data.get(key, 0)
                     if key == "employee_count":
                         row_data[col_name] = f"{val}名"
                     else:
@@ -394,10 +635,13 @@ if "km_generated_texts" in st.session_state:
 
         # 書類生成結果
         doc_results = st.session_state["km_documents"]["results"]
-        with st.expander("生成書類一覧", expanded=False):
-            for name, path in doc_results.items():
-                if path:
-                    st.write(f"- {name}: {Path(path).name}")
+        doc_errors = st.session_state["km_documents"].get("errors", {})
+        with st.expander("生成書類一覧", expanded=bool(doc_errors)):
+            for name, filename in doc_results.items():
+                if filename:
+                    st.write(f"- {name}: {filename}")
+                elif name in doc_errors:
+                    st.warning(f"- {name}: 生成失敗（{doc_errors[name]}）")
                 else:
                     st.warning(f"- {name}: 生成失敗")
 
@@ -421,4 +665,6 @@ if "km_generated_texts" in st.session_state:
             "交付申請書のフリガナ、チェックボックスの最終確認も忘れずに行ってください。"
         )
 
+show_run_stats(graph)
+show_usage_history()
 footer()
@@ -0,0 +1,195 @@
+"""Tests for RateLimiter and the reservations generate_* take from it."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lib import anthropic_client as ac
+from lib.anthropic_client import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimiter
+from lib.llm_backends import AsyncOfflineClient, OfflineClient, SyntheticResponder, api_error
+from lib.llm_metrics import MetricsRegistry
+
+TPM = 100_000
+
+
+class FakeClock:
+    """Clock that only moves when advanced; waiting with a timeout advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def wait(self, cond, timeout):
+        if timeout is None:
+            cond.wait(0.01)  # waiting for another caller: let its thread run
+        else:
+            self.advance(timeout)
+
+
+class Flaky:
+    """Responder failing the first `failures` attempts with a 429."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.responder = SyntheticResponder(ttft=0.0, tokens_per_second=1e9, jitter=0.0)
+
+    def respond(self, params):
+        if self.failures > 0:
+            self.failures -= 1
+            raise api_error(429)
+        return self.responder.respond(params)
+
+
+@pytest.fixture(autouse=True)
+def metrics(monkeypatch):
+    registry = MetricsRegistry(path=None)
+    monkeypatch.setattr(ac, "get_metrics", lambda: registry)
+    monkeypatch.setattr(ac, "_backoff_delay", lambda *args: 0.0)
+    return registry
+
+
+def drained(rpm: int = 60, tpm: int = TPM) -> tuple[RateLimiter, FakeClock]:
+    """A limiter on a fake clock with no requests left in the current minute."""
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=rpm, tpm=tpm, clock=clock, wait=clock.wait)
+    while limiter.try_acquire(0) == 0.0:
+        pass
+    return limiter, clock
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def test_interactive_is_granted_before_earlier_batch():
+    limiter, clock = drained()
+    limiter._wait = lambda cond, timeout: cond.wait(0.01)  # hold everyone until the clock moves
+    order = []
+
+    def caller(name, priority):
+        limiter.acquire(0, priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=caller, args=("batch", PRIORITY_BATCH))]
+    threads[0].start()
+    wait_for(lambda: limiter.stats()["queue_depth"] == 1)
+    threads.append(threading.Thread(target=caller, args=("interactive", PRIORITY_INTERACTIVE)))
+    threads[1].start()
+    wait_for(lambda: limiter.stats()["queue_depth"] == 2)
+
+    clock.advance(1.0)  # one request refills
+    wait_for(lambda: order)
+    assert order == ["interactive"]
+    clock.advance(1.0)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "batch"]
+
+
+def test_try_acquire_yields_to_waiting_higher_priority():
+    limiter, clock = drained()
+    limiter._wait = lambda cond, timeout: cond.wait(0.01)
+    thread = threading.Thread(target=limiter.acquire, args=(0, PRIORITY_INTERACTIVE))
+    thread.start()
+    wait_for(lambda: limiter.stats()["queue_depth"] == 1)
+    clock.advance(60.0)
+    assert limiter.try_acquire(0, PRIORITY_BATCH) > 0
+    thread.join(5)
+    assert limiter.try_acquire(0, PRIORITY_BATCH) == 0.0
+
+
+def test_requests_refill_over_the_minute():
+    limiter, clock = drained(rpm=60)
+    assert limiter.try_acquire(0) == pytest.approx(1.0)
+    clock.advance(0.5)
+    assert limiter.try_acquire(0) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.try_acquire(0) == 0.0
+
+
+def test_tokens_refill_over_the_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=1000, tpm=6000, clock=clock, wait=clock.wait)
+    assert limiter.try_acquire(6000) == 0.0
+    assert limiter.try_acquire(600) == pytest.approx(6.0)
+    assert limiter.acquire(600) == pytest.approx(6.0)
+    assert limiter.stats()["max_wait"] == pytest.approx(6.0)
+
+
+def test_settle_returns_the_unused_reservation():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=1000, tpm=TPM, clock=clock, wait=clock.wait)
+    limiter.acquire(5000)
+    limiter.settle(5000, 1200)
+    assert limiter.stats()["tokens_available"] == TPM - 1200
+    limiter.acquire(800)
+    limiter.settle(800, 0)
+    assert limiter.stats()["tokens_available"] == TPM - 1200
+
+
+def generate(name: str, limiter: RateLimiter, responder) -> str:
+    kwargs = dict(limiter=limiter, use_cache=False)
+    if name == "text":
+        return ac.generate_text("s", "hello", client=OfflineClient(responder), **kwargs)
+    if name == "stream":
+        return "".join(ac.generate_streaming("s", "hello", client=OfflineClient(responder), **kwargs))
+    client = AsyncOfflineClient(responder)
+    if name == "atext":
+        return asyncio.run(ac.agenerate_text("s", "hello", client=client, **kwargs))
+
+    async def collect():
+        return "".join([chunk async for chunk in ac.agenerate_streaming("s", "hello", client=client, **kwargs)])
+    return asyncio.run(collect())
+
+
+def frozen() -> RateLimiter:
+    """A limiter whose budgets never refill, so every token is accounted for."""
+    return RateLimiter(rpm=1000, tpm=TPM, clock=lambda: 0.0)
+
+
+@pytest.mark.parametrize("name", ["text", "stream", "atext", "astream"])
+def test_failed_attempts_return_their_reservation(name, metrics):
+    clean = frozen()
+    generate(name, clean, Flaky())
+    retried = frozen()
+    generate(name, retried, Flaky(failures=3))
+
+    assert retried.stats()["tokens_available"] == clean.stats()["tokens_available"] < TPM
+    assert retried.granted == 4
+    assert [r.error for r in metrics.records()][-1] is None
+
+
+def test_abandoned_stream_returns_its_reservation(metrics):
+    limiter = frozen()
+    stream = ac.generate_streaming("s", "hello", client=OfflineClient(Flaky()), limiter=limiter, use_cache=False)
+    next(stream)
+    stream.close()
+
+    assert limiter.stats()["tokens_available"] == TPM
+    assert metrics.records()[-1].error == "GeneratorExit"
+
+
+def test_abandoned_async_stream_returns_its_reservation(metrics):
+    limiter = frozen()
+
+    async def abandon():
+        stream = ac.agenerate_streaming(
+            "s", "hello", client=AsyncOfflineClient(Flaky()), limiter=limiter, use_cache=False,
+        )
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(abandon())
+    assert limiter.stats()["tokens_available"] == TPM
+    assert metrics.records()[-1].error == "GeneratorExit"